@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the HITL StateManager and its persistence backends.
+Drives full execution lifecycles (create, run, checkpoint, feedback, outputs, complete)
+and reports state transitions per second, reloads the SQLite file to check recovery,
+measures concurrent feedback submission with one lock vs. striped locks (in memory, and
+with a backend that blocks each save), and compares index-based health counts with a full scan.
+
+Usage: python benchmark_state_manager.py [--executions 2000] [--threads 16] [--db /tmp/hitl_bench.db]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from hitl_persistence import MemoryStateBackend, SQLiteStateBackend
+from hitl_state_manager import StateManager, ExecutionState, FeedbackAction
+
+TRANSITIONS_PER_EXECUTION = 8
+
+
+class BlockingBackend(MemoryStateBackend):
+    """Write-through store that blocks the caller on every save (e.g. a network database)."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def save_execution(self, execution_id, record):
+        if self.latency:
+            time.sleep(self.latency)  # releases the GIL, like socket or file I/O
+
+    def save_checkpoint(self, checkpoint_id, record):
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def run_lifecycles(state_manager: StateManager, executions: int, prefix: str) -> int:
+    """Two-phase lifecycle per execution; returns the number of state transitions."""
+    output = {"task": "create_content_plan", "output": "x" * 2000}
+    for i in range(executions):
+        eid = f"{prefix}-{i}"
+        state_manager.create_execution(eid, {"user_input": f"campaign {i}"}, ["after_planning"])
+        state_manager.update_execution_state(eid, ExecutionState.RUNNING)
+        checkpoint = state_manager.create_checkpoint(eid, "after_planning", "Review plan", {"phase": "planning"})
+        state_manager.record_phase_outputs(eid, {"create_content_plan": output}, checkpoint.checkpoint_id)
+        state_manager.submit_feedback(eid, checkpoint.checkpoint_id, FeedbackAction.CONTINUE)
+        state_manager.advance_cursor(eid, 1, {"action": "continue", "checkpoint": "after_planning"})
+        state_manager.record_phase_outputs(eid, {"analyze_sentiment": output})
+        state_manager.update_execution_state(eid, ExecutionState.COMPLETED, result={"status": "complete"})
+    return executions * TRANSITIONS_PER_EXECUTION
+
+
+def bench(label: str, state_manager: StateManager, executions: int, prefix: str):
+    t0 = time.perf_counter()
+    transitions = run_lifecycles(state_manager, executions, prefix)
+    elapsed = time.perf_counter() - t0
+    t1 = time.perf_counter()
+    state_manager.flush()
+    flush = time.perf_counter() - t1
+    print(f"  {label:<28} {transitions / elapsed:12,.0f} transitions/s   (final flush {flush * 1000:.1f} ms)")
+
+
+def bench_contention(label: str, lock_stripes: int, threads: int, per_thread: int, save_latency: float = 0.0):
+    """Concurrent feedback submissions, each thread on its own executions."""
+    backend = BlockingBackend(0.0) if save_latency else MemoryStateBackend()
+    state_manager = StateManager(backend, lock_stripes=lock_stripes)
+    work = []
+    for t in range(threads):
+        items = []
+        for i in range(per_thread):
+            eid = f"c{t}-{i}"
+            state_manager.create_execution(eid, {}, ["after_planning"])
+            checkpoint = state_manager.create_checkpoint(eid, "after_planning", "Review plan", {})
+            items.append((eid, checkpoint.checkpoint_id))
+        work.append(items)
+    if save_latency:
+        backend.latency = save_latency  # setup above ran without the delay
+
+    barrier = threading.Barrier(threads + 1)
+
+    def submit(items):
+        barrier.wait()
+        for eid, cid in items:
+            state_manager.submit_feedback(eid, cid, FeedbackAction.CONTINUE)
+            state_manager.get_pending_checkpoint(eid)
+
+    workers = [threading.Thread(target=submit, args=(items,)) for items in work]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+    assert state_manager.count_pending_checkpoints() == 0
+    print(f"  {label:<28} {threads * per_thread / elapsed:12,.0f} feedback/s")
+
+
+def bench_health(state_manager: StateManager, repeat: int = 200):
+    """Index counts (current /health) vs. the previous full scan of all executions."""
+    active = (ExecutionState.PENDING, ExecutionState.RUNNING, ExecutionState.WAITING_FEEDBACK)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        state_manager.count_active_executions()
+        state_manager.count_pending_checkpoints()
+    indexed = (time.perf_counter() - t0) / repeat
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        sum(1 for e in state_manager.list_executions() if e.state in active)
+    scan = (time.perf_counter() - t0) / repeat
+    total = state_manager.count_executions()
+    print(f"  health over {total} executions: index {indexed * 1e6:.1f} us, full scan {scan * 1e6:.1f} us")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--executions", type=int, default=2000)
+    ap.add_argument("--threads", type=int, default=16, help="concurrent feedback submitters")
+    ap.add_argument("--db", default=None, help="SQLite path (default: temp file)")
+    ap.add_argument("--save-latency-ms", type=float, default=0.5, help="per-save delay of the blocking backend")
+    args = ap.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="hitl_bench_"), "hitl_state.db")
+
+    print("=" * 60)
+    print("BAGANA AI - HITL StateManager benchmark")
+    print("=" * 60)
+    print(f"Executions: {args.executions} x {TRANSITIONS_PER_EXECUTION} transitions, SQLite: {db_path}")
+    print()
+
+    bench("memory (no persistence)", StateManager(MemoryStateBackend()), args.executions, "mem")
+
+    state_manager = StateManager(SQLiteStateBackend(db_path))
+    bench("sqlite WAL write-behind", state_manager, args.executions, "sql")
+    state_manager.close()
+
+    t0 = time.perf_counter()
+    reloaded = StateManager(SQLiteStateBackend(db_path))
+    load_ms = (time.perf_counter() - t0) * 1000
+    completed = reloaded.count_executions(ExecutionState.COMPLETED)
+    print()
+    print(f"Reload: {completed} completed executions restored in {load_ms:.1f} ms")
+    bench_health(reloaded)
+    reloaded.close()
+    if completed < args.executions:
+        print("[FAIL] Not all executions were persisted")
+        return 1
+
+    per_thread = max(1, args.executions // args.threads)
+    print()
+    print(f"Contention: {args.threads} threads x {per_thread} feedback submissions")
+    bench_contention("single lock (1 stripe)", 1, args.threads, per_thread)
+    bench_contention("striped (64 stripes)", 64, args.threads, per_thread)
+    print("  (pure-Python critical sections run under the GIL either way, so these match)")
+    latency_ms = args.save_latency_ms
+    per_thread = max(1, min(per_thread, int(2000 / latency_ms / args.threads) or 1))
+    print(f"Blocking backend ({latency_ms:g} ms per save): {args.threads} threads x {per_thread} feedback submissions")
+    bench_contention("single lock (1 stripe)", 1, args.threads, per_thread, latency_ms / 1000)
+    bench_contention("striped (64 stripes)", 64, args.threads, per_thread, latency_ms / 1000)
+    print()
+    print("[OK] Benchmark complete")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,17 +7,57 @@ import sys
 import json
 import subprocess
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 import asyncio
-from hitl_state_manager import StateManager, ExecutionState, CheckpointStatus
+from hitl_artifacts import ArtifactStore
+from hitl_scheduler import CrewScheduler
+from hitl_state_manager import (
+    StateManager,
+    ExecutionState,
+    ExecutionCursor,
+    FeedbackAction
+)
+
+
+# HITL phases in crew order (crew/run.py TASK_ORDER). A phase runs only its own tasks;
+# its checkpoint (if enabled for the execution) pauses before the next phase.
+PHASES: List[Dict[str, Any]] = [
+    {
+        "name": "planning",
+        "tasks": ["create_content_plan"],
+        "checkpoint": "after_planning",
+        "description": "Review content plan before proceeding to analysis",
+    },
+    {
+        "name": "analysis",
+        "tasks": ["analyze_sentiment", "research_trends"],
+        "checkpoint": "after_analysis",
+        "description": "Review sentiment and trend analysis before strategy creation",
+    },
+]
+TASK_ORDER = [tid for phase in PHASES for tid in phase["tasks"]]
+
+
+def _ordered_outputs(task_outputs: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Stored task outputs in crew order (unknown task names last)."""
+    rank = {tid: i for i, tid in enumerate(TASK_ORDER)}
+    return sorted(task_outputs.values(), key=lambda o: rank.get(o.get("task"), len(rank)))
 
 
 class CrewExecutor:
     """Executor for CrewAI workflows with HITL checkpoints."""
     
-    def __init__(self, state_manager: StateManager):
+    def __init__(
+        self,
+        state_manager: StateManager,
+        scheduler: Optional[CrewScheduler] = None,
+        artifacts: Optional[ArtifactStore] = None
+    ):
         self.state_manager = state_manager
+        self.scheduler = scheduler or CrewScheduler()
+        self.artifacts = artifacts or ArtifactStore(str(Path(__file__).parent / "hitl_artifacts"))
         self.project_root = Path(__file__).parent.parent
+        self._drivers: Dict[str, asyncio.Task] = {}  # execution_id -> the one driver task
     
     def _get_python_command(self) -> str:
         """Get Python command based on platform."""
@@ -34,127 +74,231 @@ class CrewExecutor:
     ):
         """
         Execute crew workflow with HITL checkpoints.
-        This runs in background and manages checkpoint flow.
+        This runs in background and becomes the execution's single driver.
+        inputs/checkpoints are the ones stored on the execution at creation.
         """
+        if self._has_driver(execution_id):
+            return
+        self._drivers[execution_id] = asyncio.current_task()
+        
+        # Update state to running
+        self.state_manager.update_execution_state(
+            execution_id,
+            ExecutionState.RUNNING
+        )
+        await self._drive(execution_id)
+    
+    async def resume_execution(self, execution_id: str):
+        """
+        Resume execution after feedback received.
+        The live driver is parked on the checkpoint and wakes by itself; a driver is only
+        started here when none is running, and it continues from the stored cursor.
+        """
+        if self._has_driver(execution_id):
+            return
+        
+        execution = self.state_manager.get_execution(execution_id)
+        if not execution or execution.state not in (
+            ExecutionState.PENDING,
+            ExecutionState.RUNNING,
+            ExecutionState.WAITING_FEEDBACK
+        ):
+            self.scheduler.release_reservation(execution_id)
+            return
+        
+        task = asyncio.create_task(self._drive(execution_id))
+        self._drivers[execution_id] = task
+        await task
+    
+    def _has_driver(self, execution_id: str) -> bool:
+        task = self._drivers.get(execution_id)
+        return task is not None and not task.done()
+    
+    async def _drive(self, execution_id: str):
+        """Run the execution's phases from its cursor and record the final state."""
         try:
-            # Update state to running
-            self.state_manager.update_execution_state(
-                execution_id,
-                ExecutionState.RUNNING
-            )
-            
-            # Execute crew in phases based on checkpoints
-            result = await self._execute_phased(
-                execution_id=execution_id,
-                inputs=inputs,
-                checkpoints=checkpoints
-            )
+            result = await self._execute_phased(execution_id)
             
-            # Mark as completed
+            # Mark as completed (or stopped by reviewer)
             self.state_manager.update_execution_state(
                 execution_id,
-                ExecutionState.COMPLETED,
+                ExecutionState.STOPPED if result["status"] == "stopped" else ExecutionState.COMPLETED,
                 result=result
             )
             
         except Exception as e:
-            # Mark as error
-            self.state_manager.update_execution_state(
-                execution_id,
-                ExecutionState.ERROR,
-                error=str(e)
-            )
+            # Mark as error (a cancelled execution stays cancelled)
+            execution = self.state_manager.get_execution(execution_id)
+            if not execution or execution.state != ExecutionState.CANCELLED:
+                self.state_manager.update_execution_state(
+                    execution_id,
+                    ExecutionState.ERROR,
+                    error=str(e)
+                )
+        finally:
+            # A reservation not taken over by a crew run (e.g. continue after the last phase)
+            self.scheduler.release_reservation(execution_id)
+            if self._drivers.get(execution_id) is asyncio.current_task():
+                del self._drivers[execution_id]
     
-    async def _execute_phased(
-        self,
-        execution_id: str,
-        inputs: Dict[str, Any],
-        checkpoints: List[str]
-    ) -> Dict[str, Any]:
+    async def _execute_phased(self, execution_id: str) -> Dict[str, Any]:
         """
         Execute crew in phases, creating checkpoints at specified points.
+        Each crew run covers only the tasks since the previous checkpoint. Outputs, the pending
+        checkpoint and applied feedback live on the execution cursor, so a new driver picks up
+        exactly where the previous one stopped and no task is re-run unless revised.
         """
-        # Phase 1: Planning
-        if "after_planning" in checkpoints:
-            planning_result = await self._execute_phase(
-                execution_id=execution_id,
-                phase_name="planning",
-                inputs=inputs,
-                checkpoint_name="after_planning",
-                checkpoint_description="Review content plan before proceeding to analysis"
-            )
+        execution = self.state_manager.get_execution(execution_id)
+        if not execution:
+            raise RuntimeError(f"Execution {execution_id} not found")
+        inputs = execution.inputs
+        checkpoints = execution.checkpoints
+        
+        while True:
+            cursor = self.state_manager.get_cursor(execution_id)
+            if cursor is None:
+                raise RuntimeError(f"Execution {execution_id} not found")
+            if cursor.next_phase >= len(PHASES):
+                break
             
-            # Check if stopped
-            execution = self.state_manager.get_execution(execution_id)
-            if execution and execution.state == ExecutionState.STOPPED:
-                return {"status": "stopped", "phase": "planning", "result": planning_result}
+            # Phases without an enabled checkpoint fold into the next phase's crew run
+            end = cursor.next_phase
+            while end < len(PHASES) - 1 and PHASES[end]["checkpoint"] not in checkpoints:
+                end += 1
+            phase = PHASES[end]
+            has_checkpoint = phase["checkpoint"] in checkpoints
             
-            # Add planning result to inputs for next phase
-            inputs["planning_context"] = planning_result
-        
-        # Phase 2: Analysis (sentiment + trends)
-        if "after_analysis" in checkpoints:
-            analysis_result = await self._execute_phase(
-                execution_id=execution_id,
-                phase_name="analysis",
-                inputs=inputs,
-                checkpoint_name="after_analysis",
-                checkpoint_description="Review sentiment and trend analysis before strategy creation"
-            )
+            checkpoint_id = cursor.pending_checkpoint
+            if checkpoint_id is None:
+                task_ids = [tid for p in PHASES[cursor.next_phase:end + 1] for tid in p["tasks"]]
+                checkpoint_id = await self._execute_phase(
+                    execution_id=execution_id,
+                    phase=phase,
+                    inputs=inputs,
+                    task_ids=task_ids,
+                    cursor=cursor,
+                    create_checkpoint=has_checkpoint
+                )
+                if checkpoint_id is None:
+                    self.state_manager.advance_cursor(execution_id, end + 1)
+                    continue
             
-            execution = self.state_manager.get_execution(execution_id)
-            if execution and execution.state == ExecutionState.STOPPED:
-                return {"status": "stopped", "phase": "analysis", "result": analysis_result}
+            # Wait for feedback (event-based)
+            await self._wait_for_feedback(execution_id, checkpoint_id)
+            feedback = self.state_manager.get_checkpoint_feedback(checkpoint_id) or {}
+            feedback["checkpoint"] = phase["checkpoint"]
+            action = feedback.get("action")
             
-            inputs["analysis_context"] = analysis_result
-        
-        # Phase 3: Final execution (if no more checkpoints or final phase)
-        final_result = await self._execute_crew_direct(inputs)
+            if action == FeedbackAction.STOP.value:
+                self.state_manager.advance_cursor(execution_id, cursor.next_phase, feedback)
+                ordered = _ordered_outputs(self.state_manager.get_cursor(execution_id).task_outputs)
+                return {"status": "stopped", "phase": phase["name"], "task_outputs": ordered}
+            if action == FeedbackAction.REVISE.value:
+                # Re-run the same phase group with the reviewer's feedback
+                self.state_manager.advance_cursor(
+                    execution_id, cursor.next_phase, feedback,
+                    revision_feedback=feedback.get("feedback") or ""
+                )
+                self.state_manager.update_execution_state(execution_id, ExecutionState.RUNNING)
+                continue
+            self.state_manager.advance_cursor(execution_id, end + 1, feedback)
         
+        ordered = _ordered_outputs(self.state_manager.get_cursor(execution_id).task_outputs)
         return {
             "status": "complete",
-            "output": final_result.get("output", ""),
-            "task_outputs": final_result.get("task_outputs", [])
+            "output_ref": ordered[-1].get("output_ref") if ordered else None,
+            "task_outputs": ordered
         }
     
     async def _execute_phase(
         self,
         execution_id: str,
-        phase_name: str,
+        phase: Dict[str, Any],
         inputs: Dict[str, Any],
-        checkpoint_name: str,
-        checkpoint_description: str
-    ) -> Dict[str, Any]:
+        task_ids: List[str],
+        cursor: ExecutionCursor,
+        create_checkpoint: bool = True
+    ) -> Optional[str]:
         """
-        Execute a phase and create checkpoint.
+        Run only this phase's tasks, store their outputs on the cursor and (optionally)
+        create the checkpoint. Returns the checkpoint id, or None without a checkpoint.
         """
-        # Execute crew for this phase
-        # In real implementation, you'd filter tasks by phase
-        result = await self._execute_crew_direct(inputs)
+        prior_outputs = await asyncio.to_thread(self._load_outputs, cursor.task_outputs)
+        run_inputs = {
+            **inputs,
+            "tasks": task_ids,
+            "prior_outputs": prior_outputs
+        }
+        if cursor.revision_feedback is not None:
+            run_inputs["revision_feedback"] = cursor.revision_feedback
+        
+        # One scheduler slot per crew subprocess; released before waiting for feedback
+        execution = self.state_manager.get_execution(execution_id)
+        async with self.scheduler.slot(execution_id, execution.user_id, execution.priority):
+            self.state_manager.publish_event(execution_id, "progress", {
+                "phase": phase["name"],
+                "tasks": task_ids,
+                "status": "started"
+            })
+            result = await self._execute_crew_direct(
+                run_inputs,
+                on_progress=lambda progress: self.state_manager.publish_event(
+                    execution_id, "progress", {"phase": phase["name"], **progress}
+                )
+            )
+        if result.get("status") == "error":
+            raise RuntimeError(f"Phase {phase['name']} failed: {result.get('error', 'unknown error')}")
+        
+        outputs = await asyncio.to_thread(self._store_outputs, result)
+        if not create_checkpoint:
+            self.state_manager.record_phase_outputs(execution_id, outputs)
+            return None
         
         # Create checkpoint
         checkpoint = self.state_manager.create_checkpoint(
             execution_id=execution_id,
-            checkpoint_name=checkpoint_name,
-            description=checkpoint_description,
+            checkpoint_name=phase["checkpoint"],
+            description=phase["description"],
             context={
-                "phase": phase_name,
-                "result_preview": str(result.get("output", ""))[:500],
+                "phase": phase["name"],
+                "tasks": task_ids,
+                "revision": cursor.revision_feedback is not None,
+                "artifacts": {tid: out["output_ref"] for tid, out in outputs.items()},
                 "status": result.get("status", "unknown")
             }
         )
-        
-        # Wait for feedback (polling or event-based)
-        await self._wait_for_feedback(execution_id, checkpoint.checkpoint_id)
-        
-        # Get feedback
-        feedback = self.state_manager.get_checkpoint_feedback(checkpoint.checkpoint_id)
-        
-        # Add feedback to result
-        result["_checkpoint"] = checkpoint_name
-        result["_feedback"] = feedback
-        
-        return result
+        self.state_manager.record_phase_outputs(execution_id, outputs, checkpoint.checkpoint_id)
+        return checkpoint.checkpoint_id
+    
+    def _store_outputs(self, result: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Store each task's output (and parsed records) once as artifacts.
+        Returns task id -> {task, agent, output_ref, parsed_ref} for the execution cursor.
+        """
+        outputs = {}
+        for out in result.get("task_outputs", []):
+            entry = {
+                "task": out.get("task"),
+                "agent": out.get("agent"),
+                "output_ref": self.artifacts.put_text(str(out.get("output", "")))
+            }
+            if out.get("parsed"):
+                entry["parsed_ref"] = self.artifacts.put_json(out["parsed"])
+            outputs[out.get("task")] = entry
+        return outputs
+    
+    def _load_outputs(self, task_outputs: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        """Output text of stored tasks (for prior_outputs); inline outputs from older cursors pass through."""
+        texts = {}
+        for tid, out in task_outputs.items():
+            if "output_ref" in out:
+                text = self.artifacts.read_text(out["output_ref"]["artifact_id"])
+                if text is None:
+                    raise RuntimeError(f"Artifact for {tid} is missing: {out['output_ref']['artifact_id']}")
+                texts[tid] = text
+            else:
+                texts[tid] = str(out.get("output", ""))
+        return texts
     
     async def _wait_for_feedback(
         self,
@@ -164,33 +308,26 @@ class CrewExecutor:
     ):
         """
         Wait for feedback on a checkpoint.
-        Polls state manager until feedback is received or timeout.
+        Parks on the state manager's checkpoint event; woken by feedback or cancellation.
         """
-        start_time = asyncio.get_event_loop().time()
+        resolved = await self.state_manager.wait_for_checkpoint(checkpoint_id, timeout=timeout)
+        if not resolved:
+            raise TimeoutError(f"Checkpoint {checkpoint_id} timed out waiting for feedback")
         
-        while True:
-            # Check timeout
-            elapsed = asyncio.get_event_loop().time() - start_time
-            if elapsed > timeout:
-                raise TimeoutError(f"Checkpoint {checkpoint_id} timed out waiting for feedback")
-            
-            # Check if feedback received
-            checkpoint = self.state_manager.get_pending_checkpoint(execution_id)
-            if not checkpoint or checkpoint.checkpoint_id != checkpoint_id:
-                # Feedback received or checkpoint resolved
-                break
-            
-            # Check if execution cancelled
-            execution = self.state_manager.get_execution(execution_id)
-            if execution and execution.state == ExecutionState.CANCELLED:
-                raise Exception("Execution cancelled")
-            
-            # Poll interval
-            await asyncio.sleep(1)  # Poll every second
+        # Check if execution cancelled
+        execution = self.state_manager.get_execution(execution_id)
+        if execution and execution.state == ExecutionState.CANCELLED:
+            raise Exception("Execution cancelled")
     
-    async def _execute_crew_direct(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_crew_direct(
+        self,
+        inputs: Dict[str, Any],
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
         """
         Execute crew directly via subprocess (same as Next.js API route).
+        stderr is read line by line while the crew runs: {"type": "progress"} JSON lines from
+        crew.run's step callback go to on_progress, everything else is kept for error messages.
         """
         python_cmd = self._get_python_command()
         crew_module = "crew.run"
@@ -201,16 +338,35 @@ class CrewExecutor:
             stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
-            cwd=str(self.project_root)
+            cwd=str(self.project_root),
+            limit=1 << 20  # long stderr lines (tracebacks, verbose LLM logs)
         )
         
         # Write inputs as JSON
         input_json = json.dumps(inputs)
-        stdout, stderr = await process.communicate(input=input_json.encode())
+        process.stdin.write(input_json.encode())
+        await process.stdin.drain()
+        process.stdin.close()
+        
+        stderr_lines: List[str] = []
+        
+        async def read_stderr():
+            async for raw in process.stderr:
+                line = raw.decode(errors="replace")
+                if on_progress and line.startswith('{"type": "progress"'):
+                    try:
+                        on_progress(json.loads(line))
+                        continue
+                    except json.JSONDecodeError:
+                        pass
+                stderr_lines.append(line)
+        
+        stdout, _ = await asyncio.gather(process.stdout.read(), read_stderr())
+        await process.wait()
         
         # Parse output
         if process.returncode != 0:
-            error_msg = stderr.decode() if stderr else "Unknown error"
+            error_msg = "".join(stderr_lines) or "Unknown error"
             return {"status": "error", "error": error_msg}
         
         try:
@@ -221,51 +377,3 @@ class CrewExecutor:
                 "status": "error",
                 "error": f"Invalid JSON output: {stdout.decode()[:200]}"
             }
-    
-    async def resume_execution(self, execution_id: str):
-        """
-        Resume execution after feedback received.
-        """
-        execution = self.state_manager.get_execution(execution_id)
-        if not execution:
-            return
-        
-        if execution.state != ExecutionState.RUNNING:
-            return  # Not in running state
-        
-        # Continue execution from where it left off
-        # This would continue the phased execution
-        # For simplicity, we'll re-execute the remaining phases
-        # In production, you'd want to save and restore execution state
-        
-        try:
-            # Get current phase based on completed checkpoints
-            completed = execution.completed_checkpoints
-            checkpoints = execution.checkpoints
-            
-            # Determine remaining phases
-            remaining_checkpoints = [
-                cp for cp in checkpoints
-                if cp not in [self.state_manager._checkpoints[cid].checkpoint_name
-                             for cid in completed if cid in self.state_manager._checkpoints]
-            ]
-            
-            # Continue execution
-            result = await self._execute_phased(
-                execution_id=execution_id,
-                inputs=execution.inputs,
-                checkpoints=remaining_checkpoints
-            )
-            
-            self.state_manager.update_execution_state(
-                execution_id,
-                ExecutionState.COMPLETED,
-                result=result
-            )
-            
-        except Exception as e:
-            self.state_manager.update_execution_state(
-                execution_id,
-                ExecutionState.ERROR,
-                error=str(e)
-            )
@@ -0,0 +1,93 @@
+"""
+Artifact Store for HITL Workflows
+Large task outputs are stored once, content-addressed, and referenced by ID from execution
+results, the execution cursor and checkpoint context.
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+
+CONTENT_TYPES = {
+    "md": "text/markdown; charset=utf-8",
+    "json": "application/json",
+    "txt": "text/plain; charset=utf-8",
+}
+_ARTIFACT_ID_RE = re.compile(r"^[0-9a-f]{64}\.(md|json|txt)$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class ArtifactStore:
+    """
+    Content-addressed files: artifact_id = sha256(bytes) + extension, so identical outputs
+    (e.g. a re-sent approved plan) are stored once and the id doubles as a strong ETag.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def put(self, data: bytes, extension: str = "md") -> Dict[str, Any]:
+        """Store bytes (no-op if already present) and return the reference."""
+        if extension not in CONTENT_TYPES:
+            raise ValueError(f"Unsupported artifact type '{extension}'. Use one of {list(CONTENT_TYPES)}")
+        artifact_id = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        path = self._path(artifact_id)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return {"artifact_id": artifact_id, "size": len(data), "content_type": CONTENT_TYPES[extension]}
+
+    def put_text(self, text: str) -> Dict[str, Any]:
+        return self.put(text.encode("utf-8"), "md")
+
+    def put_json(self, value: Any) -> Dict[str, Any]:
+        return self.put(json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8"), "json")
+
+    def read_text(self, artifact_id: str) -> Optional[str]:
+        path = self.locate(artifact_id)
+        return path.read_text(encoding="utf-8") if path else None
+
+    def locate(self, artifact_id: str) -> Optional[Path]:
+        """Path of a stored artifact, or None for unknown/invalid ids."""
+        if not _ARTIFACT_ID_RE.match(artifact_id):
+            return None
+        path = self._path(artifact_id)
+        return path if path.exists() else None
+
+    def _path(self, artifact_id: str) -> Path:
+        return self.directory / artifact_id[:2] / artifact_id
+
+
+def content_type_of(artifact_id: str) -> str:
+    return CONTENT_TYPES[artifact_id.rsplit(".", 1)[-1]]
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Single byte range from a Range header as inclusive (start, end).
+    Returns None when absent or not a single bytes range (serve the full body);
+    raises ValueError when the range cannot be satisfied (416).
+    """
+    if not header:
+        return None
+    m = _RANGE_RE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+    if m.group(1):
+        start = int(m.group(1))
+        end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    else:
+        suffix = int(m.group(2))  # bytes=-N: last N bytes
+        if suffix == 0:
+            raise ValueError("empty suffix range")
+        start, end = max(0, size - suffix), size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
@@ -0,0 +1,165 @@
+"""
+Execution Event Hub for HITL Workflows
+Per-execution bounded event buffers with push delivery to SSE/WebSocket subscribers.
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Any, Optional, List, Deque, Set, AsyncIterator
+
+
+@dataclass
+class ExecutionEvent:
+    """One event in an execution's stream. id is monotonic per execution (Last-Event-ID)."""
+    id: int
+    type: str  # state | checkpoint | feedback | progress | result | snapshot
+    data: Dict[str, Any]
+    terminal: bool = False  # last event of the execution; streams close after it
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "event": self.type, "data": self.data}
+
+
+class _Subscriber:
+    """Pending events of one connected client, woken across threads via its loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_pending: int):
+        self.loop = loop
+        self.max_pending = max_pending
+        self.pending: Deque[ExecutionEvent] = deque()
+        self.wakeup = asyncio.Event()
+        self.overflowed = False
+
+    def push(self, event: ExecutionEvent):
+        """Queue an event. Caller holds the hub lock."""
+        if len(self.pending) >= self.max_pending:
+            self.overflowed = True  # slow client: end its stream, it resumes via Last-Event-ID
+        else:
+            self.pending.append(event)
+        self.loop.call_soon_threadsafe(self.wakeup.set)
+
+
+class _Stream:
+    def __init__(self, buffer_size: int):
+        self.events: Deque[ExecutionEvent] = deque(maxlen=buffer_size)
+        self.next_id = 1
+        self.subscribers: Set[_Subscriber] = set()
+
+
+class EventHub:
+    """
+    Thread-safe publish/subscribe of execution events.
+    Each execution keeps its last buffer_size events so reconnecting clients can resume from
+    Last-Event-ID; when the requested id has been evicted (or predates a restart) the
+    subscriber is told so and should start from a status snapshot.
+    """
+
+    def __init__(self, buffer_size: int = 256):
+        self.buffer_size = buffer_size
+        self._streams: Dict[str, _Stream] = {}
+        self._lock = Lock()
+
+    def publish(
+        self,
+        execution_id: str,
+        event_type: str,
+        data: Dict[str, Any],
+        terminal: bool = False
+    ) -> ExecutionEvent:
+        """Append an event and wake subscribers; safe from any thread."""
+        with self._lock:
+            stream = self._streams.get(execution_id)
+            if stream is None:
+                stream = self._streams[execution_id] = _Stream(self.buffer_size)
+            event = ExecutionEvent(stream.next_id, event_type, data, terminal)
+            stream.next_id += 1
+            stream.events.append(event)
+            for subscriber in stream.subscribers:
+                subscriber.push(event)
+            return event
+
+    def forget(self, execution_id: str):
+        """Drop an execution's buffer (e.g. once it is compacted)."""
+        with self._lock:
+            stream = self._streams.get(execution_id)
+            if stream is not None and not stream.subscribers:
+                del self._streams[execution_id]
+
+    def buffered(self, execution_id: str) -> int:
+        with self._lock:
+            stream = self._streams.get(execution_id)
+            return len(stream.events) if stream else 0
+
+    def _subscribe(self, execution_id: str, last_event_id: Optional[int]):
+        """Register a subscriber; returns (subscriber, backlog, gap)."""
+        subscriber = _Subscriber(asyncio.get_running_loop(), self.buffer_size)
+        with self._lock:
+            stream = self._streams.get(execution_id)
+            if stream is None:
+                stream = self._streams[execution_id] = _Stream(self.buffer_size)
+            stream.subscribers.add(subscriber)
+            backlog: List[ExecutionEvent] = list(stream.events)
+            first_id = backlog[0].id if backlog else stream.next_id
+            if last_event_id is None:
+                gap = first_id > 1
+            elif last_event_id >= stream.next_id or last_event_id < first_id - 1:
+                gap = True  # unknown id (restart) or evicted from the buffer
+            else:
+                gap = False
+                backlog = [e for e in backlog if e.id > last_event_id]
+        return subscriber, backlog, gap
+
+    def _unsubscribe(self, execution_id: str, subscriber: _Subscriber):
+        with self._lock:
+            stream = self._streams.get(execution_id)
+            if stream is not None:
+                stream.subscribers.discard(subscriber)
+
+    async def stream(
+        self,
+        execution_id: str,
+        last_event_id: Optional[int] = None,
+        snapshot: Optional[Dict[str, Any]] = None,
+        keepalive: Optional[float] = None
+    ) -> AsyncIterator[Optional[ExecutionEvent]]:
+        """
+        Yield buffered events after last_event_id, then live events until a terminal event.
+        snapshot (current status) is yielded first when the client cannot resume exactly;
+        a terminal snapshot ends the stream. Yields None every keepalive seconds when idle.
+        """
+        subscriber, backlog, gap = self._subscribe(execution_id, last_event_id)
+        try:
+            if gap and snapshot is not None:
+                terminal = bool(snapshot.get("terminal"))
+                yield ExecutionEvent(0, "snapshot", snapshot, terminal)
+                if terminal:
+                    return
+            for event in backlog:
+                yield event
+                if event.terminal:
+                    return
+            seen = backlog[-1].id if backlog else (last_event_id or 0)
+            while True:
+                if not subscriber.pending:
+                    if subscriber.overflowed:
+                        return
+                    subscriber.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(subscriber.wakeup.wait(), keepalive)
+                    except asyncio.TimeoutError:
+                        yield None
+                    continue
+                with self._lock:
+                    events = list(subscriber.pending)
+                    subscriber.pending.clear()
+                for event in events:
+                    if event.id <= seen:
+                        continue  # already sent from the backlog
+                    seen = event.id
+                    yield event
+                    if event.terminal:
+                        return
+        finally:
+            self._unsubscribe(execution_id, subscriber)
@@ -0,0 +1,226 @@
+"""
+Persistence Backends for the HITL State Manager
+Pluggable storage for executions and checkpoints so parked approvals survive restarts.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+class StateBackend:
+    """
+    Storage interface used by StateManager.
+    Records are JSON-serializable dicts built by the state manager under its lock;
+    save_* must not block on I/O (the lock is held while they are called).
+    """
+
+    def load(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Return (execution records, checkpoint records) stored so far."""
+        return [], []
+
+    def save_execution(self, execution_id: str, record: Dict[str, Any]):
+        """Queue an execution record (insert or replace)."""
+
+    def save_checkpoint(self, checkpoint_id: str, record: Dict[str, Any]):
+        """Queue a checkpoint record (insert or replace)."""
+
+    def flush(self):
+        """Write queued records now."""
+
+    def close(self):
+        """Flush and release resources."""
+
+
+class MemoryStateBackend(StateBackend):
+    """No persistence (previous behaviour): state lives only in the StateManager dicts."""
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Embedded SQLite store in WAL mode with write-behind batching.
+    save_* only replaces the pending record for that id (repeated transitions of one
+    execution coalesce into one row write); a writer thread flushes pending records every
+    flush_interval seconds, or as soon as batch_size are queued, with one executemany
+    upsert per table in a single transaction.
+    """
+
+    _UPSERT_EXECUTION = (
+        "INSERT INTO executions (execution_id, state, updated_at, data) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(execution_id) DO UPDATE SET "
+        "state = excluded.state, updated_at = excluded.updated_at, data = excluded.data"
+    )
+    _UPSERT_CHECKPOINT = (
+        "INSERT INTO checkpoints (checkpoint_id, execution_id, status, data) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(checkpoint_id) DO UPDATE SET status = excluded.status, data = excluded.data"
+    )
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.05,
+        batch_size: int = 1000
+    ):
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS executions (
+                execution_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                checkpoint_id TEXT PRIMARY KEY,
+                execution_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_checkpoints_execution ON checkpoints (execution_id);
+            """
+        )
+        self._conn.commit()
+
+        self._pending_executions: Dict[str, Dict[str, Any]] = {}
+        self._pending_checkpoints: Dict[str, Dict[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()  # serializes flushes (writer thread vs. flush())
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run_writer, name="hitl-state-writer", daemon=True)
+        self._writer.start()
+
+    def load(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        with self._write_lock:
+            executions = [json.loads(row[0]) for row in self._conn.execute("SELECT data FROM executions")]
+            checkpoints = [json.loads(row[0]) for row in self._conn.execute("SELECT data FROM checkpoints")]
+        return executions, checkpoints
+
+    def save_execution(self, execution_id: str, record: Dict[str, Any]):
+        with self._pending_lock:
+            self._pending_executions[execution_id] = record
+            full = len(self._pending_executions) + len(self._pending_checkpoints) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def save_checkpoint(self, checkpoint_id: str, record: Dict[str, Any]):
+        with self._pending_lock:
+            self._pending_checkpoints[checkpoint_id] = record
+            full = len(self._pending_executions) + len(self._pending_checkpoints) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        with self._write_lock:
+            with self._pending_lock:
+                executions = self._pending_executions
+                checkpoints = self._pending_checkpoints
+                self._pending_executions = {}
+                self._pending_checkpoints = {}
+            if not executions and not checkpoints:
+                return
+            try:
+                # JSON encoding happens here, off the StateManager lock
+                with self._conn:
+                    if executions:
+                        self._conn.executemany(self._UPSERT_EXECUTION, [
+                            (eid, rec["state"], rec["updated_at"], json.dumps(rec))
+                            for eid, rec in executions.items()
+                        ])
+                    if checkpoints:
+                        self._conn.executemany(self._UPSERT_CHECKPOINT, [
+                            (cid, rec["execution_id"], rec["status"], json.dumps(rec))
+                            for cid, rec in checkpoints.items()
+                        ])
+            except sqlite3.Error:
+                self._requeue(executions, checkpoints)
+                raise
+
+    def _requeue(self, executions: Dict[str, Dict[str, Any]], checkpoints: Dict[str, Dict[str, Any]]):
+        """Put a failed (rolled back) batch back; records saved since then are newer and win."""
+        with self._pending_lock:
+            for eid, rec in executions.items():
+                self._pending_executions.setdefault(eid, rec)
+            for cid, rec in checkpoints.items():
+                self._pending_checkpoints.setdefault(cid, rec)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join()
+        self.flush()
+        self._conn.close()
+
+    def _run_writer(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Keep the writer alive; the batch was re-queued and is retried on the next tick
+                logger.exception("HITL state flush failed; retrying")
+
+
+class ResultStore:
+    """
+    Offloaded execution results: one JSON file per execution under a directory.
+    Used by StateManager compaction so finished executions keep only a path in memory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def save(self, execution_id: str, result: Dict[str, Any]) -> str:
+        """Write result atomically and return its path."""
+        path = self.directory / f"{execution_id}.json"
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(result), encoding="utf-8")
+        os.replace(tmp, path)
+        return str(path)
+
+    def load(self, path: str) -> Optional[Dict[str, Any]]:
+        """Read an offloaded result; None if the file is gone."""
+        try:
+            return json.loads(Path(path).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+
+def create_backend_from_env() -> StateBackend:
+    """
+    Backend selected by HITL_STATE_BACKEND ("sqlite", default, or "memory").
+    HITL_STATE_DB sets the SQLite path (default: hitl_state.db next to this module).
+    """
+    kind = os.getenv("HITL_STATE_BACKEND", "sqlite").strip().lower()
+    if kind == "memory":
+        return MemoryStateBackend()
+    if kind != "sqlite":
+        raise ValueError(f"Unknown HITL_STATE_BACKEND '{kind}'. Use 'sqlite' or 'memory'.")
+    path = os.getenv("HITL_STATE_DB") or str(Path(__file__).parent / "hitl_state.db")
+    return SQLiteStateBackend(
+        path,
+        flush_interval=float(os.getenv("HITL_STATE_FLUSH_INTERVAL", "0.05")),
+        batch_size=int(os.getenv("HITL_STATE_BATCH_SIZE", "1000"))
+    )
+
+
+def create_result_store_from_env() -> ResultStore:
+    """HITL_RESULTS_DIR (default: hitl_results/ next to this module)."""
+    return ResultStore(os.getenv("HITL_RESULTS_DIR") or str(Path(__file__).parent / "hitl_results"))
@@ -0,0 +1,154 @@
+"""
+Admission Control for HITL Crew Runs
+Bounds how many crew subprocesses run at once and orders the rest fairly.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Dict, Deque, Optional, Tuple
+
+
+PRIORITIES = ("interactive", "batch")  # served in this order
+
+
+class QueueFullError(Exception):
+    """Raised when the run queue is at capacity; retry_after is a hint in seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Crew run queue is full; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class CrewScheduler:
+    """
+    Bounded worker pool for crew runs (one slot = one `python -m crew.run` subprocess).
+    Waiting runs are served interactive before batch; within a priority, users are served
+    round-robin so one user's burst cannot starve others. Slots are held only while a crew
+    subprocess runs, never while an execution waits for human feedback.
+    Admission is decided by reserve() when a run is requested: it counts against the bound
+    (max_concurrency running + max_queue waiting) until slot() takes it over or it is released,
+    so requests admitted before their background task starts cannot overshoot the queue.
+    Single event loop only (no locking).
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 20):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self._running = 0
+        # priority -> user -> FIFO of (execution_id, future)
+        self._queues: Dict[str, "OrderedDict[str, Deque[Tuple[str, asyncio.Future]]]"] = {
+            p: OrderedDict() for p in PRIORITIES
+        }
+        self._queued = 0
+        self._reserved: Dict[str, Tuple[str, str]] = {}  # execution_id -> (user, priority), admitted, not yet in slot()
+        self._avg_run_seconds = 60.0  # EWMA of crew run duration, seeds the Retry-After hint
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @property
+    def reserved(self) -> int:
+        return len(self._reserved)
+
+    def reserve(self, execution_id: str, user: str = "anonymous", priority: str = "interactive"):
+        """
+        Admit a crew run for execution_id or raise QueueFullError. The reservation is taken
+        over by the execution's next slot() or dropped with release_reservation(); reserving
+        an execution that already holds one is a no-op.
+        """
+        if execution_id in self._reserved:
+            return
+        if self._running + self._queued + len(self._reserved) >= self.max_concurrency + self.max_queue:
+            raise QueueFullError(self.retry_after())
+        self._reserved[execution_id] = (user, priority)
+
+    def release_reservation(self, execution_id: str):
+        """Drop an unused reservation (the run never started)."""
+        self._reserved.pop(execution_id, None)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free for a newly queued run."""
+        waves = math.ceil((self._queued + len(self._reserved) + 1) / self.max_concurrency)
+        return max(1, int(self._avg_run_seconds * waves))
+
+    def position(self, execution_id: str) -> Optional[int]:
+        """1-based position in the dispatch order, or None if the execution is not queued."""
+        position = 0
+        for users in self._queues.values():
+            # Round-robin order: take the n-th entry of every user before any (n+1)-th
+            depth = max((len(q) for q in users.values()), default=0)
+            for n in range(depth):
+                for waiters in users.values():
+                    if n < len(waiters):
+                        position += 1
+                        if waiters[n][0] == execution_id:
+                            return position
+        return None
+
+    @asynccontextmanager
+    async def slot(self, execution_id: str, user: str = "anonymous", priority: str = "interactive"):
+        """
+        Hold a run slot for the duration of the block, waiting in the fair queue if needed.
+        Takes over the execution's reservation, if any.
+        """
+        self._reserved.pop(execution_id, None)
+        if priority not in self._queues:
+            priority = PRIORITIES[-1]
+        if self._running < self.max_concurrency and self._queued == 0:
+            self._running += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            users = self._queues[priority]
+            users.setdefault(user, deque()).append((execution_id, future))
+            self._queued += 1
+            try:
+                await future  # _release hands the slot over (running count unchanged)
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release()  # slot was granted as we got cancelled
+                else:
+                    self._discard(priority, user, future)
+                raise
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * elapsed
+            self._release()
+
+    def _discard(self, priority: str, user: str, future: asyncio.Future):
+        waiters = self._queues[priority].get(user)
+        if not waiters:
+            return
+        for item in waiters:
+            if item[1] is future:
+                waiters.remove(item)
+                self._queued -= 1
+                break
+        if not waiters:
+            del self._queues[priority][user]
+
+    def _release(self):
+        """Give the freed slot to the next waiter, or return it to the pool."""
+        for users in self._queues.values():
+            while users:
+                user, waiters = next(iter(users.items()))
+                _, future = waiters.popleft()
+                self._queued -= 1
+                if waiters:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                if not future.done():
+                    future.set_result(None)
+                    return
+        self._running -= 1
@@ -3,13 +3,26 @@ State Manager for Human-In-The-Loop Workflows
 Manages execution state, checkpoints, and feedback.
 """
 
+import bisect
+import heapq
+from collections import OrderedDict
 from enum import Enum
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set, Tuple, Iterable
 from dataclasses import dataclass, field
 from datetime import datetime
+import asyncio
+import json
 import uuid
 from threading import Lock
 
+from hitl_events import EventHub
+from hitl_persistence import StateBackend, MemoryStateBackend, ResultStore
+
+try:
+    import resource  # Unix only; used for the RSS gauge
+except ImportError:
+    resource = None
+
 
 class ExecutionState(Enum):
     """Execution state enum."""
@@ -22,6 +35,14 @@ class ExecutionState(Enum):
     STOPPED = "stopped"
 
 
+TERMINAL_STATES = frozenset({
+    ExecutionState.COMPLETED,
+    ExecutionState.ERROR,
+    ExecutionState.CANCELLED,
+    ExecutionState.STOPPED
+})
+
+
 class CheckpointStatus(Enum):
     """Checkpoint status enum."""
     PENDING = "pending"
@@ -54,6 +75,16 @@ class CheckpointState:
     resolved_at: Optional[datetime] = None
 
 
+@dataclass
+class ExecutionCursor:
+    """Durable progress of a phased execution; the executor's driver continues from here."""
+    next_phase: int = 0  # index into crew_integration.PHASES
+    task_outputs: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # task id -> stored output
+    applied_feedback: List[Dict[str, Any]] = field(default_factory=list)
+    pending_checkpoint: Optional[str] = None  # phase ran; its checkpoint awaits review
+    revision_feedback: Optional[str] = None  # set by "revise": re-run next_phase with this feedback
+
+
 @dataclass
 class ExecutionStateData:
     """State for an execution."""
@@ -65,41 +96,289 @@ class ExecutionStateData:
     completed_checkpoints: List[str] = field(default_factory=list)
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    cursor: ExecutionCursor = field(default_factory=ExecutionCursor)
+    result_path: Optional[str] = None  # offloaded result (see StateManager.get_result)
+    compacted: bool = False  # summary only: result, task outputs and checkpoints released
+    user_id: str = "anonymous"  # fairness key for the crew run scheduler
+    priority: str = "interactive"  # "interactive" or "batch"
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
 
 
+def _resolve_future(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _execution_record(execution: ExecutionStateData) -> Dict[str, Any]:
+    """JSON-ready snapshot of an execution (containers copied; taken under the lock)."""
+    cursor = execution.cursor
+    return {
+        "execution_id": execution.execution_id,
+        "inputs": execution.inputs,
+        "state": execution.state.value,
+        "checkpoints": list(execution.checkpoints),
+        "current_checkpoint": execution.current_checkpoint,
+        "completed_checkpoints": list(execution.completed_checkpoints),
+        "result": execution.result,
+        "error": execution.error,
+        "cursor": {
+            "next_phase": cursor.next_phase,
+            "task_outputs": dict(cursor.task_outputs),
+            "applied_feedback": list(cursor.applied_feedback),
+            "pending_checkpoint": cursor.pending_checkpoint,
+            "revision_feedback": cursor.revision_feedback,
+        },
+        "result_path": execution.result_path,
+        "compacted": execution.compacted,
+        "user_id": execution.user_id,
+        "priority": execution.priority,
+        "created_at": execution.created_at.isoformat(),
+        "updated_at": execution.updated_at.isoformat(),
+    }
+
+
+def _execution_from_record(record: Dict[str, Any]) -> ExecutionStateData:
+    return ExecutionStateData(
+        execution_id=record["execution_id"],
+        inputs=record.get("inputs") or {},
+        state=ExecutionState(record["state"]),
+        checkpoints=record.get("checkpoints") or [],
+        current_checkpoint=record.get("current_checkpoint"),
+        completed_checkpoints=record.get("completed_checkpoints") or [],
+        result=record.get("result"),
+        error=record.get("error"),
+        cursor=ExecutionCursor(**(record.get("cursor") or {})),
+        result_path=record.get("result_path"),
+        compacted=record.get("compacted", False),
+        user_id=record.get("user_id", "anonymous"),
+        priority=record.get("priority", "interactive"),
+        created_at=datetime.fromisoformat(record["created_at"]),
+        updated_at=datetime.fromisoformat(record["updated_at"])
+    )
+
+
+def _checkpoint_record(checkpoint: CheckpointState) -> Dict[str, Any]:
+    return {
+        "checkpoint_id": checkpoint.checkpoint_id,
+        "execution_id": checkpoint.execution_id,
+        "checkpoint_name": checkpoint.checkpoint_name,
+        "description": checkpoint.description,
+        "context": checkpoint.context,
+        "status": checkpoint.status.value,
+        "feedback": checkpoint.feedback,
+        "action": checkpoint.action.value if checkpoint.action else None,
+        "created_at": checkpoint.created_at.isoformat(),
+        "resolved_at": checkpoint.resolved_at.isoformat() if checkpoint.resolved_at else None,
+    }
+
+
+def _checkpoint_from_record(record: Dict[str, Any]) -> CheckpointState:
+    return CheckpointState(
+        checkpoint_id=record["checkpoint_id"],
+        execution_id=record["execution_id"],
+        checkpoint_name=record["checkpoint_name"],
+        description=record.get("description", ""),
+        context=record.get("context") or {},
+        status=CheckpointStatus(record["status"]),
+        feedback=record.get("feedback"),
+        action=FeedbackAction(record["action"]) if record.get("action") else None,
+        created_at=datetime.fromisoformat(record["created_at"]),
+        resolved_at=datetime.fromisoformat(record["resolved_at"]) if record.get("resolved_at") else None
+    )
+
+
+@dataclass
+class _Stripe:
+    """One lock stripe and the secondary indexes of the executions hashed to it."""
+    lock: Lock = field(default_factory=Lock)
+    by_state: Dict[ExecutionState, Set[str]] = field(
+        default_factory=lambda: {state: set() for state in ExecutionState}
+    )
+    pending_checkpoint_ids: Set[str] = field(default_factory=set)
+    execution_checkpoints: Dict[str, List[str]] = field(default_factory=dict)  # execution_id -> checkpoint_ids
+    result_bytes: Dict[str, int] = field(default_factory=dict)  # execution_id -> JSON size of the resident result
+
+
 class StateManager:
-    """Thread-safe state manager for HITL workflows."""
+    """
+    Thread-safe state manager for HITL workflows.
+    Locking is striped per execution (hash of execution_id), and each stripe owns the
+    secondary indexes of its executions (state -> execution IDs, pending checkpoints,
+    execution -> checkpoints, resident result sizes), so transitions, checkpoints and feedback
+    on different executions never share a lock. Health counts add up per-stripe set sizes and
+    state listings are O(k). An order lock guards the two global orderings, the created_at
+    index and the LRU of finished executions; it is taken when an execution is created,
+    finishes, is compacted or has its result read, never on checkpoint or feedback
+    transitions. Lock order: stripe, then order lock.
+    Every mutation is handed to the persistence backend (write-behind); on construction the
+    stored executions and checkpoints are loaded and the indexes rebuilt.
+    Retention: finished executions compact to a summary retention_seconds after their last
+    update, or earlier when more than max_resident finished executions hold results (LRU).
+    Compaction offloads the result to result_store; get_result loads it back lazily
+    (max_resident needs a result_store; without one, results are never offloaded).
+    Transitions, checkpoints, feedback and results are published to the EventHub (events)
+    for server-push clients.
+    """
     
-    def __init__(self):
+    def __init__(
+        self,
+        backend: Optional[StateBackend] = None,
+        lock_stripes: int = 64,
+        result_store: Optional[ResultStore] = None,
+        retention_seconds: Optional[float] = None,
+        max_resident: Optional[int] = None,
+        events: Optional[EventHub] = None
+    ):
+        if max_resident is not None and result_store is None:
+            raise ValueError("max_resident requires a result_store to offload results to")
         self._executions: Dict[str, ExecutionStateData] = {}
         self._checkpoints: Dict[str, CheckpointState] = {}
-        self._execution_checkpoints: Dict[str, List[str]] = {}  # execution_id -> checkpoint_ids
-        self._lock = Lock()
+        # checkpoint_id -> futures of coroutines parked in wait_for_checkpoint (with their loop);
+        # a checkpoint's entry is only touched under its execution's stripe
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._stripes = [_Stripe() for _ in range(max(1, lock_stripes))]
+        self._order_lock = Lock()
+        # Guarded by the order lock:
+        # (created_at, execution_id) ascending: keyset pagination for list_page
+        self._created_index: List[Tuple[datetime, str]] = []
+        # finished, not yet compacted executions in LRU order
+        self._resident: "OrderedDict[str, None]" = OrderedDict()
+        self._compacted_count = 0
+        self._result_store = result_store
+        self.retention_seconds = retention_seconds
+        self.max_resident = max_resident
+        self.events = events or EventHub()
+        self._backend = backend or MemoryStateBackend()
+        self._load()
+        self._enforce_resident_bound()  # e.g. after max_resident was lowered across a restart
+    
+    def _stripe_for(self, execution_id: str) -> _Stripe:
+        return self._stripes[hash(execution_id) % len(self._stripes)]
+    
+    def _stripe(self, execution_id: str) -> Lock:
+        return self._stripe_for(execution_id).lock
+    
+    def _load(self):
+        """
+        Rebuild in-memory state and indexes (including resident result sizes) from the backend,
+        before any other thread runs.
+        """
+        execution_records, checkpoint_records = self._backend.load()
+        for record in sorted(execution_records, key=lambda r: r["updated_at"]):
+            execution = _execution_from_record(record)
+            stripe = self._stripe_for(execution.execution_id)
+            self._executions[execution.execution_id] = execution
+            stripe.by_state[execution.state].add(execution.execution_id)
+            self._created_index.append((execution.created_at, execution.execution_id))
+            if execution.compacted:
+                self._compacted_count += 1
+                continue
+            stripe.execution_checkpoints.setdefault(execution.execution_id, [])
+            if execution.result is not None:
+                stripe.result_bytes[execution.execution_id] = len(json.dumps(execution.result, default=str))
+            if execution.state in TERMINAL_STATES:
+                self._resident[execution.execution_id] = None
+        self._created_index.sort()
+        for record in sorted(checkpoint_records, key=lambda r: r["created_at"]):
+            execution = self._executions.get(record["execution_id"])
+            if execution is not None and execution.compacted:
+                continue  # compacted executions keep no checkpoints in memory
+            checkpoint = _checkpoint_from_record(record)
+            stripe = self._stripe_for(checkpoint.execution_id)
+            self._checkpoints[checkpoint.checkpoint_id] = checkpoint
+            stripe.execution_checkpoints.setdefault(checkpoint.execution_id, []).append(
+                checkpoint.checkpoint_id
+            )
+            if checkpoint.status == CheckpointStatus.PENDING:
+                stripe.pending_checkpoint_ids.add(checkpoint.checkpoint_id)
+    
+    def _set_state(self, execution: ExecutionStateData, state: ExecutionState, emit: bool = True) -> bool:
+        """
+        Change state and keep the state index in sync. Caller holds the execution's stripe.
+        Publishes a (non-terminal) state event unless emit is False. Returns True if changed.
+        """
+        if execution.state == state:
+            return False
+        by_state = self._stripe_for(execution.execution_id).by_state
+        by_state[execution.state].discard(execution.execution_id)
+        by_state[state].add(execution.execution_id)
+        if state in TERMINAL_STATES and not execution.compacted:
+            with self._order_lock:
+                self._resident[execution.execution_id] = None
+                self._resident.move_to_end(execution.execution_id)
+        execution.state = state
+        if emit:
+            self.events.publish(execution.execution_id, "state", {"state": state.value})
+        return True
+    
+    def publish_event(self, execution_id: str, event_type: str, data: Dict[str, Any]):
+        """Publish an execution event from outside the manager (e.g. crew progress)."""
+        self.events.publish(execution_id, event_type, data)
+    
+    def _persist_execution(self, execution: ExecutionStateData):
+        """Queue an execution snapshot. Caller holds the execution's stripe."""
+        self._backend.save_execution(execution.execution_id, _execution_record(execution))
+    
+    def _persist_checkpoint(self, checkpoint: CheckpointState):
+        """Queue a checkpoint snapshot. Caller holds the execution's stripe."""
+        self._backend.save_checkpoint(checkpoint.checkpoint_id, _checkpoint_record(checkpoint))
+    
+    def recoverable_executions(self) -> List[str]:
+        """Executions that were in flight or parked at a checkpoint (re-armed after a restart)."""
+        return self.get_active_executions()
+    
+    def flush(self):
+        """Write queued state to the backend now."""
+        self._backend.flush()
+    
+    def close(self):
+        """Flush and close the persistence backend."""
+        self._backend.close()
     
     def create_execution(
         self,
         execution_id: str,
         inputs: Dict[str, Any],
-        checkpoints: List[str]
+        checkpoints: List[str],
+        user_id: str = "anonymous",
+        priority: str = "interactive"
     ) -> ExecutionStateData:
         """Create a new execution state."""
-        with self._lock:
+        with self._stripe(execution_id):
             execution = ExecutionStateData(
                 execution_id=execution_id,
                 inputs=inputs,
                 checkpoints=checkpoints,
-                state=ExecutionState.PENDING
+                state=ExecutionState.PENDING,
+                user_id=user_id,
+                priority=priority
             )
-            self._executions[execution_id] = execution
-            self._execution_checkpoints[execution_id] = []
+            stripe = self._stripe_for(execution_id)
+            previous = self._executions.get(execution_id)
+            if previous:
+                stripe.by_state[previous.state].discard(execution_id)
+                stripe.result_bytes.pop(execution_id, None)
+            stripe.execution_checkpoints[execution_id] = []
+            stripe.by_state[ExecutionState.PENDING].add(execution_id)
+            with self._order_lock:
+                if previous:
+                    self._remove_created_key((previous.created_at, execution_id))
+                    self._compacted_count -= previous.compacted
+                    self._resident.pop(execution_id, None)
+                self._executions[execution_id] = execution
+                key = (execution.created_at, execution_id)
+                if not self._created_index or self._created_index[-1] < key:
+                    self._created_index.append(key)  # usual case: newest execution
+                else:
+                    bisect.insort(self._created_index, key)
+            self._persist_execution(execution)
+            self.events.publish(execution_id, "state", {"state": ExecutionState.PENDING.value})
             return execution
     
     def get_execution(self, execution_id: str) -> Optional[ExecutionStateData]:
         """Get execution state."""
-        with self._lock:
-            return self._executions.get(execution_id)
+        return self._executions.get(execution_id)
     
     def update_execution_state(
         self,
@@ -109,18 +388,86 @@ class StateManager:
         error: Optional[str] = None
     ) -> bool:
         """Update execution state."""
-        with self._lock:
+        with self._stripe(execution_id):
             execution = self._executions.get(execution_id)
             if not execution:
                 return False
             
-            execution.state = state
+            changed = self._set_state(execution, state, emit=False)
             execution.updated_at = datetime.now()
             if result is not None:
                 execution.result = result
+                self._stripe_for(execution_id).result_bytes[execution_id] = len(json.dumps(result, default=str))
             if error is not None:
                 execution.error = error
             
+            self._persist_execution(execution)
+            if result is not None:
+                self.events.publish(execution_id, "result", {"result": result})
+            if changed or state in TERMINAL_STATES:
+                self.events.publish(
+                    execution_id,
+                    "state",
+                    {"state": state.value, "error": execution.error},
+                    terminal=state in TERMINAL_STATES
+                )
+        
+        if state in TERMINAL_STATES:
+            self._enforce_resident_bound()
+        return True
+    
+    def get_cursor(self, execution_id: str) -> Optional[ExecutionCursor]:
+        """Snapshot of an execution's cursor (safe to read without the lock)."""
+        with self._stripe(execution_id):
+            execution = self._executions.get(execution_id)
+            if not execution:
+                return None
+            cursor = execution.cursor
+            return ExecutionCursor(
+                next_phase=cursor.next_phase,
+                task_outputs=dict(cursor.task_outputs),
+                applied_feedback=list(cursor.applied_feedback),
+                pending_checkpoint=cursor.pending_checkpoint,
+                revision_feedback=cursor.revision_feedback
+            )
+    
+    def record_phase_outputs(
+        self,
+        execution_id: str,
+        task_outputs: Dict[str, Dict[str, Any]],
+        checkpoint_id: Optional[str] = None
+    ) -> bool:
+        """Store a phase's task outputs; checkpoint_id marks the phase as awaiting review."""
+        with self._stripe(execution_id):
+            execution = self._executions.get(execution_id)
+            if not execution:
+                return False
+            execution.cursor.task_outputs.update(task_outputs)
+            execution.cursor.pending_checkpoint = checkpoint_id
+            execution.cursor.revision_feedback = None
+            execution.updated_at = datetime.now()
+            self._persist_execution(execution)
+            return True
+    
+    def advance_cursor(
+        self,
+        execution_id: str,
+        next_phase: int,
+        feedback: Optional[Dict[str, Any]] = None,
+        revision_feedback: Optional[str] = None
+    ) -> bool:
+        """Move the cursor to next_phase, recording the feedback that was applied."""
+        with self._stripe(execution_id):
+            execution = self._executions.get(execution_id)
+            if not execution:
+                return False
+            execution.cursor.next_phase = next_phase
+            execution.cursor.pending_checkpoint = None
+            execution.cursor.revision_feedback = revision_feedback
+            if feedback is not None:
+                execution.cursor.applied_feedback.append(feedback)
+            execution.updated_at = datetime.now()
+            self._persist_execution(execution)
             return True
     
     def create_checkpoint(
@@ -133,7 +480,7 @@ class StateManager:
         """Create a new checkpoint."""
         checkpoint_id = str(uuid.uuid4())
         
-        with self._lock:
+        with self._stripe(execution_id):
             checkpoint = CheckpointState(
                 checkpoint_id=checkpoint_id,
                 execution_id=execution_id,
@@ -141,25 +488,33 @@ class StateManager:
                 description=description,
                 context=context
             )
-            self._checkpoints[checkpoint_id] = checkpoint
             
             # Link to execution
-            if execution_id not in self._execution_checkpoints:
-                self._execution_checkpoints[execution_id] = []
-            self._execution_checkpoints[execution_id].append(checkpoint_id)
+            stripe = self._stripe_for(execution_id)
+            self._checkpoints[checkpoint_id] = checkpoint
+            stripe.execution_checkpoints.setdefault(execution_id, []).append(checkpoint_id)
+            stripe.pending_checkpoint_ids.add(checkpoint_id)
             
             # Update execution state
             execution = self._executions.get(execution_id)
+            self.events.publish(execution_id, "checkpoint", {
+                "checkpoint_id": checkpoint_id,
+                "checkpoint_name": checkpoint_name,
+                "description": description,
+                "context": context
+            })
             if execution:
                 execution.current_checkpoint = checkpoint_id
-                execution.state = ExecutionState.WAITING_FEEDBACK
+                self._set_state(execution, ExecutionState.WAITING_FEEDBACK)
                 execution.updated_at = datetime.now()
+                self._persist_execution(execution)
+            self._persist_checkpoint(checkpoint)
         
         return checkpoint
     
     def get_pending_checkpoint(self, execution_id: str) -> Optional[CheckpointState]:
         """Get current pending checkpoint for an execution."""
-        with self._lock:
+        with self._stripe(execution_id):
             execution = self._executions.get(execution_id)
             if not execution or not execution.current_checkpoint:
                 return None
@@ -180,7 +535,7 @@ class StateManager:
         feedback: Optional[str] = None
     ) -> bool:
         """Submit feedback for a checkpoint."""
-        with self._lock:
+        with self._stripe(execution_id):
             checkpoint = self._checkpoints.get(checkpoint_id)
             if not checkpoint or checkpoint.execution_id != execution_id:
                 return False
@@ -202,6 +557,13 @@ class StateManager:
                 checkpoint.status = CheckpointStatus.REVISED
             elif action == FeedbackAction.SKIP:
                 checkpoint.status = CheckpointStatus.SKIPPED
+            self._stripe_for(execution_id).pending_checkpoint_ids.discard(checkpoint_id)
+            
+            self.events.publish(execution_id, "feedback", {
+                "checkpoint_id": checkpoint_id,
+                "action": action.value,
+                "feedback": feedback
+            })
             
             # Update execution
             execution = self._executions.get(execution_id)
@@ -211,15 +573,26 @@ class StateManager:
                 execution.updated_at = datetime.now()
                 
                 if action == FeedbackAction.STOP:
-                    execution.state = ExecutionState.STOPPED
+                    self._set_state(execution, ExecutionState.STOPPED)
                 elif action in [FeedbackAction.CONTINUE, FeedbackAction.SKIP]:
-                    execution.state = ExecutionState.RUNNING
+                    self._set_state(execution, ExecutionState.RUNNING)
+                self._persist_execution(execution)
             
-            return True
+            self._persist_checkpoint(checkpoint)
+            self._notify_waiters(checkpoint_id)
+        
+        if action == FeedbackAction.STOP:
+            self._enforce_resident_bound()  # the execution just finished
+        return True
+    
+    def _checkpoint_stripe(self, checkpoint_id: str) -> Lock:
+        """Stripe of the checkpoint's execution (checkpoints never move between executions)."""
+        checkpoint = self._checkpoints.get(checkpoint_id)
+        return self._stripe(checkpoint.execution_id if checkpoint else checkpoint_id)
     
     def get_checkpoint_feedback(self, checkpoint_id: str) -> Optional[Dict[str, Any]]:
         """Get feedback for a checkpoint."""
-        with self._lock:
+        with self._checkpoint_stripe(checkpoint_id):
             checkpoint = self._checkpoints.get(checkpoint_id)
             if not checkpoint or checkpoint.status == CheckpointStatus.PENDING:
                 return None
@@ -230,38 +603,287 @@ class StateManager:
                 "status": checkpoint.status.value
             }
     
+    async def wait_for_checkpoint(
+        self,
+        checkpoint_id: str,
+        timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Wait until a checkpoint is resolved or its execution is cancelled.
+        Parks on a future signalled by submit_feedback/cancel_execution, so idle waiters
+        take no lock and wake immediately. Returns False on timeout.
+        """
+        loop = asyncio.get_running_loop()
+        stripe = self._checkpoint_stripe(checkpoint_id)
+        with stripe:
+            if self._is_settled(checkpoint_id):
+                return True
+            future = loop.create_future()
+            self._waiters.setdefault(checkpoint_id, []).append((loop, future))
+        
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with stripe:
+                waiters = self._waiters.get(checkpoint_id)
+                if waiters:
+                    waiters[:] = [w for w in waiters if w[1] is not future]
+                    if not waiters:
+                        del self._waiters[checkpoint_id]
+    
+    def _is_settled(self, checkpoint_id: str) -> bool:
+        """Checkpoint resolved, missing, or execution cancelled. Caller holds the stripe."""
+        checkpoint = self._checkpoints.get(checkpoint_id)
+        if not checkpoint or checkpoint.status != CheckpointStatus.PENDING:
+            return True
+        execution = self._executions.get(checkpoint.execution_id)
+        return bool(execution and execution.state == ExecutionState.CANCELLED)
+    
+    def _notify_waiters(self, checkpoint_id: str):
+        """Wake coroutines waiting on a checkpoint. Caller holds the stripe; safe from any thread."""
+        for loop, future in self._waiters.pop(checkpoint_id, []):
+            loop.call_soon_threadsafe(_resolve_future, future)
+    
     def cancel_execution(self, execution_id: str) -> bool:
         """Cancel an execution."""
-        with self._lock:
+        with self._stripe(execution_id):
             execution = self._executions.get(execution_id)
             if not execution:
                 return False
             
-            execution.state = ExecutionState.CANCELLED
+            self._set_state(execution, ExecutionState.CANCELLED, emit=False)
             execution.updated_at = datetime.now()
+            self._persist_execution(execution)
+            self.events.publish(
+                execution_id, "state", {"state": ExecutionState.CANCELLED.value}, terminal=True
+            )
+            for checkpoint_id in list(self._stripe_for(execution_id).execution_checkpoints.get(execution_id, [])):
+                self._notify_waiters(checkpoint_id)
             return True
     
     def get_active_executions(self) -> List[str]:
-        """Get list of active execution IDs."""
-        with self._lock:
-            return [
-                eid for eid, exec_data in self._executions.items()
-                if exec_data.state in [
-                    ExecutionState.RUNNING,
-                    ExecutionState.WAITING_FEEDBACK,
-                    ExecutionState.PENDING
-                ]
-            ]
+        """Get list of active execution IDs (O(k) from the state index)."""
+        return self.executions_in_states(
+            ExecutionState.RUNNING,
+            ExecutionState.WAITING_FEEDBACK,
+            ExecutionState.PENDING
+        )
+    
+    def executions_in_states(self, *states: ExecutionState) -> List[str]:
+        """IDs of executions currently in any of the given states."""
+        ids: List[str] = []
+        for stripe in self._stripes:
+            with stripe.lock:
+                for state in states:
+                    ids.extend(stripe.by_state[state])
+        return ids
+    
+    def count_executions(self, *states: ExecutionState) -> int:
+        """
+        Number of executions in the given states (all states if none given): one set size per
+        stripe and state, read without locks (len() is atomic), so concurrent transitions may
+        be counted in either state.
+        """
+        return sum(
+            len(stripe.by_state[state]) for stripe in self._stripes for state in (states or ExecutionState)
+        )
+    
+    def count_active_executions(self) -> int:
+        """Number of pending, running or waiting executions."""
+        return self.count_executions(
+            ExecutionState.RUNNING,
+            ExecutionState.WAITING_FEEDBACK,
+            ExecutionState.PENDING
+        )
     
     def get_pending_checkpoints(self) -> List[str]:
         """Get list of pending checkpoint IDs."""
-        with self._lock:
-            return [
-                cid for cid, checkpoint in self._checkpoints.items()
-                if checkpoint.status == CheckpointStatus.PENDING
-            ]
-    
-    def list_executions(self) -> List[ExecutionStateData]:
-        """List all executions."""
-        with self._lock:
-            return list(self._executions.values())
+        ids: List[str] = []
+        for stripe in self._stripes:
+            with stripe.lock:
+                ids.extend(stripe.pending_checkpoint_ids)
+        return ids
+    
+    def count_pending_checkpoints(self) -> int:
+        """Number of checkpoints awaiting feedback (per-stripe set sizes, read without locks)."""
+        return sum(len(stripe.pending_checkpoint_ids) for stripe in self._stripes)
+    
+    def list_executions(self, state: Optional[ExecutionState] = None) -> List[ExecutionStateData]:
+        """List all executions, or only those in one state (via the state index)."""
+        if state is None:
+            with self._order_lock:
+                return list(self._executions.values())
+        return [self._executions[eid] for eid in self.executions_in_states(state)]
+    
+    def _remove_created_key(self, key: Tuple[datetime, str]):
+        """Caller holds the order lock."""
+        i = bisect.bisect_left(self._created_index, key)
+        if i < len(self._created_index) and self._created_index[i] == key:
+            del self._created_index[i]
+    
+    def list_page(
+        self,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, str]] = None,
+        states: Optional[Iterable[ExecutionState]] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        descending: bool = True
+    ) -> Tuple[List[ExecutionStateData], Optional[Tuple[datetime, str]]]:
+        """
+        Keyset page ordered by (created_at, execution_id), newest first unless descending
+        is False. after is the key of the last row of the previous page; returns the rows
+        and the key to pass for the next page (None on the last page).
+        Selective state filters read the state index (O(k log limit)); otherwise the
+        created_at index is walked from the cursor, bounded by the time window.
+        """
+        limit = max(1, limit)
+        wanted = set(states) if states else None
+        
+        def in_window(key: Tuple[datetime, str]) -> bool:
+            if created_from is not None and key[0] < created_from:
+                return False
+            if created_to is not None and key[0] >= created_to:
+                return False
+            if after is not None and (key >= after if descending else key <= after):
+                return False
+            return True
+        
+        if wanted is not None and self.count_executions(*wanted) * 4 < len(self._created_index):
+            keys = ((self._executions[eid].created_at, eid) for eid in self.executions_in_states(*wanted))
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            page_keys = pick(limit + 1, (k for k in keys if in_window(k)))
+        else:
+            with self._order_lock:
+                total = len(self._created_index)
+                index = self._created_index
+                if descending:
+                    hi = total
+                    if created_to is not None:
+                        hi = bisect.bisect_left(index, (created_to, ""))
+                    if after is not None:
+                        hi = min(hi, bisect.bisect_left(index, after))
+                    positions = range(hi - 1, -1, -1)
+                else:
+                    lo = 0
+                    if created_from is not None:
+                        lo = bisect.bisect_left(index, (created_from, ""))
+                    if after is not None:
+                        lo = max(lo, bisect.bisect_right(index, after))
+                    positions = range(lo, total)
+                page_keys = []
+                for i in positions:
+                    key = index[i]
+                    if not in_window(key):
+                        break  # walked past the time window
+                    if wanted is None or self._executions[key[1]].state in wanted:
+                        page_keys.append(key)
+                        if len(page_keys) > limit:
+                            break
+        has_more = len(page_keys) > limit
+        page_keys = page_keys[:limit]
+        rows = [self._executions[eid] for _, eid in page_keys]
+        return rows, (page_keys[-1] if has_more else None)
+    
+    def status_snapshot(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """Current status as an event payload (sent when a stream cannot resume exactly)."""
+        with self._stripe(execution_id):
+            execution = self._executions.get(execution_id)
+            if not execution:
+                return None
+            return {
+                "state": execution.state.value,
+                "current_checkpoint": execution.current_checkpoint,
+                "completed_checkpoints": list(execution.completed_checkpoints),
+                "error": execution.error,
+                "terminal": execution.state in TERMINAL_STATES
+            }
+    
+    def get_result(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """Execution result, loaded from the result store if it was offloaded."""
+        with self._stripe(execution_id):
+            execution = self._executions.get(execution_id)
+            if not execution:
+                return None
+            if execution.result is not None or not execution.result_path:
+                with self._order_lock:
+                    if execution_id in self._resident:
+                        self._resident.move_to_end(execution_id)
+                return execution.result
+            result_path = execution.result_path
+        return self._result_store.load(result_path) if self._result_store else None
+    
+    def compact_executions(self, now: Optional[datetime] = None) -> int:
+        """Compact finished executions past retention and enforce the resident bound."""
+        compacted = 0
+        if self.retention_seconds is not None:
+            now = now or datetime.now()
+            with self._order_lock:
+                candidates = list(self._resident)
+            for execution_id in candidates:
+                execution = self._executions.get(execution_id)
+                if execution and (now - execution.updated_at).total_seconds() >= self.retention_seconds:
+                    compacted += self._compact(execution_id)
+        return compacted + self._enforce_resident_bound()
+    
+    def _enforce_resident_bound(self) -> int:
+        """Compact least recently used finished executions beyond max_resident."""
+        if self.max_resident is None:
+            return 0
+        with self._order_lock:
+            excess = len(self._resident) - self.max_resident
+            victims = list(self._resident)[:excess] if excess > 0 else []
+        return sum(self._compact(execution_id) for execution_id in victims)
+    
+    def _compact(self, execution_id: str) -> int:
+        """Reduce a finished execution to its summary. Returns 1 if it was compacted."""
+        with self._stripe(execution_id):
+            execution = self._executions.get(execution_id)
+            if not execution or execution.compacted or execution.state not in TERMINAL_STATES:
+                with self._order_lock:
+                    self._resident.pop(execution_id, None)
+                return 0
+            if execution.result is not None:
+                if self._result_store is None:
+                    # Nowhere to offload: keep the result, but stop offering it for compaction
+                    with self._order_lock:
+                        self._resident.pop(execution_id, None)
+                    return 0
+                execution.result_path = self._result_store.save(execution_id, execution.result)
+                execution.result = None
+            execution.cursor = ExecutionCursor(next_phase=execution.cursor.next_phase)
+            execution.compacted = True
+            stripe = self._stripe_for(execution_id)
+            stripe.result_bytes.pop(execution_id, None)
+            for checkpoint_id in stripe.execution_checkpoints.pop(execution_id, []):
+                self._checkpoints.pop(checkpoint_id, None)
+                stripe.pending_checkpoint_ids.discard(checkpoint_id)
+            with self._order_lock:
+                self._compacted_count += 1
+                self._resident.pop(execution_id, None)
+            self._persist_execution(execution)
+            self.events.forget(execution_id)
+            return 1
+    
+    def memory_stats(self) -> Dict[str, Any]:
+        """Gauges for /health: resident vs. compacted executions, checkpoints, result bytes, RSS."""
+        result_bytes = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                result_bytes += sum(stripe.result_bytes.values())
+        with self._order_lock:
+            stats = {
+                "executions": len(self._executions),
+                "resident_finished_executions": len(self._resident),
+                "compacted_executions": self._compacted_count,
+                "resident_checkpoints": len(self._checkpoints),
+                "resident_result_bytes": result_bytes,
+                "max_resident": self.max_resident,
+                "retention_seconds": self.retention_seconds
+            }
+        if resource is not None:
+            stats["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return stats
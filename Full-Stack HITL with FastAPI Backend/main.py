@@ -3,15 +3,18 @@ FastAPI Backend for Full-Stack Human-In-The-Loop (HITL) Workflows
 Provides REST API endpoints for CrewAI execution with human feedback checkpoints.
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Header, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 import uuid
+import base64
+import json
 import asyncio
 from datetime import datetime
 from enum import Enum
+import os
 import sys
 from pathlib import Path
 
@@ -25,6 +28,10 @@ from hitl_state_manager import (
     FeedbackAction
 )
 from crew_integration import CrewExecutor
+from hitl_scheduler import CrewScheduler, QueueFullError, PRIORITIES
+from hitl_artifacts import ArtifactStore, content_type_of, parse_range
+from hitl_events import EventHub
+from hitl_persistence import create_backend_from_env, create_result_store_from_env
 
 app = FastAPI(
     title="BAGANA AI HITL Backend",
@@ -41,9 +48,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize state manager and crew executor
-state_manager = StateManager()
-crew_executor = CrewExecutor(state_manager)
+# Initialize state manager (persistent, see HITL_STATE_BACKEND) and crew executor.
+# Finished executions compact to a summary after HITL_RETENTION_MINUTES (results offloaded
+# to HITL_RESULTS_DIR); at most HITL_MAX_RESIDENT_EXECUTIONS finished ones stay resident.
+state_manager = StateManager(
+    create_backend_from_env(),
+    result_store=create_result_store_from_env(),
+    retention_seconds=float(os.getenv("HITL_RETENTION_MINUTES", "30")) * 60,
+    max_resident=int(os.getenv("HITL_MAX_RESIDENT_EXECUTIONS", "500")),
+    events=EventHub(buffer_size=int(os.getenv("HITL_EVENT_BUFFER", "256")))
+)
+EVENT_KEEPALIVE_SEC = 15
+# At most HITL_MAX_CONCURRENT_CREWS crew subprocesses; HITL_MAX_QUEUE runs may wait for a slot
+scheduler = CrewScheduler(
+    max_concurrency=int(os.getenv("HITL_MAX_CONCURRENT_CREWS", "2")),
+    max_queue=int(os.getenv("HITL_MAX_QUEUE", "20"))
+)
+# Task outputs are stored once as content-addressed artifacts (HITL_ARTIFACTS_DIR)
+artifact_store = ArtifactStore(
+    os.getenv("HITL_ARTIFACTS_DIR") or str(Path(__file__).parent / "hitl_artifacts")
+)
+crew_executor = CrewExecutor(state_manager, scheduler, artifact_store)
+COMPACT_INTERVAL_SEC = float(os.getenv("HITL_COMPACT_INTERVAL_SEC", "60"))
+
+
+async def _compaction_loop():
+    """Periodically compact finished executions past retention (file writes off the event loop)."""
+    while True:
+        await asyncio.sleep(COMPACT_INTERVAL_SEC)
+        try:
+            await asyncio.to_thread(state_manager.compact_executions)
+        except Exception as e:
+            print(f"[hitl] compaction failed: {e}")
+
+
+@app.on_event("startup")
+async def rearm_executions():
+    """Re-arm executions restored from the state backend: parked ones wait on their checkpoint again."""
+    for execution_id in state_manager.recoverable_executions():
+        asyncio.create_task(crew_executor.resume_execution(execution_id))
+    asyncio.create_task(_compaction_loop())
+
+
+@app.on_event("shutdown")
+async def close_state():
+    """Flush write-behind state before exit."""
+    state_manager.close()
 
 
 # Request/Response Models
@@ -57,6 +107,8 @@ class CrewRequest(BaseModel):
         default=["after_planning", "after_analysis"],
         description="List of checkpoint names to enable"
     )
+    user_id: Optional[str] = Field(default=None, description="Fairness key for queued runs")
+    priority: str = Field(default="interactive", description="interactive or batch")
 
 
 class FeedbackRequest(BaseModel):
@@ -86,6 +138,7 @@ class ExecutionStatusResponse(BaseModel):
     completed_checkpoints: List[str]
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    queue_position: Optional[int] = None  # 1-based while the next crew run waits for a slot
 
 
 # API Endpoints
@@ -105,23 +158,41 @@ async def health():
     """Detailed health check."""
     return {
         "status": "healthy",
-        "active_executions": len(state_manager.get_active_executions()),
-        "pending_checkpoints": len(state_manager.get_pending_checkpoints())
+        "active_executions": state_manager.count_active_executions(),
+        "pending_checkpoints": state_manager.count_pending_checkpoints(),
+        "crew_runs": {
+            "running": scheduler.running,
+            "queued": scheduler.queued,
+            "reserved": scheduler.reserved,
+            "max_concurrency": scheduler.max_concurrency,
+            "max_queue": scheduler.max_queue
+        },
+        "memory": state_manager.memory_stats()
     }
 
 
 @app.post("/api/crew/execute", response_model=ExecutionStatusResponse)
 async def execute_crew(
     request: CrewRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    http_request: Request
 ):
     """
     Execute CrewAI workflow with HITL checkpoints.
     
     Returns execution_id immediately and processes in background.
     Use /api/crew/status/{execution_id} to check progress.
+    Returns 429 with Retry-After when the crew run queue is full.
     """
+    priority = request.priority.lower()
+    if priority not in PRIORITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid priority. Must be one of: {list(PRIORITIES)}"
+        )
     execution_id = str(uuid.uuid4())
+    user_id = request.user_id or (http_request.client.host if http_request.client else "anonymous")
+    _reserve_run(execution_id, user_id, priority)
     
     # Prepare inputs
     inputs = {
@@ -134,11 +205,17 @@ async def execute_crew(
         inputs["output_language"] = request.language
     
     # Initialize execution state
-    state_manager.create_execution(
-        execution_id=execution_id,
-        inputs=inputs,
-        checkpoints=request.checkpoints
-    )
+    try:
+        state_manager.create_execution(
+            execution_id=execution_id,
+            inputs=inputs,
+            checkpoints=request.checkpoints,
+            user_id=user_id,
+            priority=priority
+        )
+    except Exception:
+        scheduler.release_reservation(execution_id)
+        raise
     
     # Start execution in background
     background_tasks.add_task(
@@ -158,6 +235,18 @@ async def execute_crew(
     )
 
 
+def _reserve_run(execution_id: str, user_id: str, priority: str):
+    """Reserve a crew run slot for the execution, or answer 429 with Retry-After."""
+    try:
+        scheduler.reserve(execution_id, user_id, priority)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
 @app.get("/api/crew/status/{execution_id}", response_model=ExecutionStatusResponse)
 async def get_execution_status(execution_id: str):
     """Get current status of an execution."""
@@ -171,8 +260,130 @@ async def get_execution_status(execution_id: str):
         status=execution.state.value,
         current_checkpoint=execution.current_checkpoint,
         completed_checkpoints=execution.completed_checkpoints,
-        result=execution.result,
-        error=execution.error
+        result=state_manager.get_result(execution_id),
+        error=execution.error,
+        queue_position=scheduler.position(execution_id)
+    )
+
+
+def _parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+@app.get("/api/crew/events/{execution_id}")
+async def stream_execution_events(
+    execution_id: str,
+    last_event_id: Optional[str] = Header(default=None),
+    from_id: Optional[str] = None
+):
+    """
+    Server-Sent Events stream of an execution: state, checkpoint, feedback, progress, result.
+    Reconnects resume after Last-Event-ID (header, or ?from_id= for clients that cannot set it)
+    from a bounded per-execution buffer; if that id is no longer buffered a `snapshot` event
+    with the current status is sent first. The stream ends after the final state event.
+    """
+    snapshot = state_manager.status_snapshot(execution_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    
+    async def event_source():
+        events = state_manager.events.stream(
+            execution_id,
+            _parse_last_event_id(last_event_id or from_id),
+            snapshot=snapshot,
+            keepalive=EVENT_KEEPALIVE_SEC
+        )
+        async for event in events:
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            lines = f"event: {event.type}\ndata: {json.dumps(event.data)}\n\n"
+            yield (f"id: {event.id}\n" if event.id else "") + lines
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.websocket("/api/crew/ws/{execution_id}")
+async def execution_events_websocket(websocket: WebSocket, execution_id: str, last_event_id: Optional[str] = None):
+    """WebSocket variant of /api/crew/events: one JSON message {id, event, data} per event."""
+    snapshot = state_manager.status_snapshot(execution_id)
+    await websocket.accept()
+    if snapshot is None:
+        await websocket.close(code=4404, reason="Execution not found")
+        return
+    try:
+        events = state_manager.events.stream(
+            execution_id,
+            _parse_last_event_id(last_event_id),
+            snapshot=snapshot,
+            keepalive=EVENT_KEEPALIVE_SEC
+        )
+        async for event in events:
+            if event is None:
+                await websocket.send_json({"event": "keepalive"})
+                continue
+            await websocket.send_json(event.to_dict())
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+@app.api_route("/api/crew/artifacts/{artifact_id}", methods=["GET", "HEAD"])
+async def get_artifact(
+    artifact_id: str,
+    http_request: Request,
+    range_header: Optional[str] = Header(default=None, alias="Range"),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """
+    Artifact bytes referenced from status results and checkpoint context (output_ref, parsed_ref).
+    Artifacts are immutable: the ETag is the artifact id, so If-None-Match answers 304 and
+    clients never re-download an unchanged body. Supports single Range requests (206/416).
+    """
+    path = artifact_store.locate(artifact_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    
+    etag = f'"{artifact_id}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=31536000, immutable"
+    }
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    
+    size = path.stat().st_size
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    
+    start, end = byte_range if byte_range else (0, size - 1)
+    length = max(0, end - start + 1)
+    body = b""
+    if http_request.method != "HEAD" and length:
+        def read_slice() -> bytes:
+            with open(path, "rb") as f:
+                f.seek(start)
+                return f.read(length)
+        body = await asyncio.to_thread(read_slice)
+    
+    headers["Content-Length"] = str(length)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(
+        content=body,
+        status_code=206 if byte_range else 200,
+        media_type=content_type_of(artifact_id),
+        headers=headers
     )
 
 
@@ -222,6 +433,12 @@ async def submit_feedback(request: FeedbackRequest):
             detail=f"Invalid action. Must be one of: {[a.value for a in FeedbackAction]}"
         )
     
+    # Continuing, skipping or revising runs the crew again: admit that run before accepting
+    if action != FeedbackAction.STOP:
+        execution = state_manager.get_execution(request.execution_id)
+        if execution:
+            _reserve_run(request.execution_id, execution.user_id, execution.priority)
+    
     # Submit feedback
     success = state_manager.submit_feedback(
         execution_id=request.execution_id,
@@ -231,14 +448,15 @@ async def submit_feedback(request: FeedbackRequest):
     )
     
     if not success:
+        scheduler.release_reservation(request.execution_id)
         raise HTTPException(
             status_code=404,
             detail="Checkpoint not found or already processed"
         )
     
-    # Resume execution if action is continue or skip
-    if action in [FeedbackAction.CONTINUE, FeedbackAction.SKIP]:
-        # Trigger execution continuation (in background)
+    # Resume execution if action is continue, skip or revise
+    if action != FeedbackAction.STOP:
+        # No-op while the driver is alive (it wakes on the feedback); otherwise continue from the cursor
         asyncio.create_task(
             crew_executor.resume_execution(request.execution_id)
         )
@@ -251,20 +469,93 @@ async def submit_feedback(request: FeedbackRequest):
     }
 
 
+EXECUTION_FIELDS = {
+    "execution_id": lambda e: e.execution_id,
+    "status": lambda e: e.state.value,
+    "created_at": lambda e: e.created_at.isoformat(),
+    "updated_at": lambda e: e.updated_at.isoformat(),
+    "current_checkpoint": lambda e: e.current_checkpoint,
+    "completed_checkpoints": lambda e: list(e.completed_checkpoints),
+    "checkpoints": lambda e: list(e.checkpoints),
+    "error": lambda e: e.error,
+    "user_id": lambda e: e.user_id,
+    "priority": lambda e: e.priority,
+    "compacted": lambda e: e.compacted,
+}
+DEFAULT_EXECUTION_FIELDS = ["execution_id", "status", "created_at", "current_checkpoint"]
+MAX_PAGE_SIZE = 1000
+
+
+def _encode_cursor(key) -> str:
+    created_at, execution_id = key
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{execution_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, execution_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), execution_id
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _parse_time(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: expected ISO 8601 timestamp")
+
+
 @app.get("/api/crew/executions")
-async def list_executions():
-    """List all executions (for debugging/admin)."""
-    executions = state_manager.list_executions()
+async def list_executions(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    state: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    fields: Optional[str] = None,
+    order: str = "desc"
+):
+    """
+    List executions (for debugging/admin), keyset-paginated by created_at.
+    
+    - limit: page size (max 1000); pass next_cursor back as cursor for the next page
+    - state: comma-separated states, e.g. waiting_feedback,running
+    - created_after / created_before: ISO 8601 time window [after, before)
+    - fields: comma-separated projection (default: execution_id,status,created_at,current_checkpoint)
+    - order: desc (newest first, default) or asc
+    """
+    try:
+        states = [ExecutionState(v.strip().lower()) for v in state.split(",") if v.strip()] if state else None
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid state. Must be one of: {[s.value for s in ExecutionState]}"
+        )
+    projection = [f.strip() for f in fields.split(",") if f.strip()] if fields else DEFAULT_EXECUTION_FIELDS
+    unknown = [f for f in projection if f not in EXECUTION_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields {unknown}. Available: {list(EXECUTION_FIELDS)}"
+        )
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    
+    executions, next_key = state_manager.list_page(
+        limit=min(max(limit, 1), MAX_PAGE_SIZE),
+        after=_decode_cursor(cursor) if cursor else None,
+        states=states,
+        created_from=_parse_time(created_after, "created_after"),
+        created_to=_parse_time(created_before, "created_before"),
+        descending=order == "desc"
+    )
+    getters = [(name, EXECUTION_FIELDS[name]) for name in projection]
     return {
-        "executions": [
-            {
-                "execution_id": e.execution_id,
-                "status": e.state.value,
-                "created_at": e.created_at.isoformat(),
-                "current_checkpoint": e.current_checkpoint
-            }
-            for e in executions
-        ]
+        "executions": [{name: get(e) for name, get in getters} for e in executions],
+        "next_cursor": _encode_cursor(next_key) if next_key else None
     }
 
 
@@ -2,22 +2,29 @@
 Simple REST API for CrewAI — GET and POST only
 Aligns with project-context/2.build/integration.md contract.
 
-GET  /api/crew  — Health/description (no execution)
-POST /api/crew  — Execute crew with JSON body { message?, user_input?, campaign_context?, language? }
-Response: { status, output?, task_outputs? } or { status, error }
+GET  /api/crew            — Health/description (no execution)
+POST /api/crew            — Execute crew with JSON body { message?, user_input?, campaign_context?, language? }
+                            Response: { status, output?, task_outputs? } or { status, error }
+POST /api/crew?async=1    — Queue the run; 202 with { job_id, status_url }
+GET  /api/crew/jobs/{id}  — Job status/result; ?wait=N long-polls, ETag / If-None-Match for 304
 """
 
+import asyncio
+import os
 import sys
 import json
-import subprocess
+import time
+import uuid
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 # Add parent so crew.run is importable
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
 
 app = FastAPI(
@@ -32,10 +39,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Location", "Retry-After"],
 )
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 CREW_TIMEOUT_SEC = 300
+MAX_CONCURRENT_CREWS = int(os.getenv("CREW_MAX_CONCURRENT", "2"))  # crew subprocesses at once
+MAX_PENDING_JOBS = int(os.getenv("CREW_MAX_PENDING", "20"))  # queued + running before 429
+JOB_TTL_SEC = int(os.getenv("CREW_JOB_TTL_SEC", "3600"))  # finished jobs kept this long
+MAX_WAIT_SEC = 60  # cap for ?wait= long-polls
 
 
 class PostBody(BaseModel):
@@ -53,37 +65,194 @@ def get_python_cmd() -> str:
     return "python3" if platform.system() != "Windows" else "python"
 
 
-def run_crew_stdin(payload: Dict[str, Any]) -> Dict[str, Any]:
+async def run_crew_stdin(payload: Dict[str, Any]) -> Dict[str, Any]:
     """Spawn python -m crew.run --stdin; write JSON to stdin, read JSON from stdout."""
     python_cmd = get_python_cmd()
     input_json = json.dumps(payload)
     try:
-        result = subprocess.run(
-            [python_cmd, "-m", "crew.run", "--stdin"],
+        proc = await asyncio.create_subprocess_exec(
+            python_cmd, "-m", "crew.run", "--stdin",
             cwd=str(PROJECT_ROOT),
-            input=input_json.encode(),
-            capture_output=True,
-            timeout=CREW_TIMEOUT_SEC,
-            env={**dict(__import__("os").environ)},
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ},
         )
-        out = result.stdout.decode().strip()
-        if not out:
-            err = result.stderr.decode().strip()
-            return {"status": "error", "error": err or "No output from crew"}
-        try:
-            return json.loads(out)
-        except json.JSONDecodeError:
-            return {"status": "error", "error": f"Invalid JSON: {out[:200]}"}
-    except subprocess.TimeoutExpired:
-        return {"status": "error", "error": "Crew execution timed out"}
     except FileNotFoundError:
         return {"status": "error", "error": f"Python/crew not found: {python_cmd}"}
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(input_json.encode()), CREW_TIMEOUT_SEC)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return {"status": "error", "error": "Crew execution timed out"}
+    except asyncio.CancelledError:
+        proc.kill()
+        await proc.wait()
+        raise
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+    out = stdout.decode().strip()
+    if not out:
+        err = stderr.decode().strip()
+        return {"status": "error", "error": err or "No output from crew"}
+    try:
+        return json.loads(out)
+    except json.JSONDecodeError:
+        return {"status": "error", "error": f"Invalid JSON: {out[:200]}"}
+
+
+# ---------------------------------------------------------------------------
+# Jobs: every run (sync or ?async=1) goes through one bounded executor so the
+# number of crew subprocesses is capped and request handlers never block a thread.
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Job:
+    job_id: str
+    payload: Dict[str, Any]
+    status: str = "queued"  # queued | running | completed | error
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    version: int = 0
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "error")
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.job_id}-{self.version}"'
+
+    def update(self, **fields):
+        """Apply a transition and wake long-pollers waiting on the previous version."""
+        for key, value in fields.items():
+            setattr(self, key, value)
+        self.version += 1
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.done:
+            data["result"] = self.result
+        return data
+
+
+class JobExecutor:
+    """
+    Runs crew jobs with at most max_concurrency subprocesses; at most max_pending jobs may be
+    queued or running. Finished jobs are kept for ttl seconds for GET /api/crew/jobs/{id}.
+    Single event loop only.
+    """
+
+    def __init__(self, max_concurrency: int, max_pending: int, ttl: int):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.jobs: Dict[str, Job] = {}
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, payload: Dict[str, Any]) -> Optional[Job]:
+        """Queue a job; None when the executor is at capacity."""
+        self._evict_expired()
+        if self.pending >= self.max_pending:
+            return None
+        job = Job(job_id=str(uuid.uuid4()), payload=payload)
+        self.jobs[job.job_id] = job
+        self._tasks[job.job_id] = asyncio.create_task(self._run(job))
+        return job
+
+    async def _run(self, job: Job):
+        try:
+            async with self._slots:
+                job.update(status="running", started_at=time.time())
+                result = await run_crew_stdin(job.payload)
+            status = "error" if result.get("status") == "error" else "completed"
+            job.update(status=status, result=result, finished_at=time.time())
+        except asyncio.CancelledError:
+            job.update(status="error", result={"status": "error", "error": "Job cancelled"}, finished_at=time.time())
+            raise
+        finally:
+            self._tasks.pop(job.job_id, None)
+
+    async def wait(self, job: Job, seen_etag: Optional[str], timeout: float):
+        """
+        Long-poll: return once the job differs from seen_etag (or, without one, once it is done),
+        or after timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while not job.done and (seen_etag is None or seen_etag == job.etag):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(job.changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.ttl
+        expired = [jid for jid, job in self.jobs.items() if job.done and job.finished_at < cutoff]
+        for jid in expired:
+            del self.jobs[jid]
+
+    async def shutdown(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+
+executor: Optional[JobExecutor] = None
+
+
+@app.on_event("startup")
+async def startup():
+    global executor
+    executor = JobExecutor(MAX_CONCURRENT_CREWS, MAX_PENDING_JOBS, JOB_TTL_SEC)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if executor:
+        await executor.shutdown()
+
+
+def build_payload(body: PostBody) -> Dict[str, Any]:
+    message = body.message or body.user_input or body.campaign_context or ""
+    if not (message and str(message).strip()):
+        message = "No message provided."
+
+    payload = {
+        "user_input": message.strip(),
+        "message": body.message,
+        "campaign_context": body.campaign_context,
+    }
+    if body.language:
+        payload["language"] = body.language
+        payload["output_language"] = body.language
+    return payload
+
 
 @app.get("/api/crew")
-def get_crew():
+async def get_crew():
     """
     GET /api/crew — Health and description.
     Returns 200 with { status: "ok", message: "..." }.
@@ -91,40 +260,69 @@ def get_crew():
     return {
         "status": "ok",
         "message": "CrewAI REST API. POST /api/crew with JSON body { message } to run crew.",
+        "jobs": {"pending": executor.pending if executor else 0, "max_pending": MAX_PENDING_JOBS},
     }
 
 
 @app.post("/api/crew")
-def post_crew(body: PostBody):
+async def post_crew(body: PostBody, run_async: bool = Query(False, alias="async")):
     """
     POST /api/crew — Run crew.
     Body: { message?, user_input?, campaign_context?, language? }
     Response: { status, output?, task_outputs? } or { status, error }.
+    With ?async=1: 202 { status: "accepted", job_id, status_url } and the run continues in the background.
     """
-    message = body.message or body.user_input or body.campaign_context or ""
-    if not (message and str(message).strip()):
-        message = "No message provided."
+    job = executor.submit(build_payload(body))
+    if job is None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many crew runs in progress",
+            headers={"Retry-After": str(CREW_TIMEOUT_SEC // 10)},
+        )
+
+    status_url = f"/api/crew/jobs/{job.job_id}"
+    if run_async:
+        return JSONResponse(
+            status_code=202,
+            content={"status": "accepted", "job_id": job.job_id, "status_url": status_url},
+            headers={"Location": status_url},
+        )
+
+    # Synchronous mode: same response as before, the handler just awaits the job
+    while not job.done:
+        await job.changed.wait()
+    if job.status == "error":
+        raise HTTPException(status_code=500, detail=job.result.get("error", "Crew failed"))
+    return job.result
 
-    payload = {
-        "user_input": message.strip(),
-        "message": body.message,
-        "campaign_context": body.campaign_context,
-    }
-    if body.language:
-        payload["language"] = body.language
-        payload["output_language"] = body.language
 
-    result = run_crew_stdin(payload)
+@app.get("/api/crew/jobs/{job_id}")
+async def get_job(job_id: str, request: Request, wait: float = Query(0, ge=0, le=MAX_WAIT_SEC)):
+    """
+    GET /api/crew/jobs/{id} — Job status; includes result once completed/error.
+    ?wait=N holds the request up to N seconds until the job changes (vs. If-None-Match) or finishes.
+    Returns 304 when If-None-Match still matches the current ETag.
+    """
+    job = executor.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
 
-    if result.get("status") == "error":
-        raise HTTPException(status_code=500, detail=result.get("error", "Crew failed"))
+    seen_etag = request.headers.get("if-none-match")
+    if wait:
+        await executor.wait(job, seen_etag, wait)
 
-    return result
+    headers = {"ETag": job.etag, "Cache-Control": "no-cache"}
+    if seen_etag == job.etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=job.to_dict(), headers=headers)
 
 
 @app.get("/")
-def root():
-    return {"service": "BAGANA AI Crew REST API", "endpoints": ["GET /api/crew", "POST /api/crew"]}
+async def root():
+    return {
+        "service": "BAGANA AI Crew REST API",
+        "endpoints": ["GET /api/crew", "POST /api/crew", "GET /api/crew/jobs/{job_id}"],
+    }
 
 
 if __name__ == "__main__":
@@ -21,15 +21,18 @@ def get_crew():
         return json.loads(resp.read().decode())
 
 
-def post_crew(message: str, language: str = None, campaign_context: str = None):
-    """POST /api/crew — run crew."""
+def _crew_body(message: str, language: str = None, campaign_context: str = None) -> bytes:
     body = {"message": message}
     if language:
         body["language"] = language
     if campaign_context:
         body["campaign_context"] = campaign_context
+    return json.dumps(body).encode()
 
-    data = json.dumps(body).encode()
+
+def post_crew(message: str, language: str = None, campaign_context: str = None):
+    """POST /api/crew — run crew."""
+    data = _crew_body(message, language, campaign_context)
     req = urllib.request.Request(
         f"{BASE}/api/crew",
         data=data,
@@ -40,6 +43,43 @@ def post_crew(message: str, language: str = None, campaign_context: str = None):
         return json.loads(resp.read().decode())
 
 
+def post_crew_async(message: str, language: str = None, campaign_context: str = None):
+    """POST /api/crew?async=1 — queue a run; returns { status: "accepted", job_id, status_url }."""
+    data = _crew_body(message, language, campaign_context)
+    req = urllib.request.Request(
+        f"{BASE}/api/crew?async=1",
+        data=data,
+        method="POST",
+        headers={"Content-Type": "application/json", "Accept": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        return json.loads(resp.read().decode())
+
+
+def wait_for_job(job_id: str, wait: int = 30):
+    """Long-poll GET /api/crew/jobs/{id} until the job is completed or error."""
+    etag = None
+    job = None
+    while True:
+        headers = {"Accept": "application/json"}
+        if etag:
+            headers["If-None-Match"] = etag
+        req = urllib.request.Request(f"{BASE}/api/crew/jobs/{job_id}?wait={wait}", headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=wait + 10) as resp:
+                etag = resp.headers.get("ETag")
+                job = json.loads(resp.read().decode())
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise
+            continue  # unchanged within the wait window
+        if job["status"] in ("completed", "error"):
+            return job
+
+
 if __name__ == "__main__":
     print("GET /api/crew:", get_crew())
     print("POST /api/crew (short message):", post_crew("Create a one-sentence content idea."))
+    job = post_crew_async("Create a one-sentence content idea.")
+    print("POST /api/crew?async=1:", job)
+    print("GET /api/crew/jobs/{id}:", wait_for_job(job["job_id"]))
@@ -5,10 +5,9 @@ This can be used as a reference for implementing WebSocket support.
 import asyncio
 import json
 import sys
-import subprocess
 from pathlib import Path
 from datetime import datetime
-from typing import Set, Optional
+from typing import Dict, List, Optional, Set
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -23,27 +22,85 @@ except ImportError:
     print("Warning: websockets library not installed. Install with: pip install websockets")
 
 
+CREW_TIMEOUT_SEC = 600
+SEND_QUEUE_SIZE = 256  # per-client outbound messages buffered before progress is dropped
+SEND_TIMEOUT_SEC = 10  # a client whose full queue does not drain within this is disconnected
+CANCEL_KILL_SEC = 5  # a cancelled crew still running after this is killed
+CONTROL_ACTIONS = {"pause_crew": "pause", "resume_crew": "resume", "cancel_crew": "cancel"}
+CONTROL_CONFIRMATIONS = {"paused": "crew_paused", "running": "crew_resumed"}  # crew state -> message
+
+
 class CrewAIWebSocketServer:
-    """Complete WebSocket server for CrewAI integration."""
+    """
+    Complete WebSocket server for CrewAI integration.
+    Crew runs are asyncio subprocesses read concurrently (stdout + stderr), and every client
+    has its own send queue drained by a sender task, so one crew or one slow client never
+    blocks the event loop for others (pings, list_crews, other executions).
+    Crews run with `--control`: stdin stays open and pause/resume/cancel are forwarded to the
+    crew (crew.control), which applies them at its next step boundary and confirms on stderr.
+    """
     
-    def __init__(self, host: str = "localhost", port: int = 8769):
+    def __init__(self, host: str = "localhost", port: int = 8769, crew_command: Optional[List[str]] = None):
         self.host = host
         self.port = port
+        self.crew_command = crew_command or [sys.executable, "-m", "crew.run", "--stdin", "--control"]
         self.clients: Set[WebSocketServerProtocol] = set()
         self.active_crews: dict = {}  # crew_id -> process
+        self.crew_states: Dict[str, str] = {}  # crew_id -> running | paused | cancelled | completed | error
+        self.send_queues: Dict[WebSocketServerProtocol, asyncio.Queue] = {}
+        self.senders: Dict[WebSocketServerProtocol, asyncio.Task] = {}
     
     async def register_client(self, websocket: WebSocketServerProtocol):
         """Register a new client."""
         self.clients.add(websocket)
-        await websocket.send(json.dumps({
+        queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.send_queues[websocket] = queue
+        self.senders[websocket] = asyncio.create_task(self._sender(websocket, queue))
+        await self.send(websocket, {
             "type": "connected",
             "message": "Connected to CrewAI WebSocket server",
             "server_time": datetime.now().isoformat()
-        }))
+        })
     
     async def unregister_client(self, websocket: WebSocketServerProtocol):
         """Unregister a client."""
         self.clients.discard(websocket)
+        self.send_queues.pop(websocket, None)
+        sender = self.senders.pop(websocket, None)
+        if sender:
+            sender.cancel()
+    
+    async def send(self, websocket: WebSocketServerProtocol, message: dict):
+        """Queue a message for one client without waiting on its network I/O."""
+        queue = self.send_queues.get(websocket)
+        if queue is None:
+            return  # client already disconnected
+        data = json.dumps(message)
+        try:
+            queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # Slow client: drop progress updates, but never lifecycle messages
+            if message.get("type") == "progress":
+                return
+            sender = self.senders.get(websocket)
+            if sender is None or sender.done():
+                await self.unregister_client(websocket)  # nothing drains the queue any more
+                return
+            try:
+                await asyncio.wait_for(queue.put(data), SEND_TIMEOUT_SEC)
+            except asyncio.TimeoutError:
+                # Stalled client: drop it rather than block the crew run
+                await self.unregister_client(websocket)
+                await websocket.close()
+    
+    async def _sender(self, websocket: WebSocketServerProtocol, queue: asyncio.Queue):
+        """Drain one client's send queue."""
+        try:
+            while True:
+                await websocket.send(await queue.get())
+        except websockets.exceptions.ConnectionClosed:
+            # Later sends to this client return at once instead of filling its queue
+            self.send_queues.pop(websocket, None)
     
     async def execute_crew(self, websocket: WebSocketServerProtocol, request: dict):
         """Execute crew and stream progress."""
@@ -51,12 +108,14 @@ class CrewAIWebSocketServer:
         user_input = request.get("user_input", "No input provided")
         output_language = request.get("output_language", "English")
         
+        self.crew_states[crew_id] = "running"
+        
         # Send start notification
-        await websocket.send(json.dumps({
+        await self.send(websocket, {
             "type": "crew_started",
             "crew_id": crew_id,
             "timestamp": datetime.now().isoformat()
-        }))
+        })
         
         # Prepare payload
         payload = {
@@ -64,84 +123,137 @@ class CrewAIWebSocketServer:
             "output_language": output_language
         }
         
-        import sys as sys_module
-        python_cmd = sys_module.executable
+        proc = None
+        progress_count = 0
+        
+        async def read_progress():
+            """Forward progress JSON lines from stderr as they arrive."""
+            nonlocal progress_count
+            async for raw in proc.stderr:
+                line = raw.decode(errors="replace").strip()
+                if not line.startswith("{"):
+                    continue
+                try:
+                    progress = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if progress.get("type") == "control":
+                    # Crew confirms a control action took effect at a step boundary
+                    state = progress.get("state")
+                    self.crew_states[crew_id] = state
+                    if state in CONTROL_CONFIRMATIONS:
+                        await self.send(websocket, {
+                            "type": CONTROL_CONFIRMATIONS[state],
+                            "crew_id": crew_id,
+                            "timestamp": datetime.now().isoformat()
+                        })
+                    continue
+                if progress.get("type") != "progress":
+                    continue
+                progress_count += 1
+                await self.send(websocket, {
+                    "type": "progress",
+                    "crew_id": crew_id,
+                    "data": progress,
+                    "count": progress_count,
+                    "timestamp": datetime.now().isoformat()
+                })
         
         try:
             # Spawn crew process
-            proc = subprocess.Popen(
-                [python_cmd, "-m", "crew.run", "--stdin"],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=Path(__file__).parent.parent
+            proc = await asyncio.create_subprocess_exec(
+                *self.crew_command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=Path(__file__).parent.parent,
+                limit=1 << 20  # progress lines can carry long step output
             )
             
             self.active_crews[crew_id] = proc
             
-            # Write input
-            proc.stdin.write(json.dumps(payload))
-            proc.stdin.close()
+            # Write input as the first line; stdin stays open for control messages
+            proc.stdin.write((json.dumps(payload) + "\n").encode())
+            await proc.stdin.drain()
             
-            # Stream progress updates
-            progress_count = 0
-            for line in proc.stderr:
-                if not line.strip():
-                    continue
-                
-                # Check for progress updates
-                if line.strip().startswith("{") and '"type":"progress"' in line:
-                    try:
-                        progress = json.loads(line.strip())
-                        progress_count += 1
-                        
-                        await websocket.send(json.dumps({
-                            "type": "progress",
-                            "crew_id": crew_id,
-                            "data": progress,
-                            "count": progress_count,
-                            "timestamp": datetime.now().isoformat()
-                        }))
-                    except json.JSONDecodeError:
-                        pass
-            
-            # Wait for completion
-            proc.wait()
+            # Read stdout and stderr concurrently so neither pipe can fill up and stall the crew
+            stdout, _ = await asyncio.wait_for(
+                asyncio.gather(proc.stdout.read(), read_progress()),
+                CREW_TIMEOUT_SEC
+            )
+            await proc.wait()
             
             # Read result
-            stdout = proc.stdout.read()
             try:
-                result = json.loads(stdout)
+                result = json.loads(stdout.decode())
+                cancelled = result.get("status") == "cancelled"
+                self.crew_states[crew_id] = "cancelled" if cancelled else "completed"
                 
-                await websocket.send(json.dumps({
-                    "type": "crew_completed",
+                await self.send(websocket, {
+                    "type": "crew_cancelled" if cancelled else "crew_completed",
                     "crew_id": crew_id,
                     "result": result,
                     "progress_count": progress_count,
                     "timestamp": datetime.now().isoformat()
-                }))
+                })
             except json.JSONDecodeError:
-                await websocket.send(json.dumps({
+                self.crew_states[crew_id] = "error"
+                await self.send(websocket, {
                     "type": "crew_error",
                     "crew_id": crew_id,
                     "error": "Failed to parse result",
                     "timestamp": datetime.now().isoformat()
-                }))
+                })
+        
+        except asyncio.TimeoutError:
+            self.crew_states[crew_id] = "error"
+            await self.send(websocket, {
+                "type": "crew_error",
+                "crew_id": crew_id,
+                "error": f"Crew timed out after {CREW_TIMEOUT_SEC}s",
+                "timestamp": datetime.now().isoformat()
+            })
         
         except Exception as e:
-            await websocket.send(json.dumps({
+            self.crew_states[crew_id] = "error"
+            await self.send(websocket, {
                 "type": "crew_error",
                 "crew_id": crew_id,
                 "error": str(e),
                 "timestamp": datetime.now().isoformat()
-            }))
+            })
         
         finally:
+            if proc is not None and proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            if proc is not None and proc.stdin is not None and not proc.stdin.is_closing():
+                proc.stdin.close()
             if crew_id in self.active_crews:
                 del self.active_crews[crew_id]
     
-    async def handle_client(self, websocket: WebSocketServerProtocol, path: str):
+    async def control_crew(self, websocket: WebSocketServerProtocol, crew_id: str, action: str):
+        """Forward pause/resume/cancel to a running crew; it confirms via control events."""
+        proc = self.active_crews.get(crew_id)
+        if proc is None or proc.stdin is None or proc.stdin.is_closing():
+            await self.send(websocket, {
+                "type": "error",
+                "message": f"Crew not running: {crew_id}",
+                "crew_id": crew_id
+            })
+            return
+        proc.stdin.write((json.dumps({"control": action}) + "\n").encode())
+        await proc.stdin.drain()
+        if action == "cancel":
+            # Crews without a control channel (or stuck outside a step) are killed
+            asyncio.get_running_loop().call_later(CANCEL_KILL_SEC, self._kill_if_running, proc)
+    
+    @staticmethod
+    def _kill_if_running(proc):
+        if proc.returncode is None:
+            proc.kill()
+    
+    async def handle_client(self, websocket: WebSocketServerProtocol, path: str = None):
         """Handle client connection."""
         await self.register_client(websocket)
         
@@ -155,29 +267,41 @@ class CrewAIWebSocketServer:
                         asyncio.create_task(self.execute_crew(websocket, data))
                     
                     elif msg_type == "ping":
-                        await websocket.send(json.dumps({
+                        await self.send(websocket, {
                             "type": "pong",
                             "timestamp": datetime.now().isoformat()
-                        }))
+                        })
+                    
+                    elif msg_type in CONTROL_ACTIONS:
+                        await self.control_crew(websocket, data.get("crew_id"), CONTROL_ACTIONS[msg_type])
+                    
+                    elif msg_type == "get_status":
+                        crew_id = data.get("crew_id")
+                        await self.send(websocket, {
+                            "type": "crew_status",
+                            "crew_id": crew_id,
+                            "status": self.crew_states.get(crew_id, "pending"),
+                            "timestamp": datetime.now().isoformat()
+                        })
                     
                     elif msg_type == "list_crews":
-                        await websocket.send(json.dumps({
+                        await self.send(websocket, {
                             "type": "crews_list",
                             "active_crews": list(self.active_crews.keys()),
                             "timestamp": datetime.now().isoformat()
-                        }))
+                        })
                     
                     else:
-                        await websocket.send(json.dumps({
+                        await self.send(websocket, {
                             "type": "error",
                             "message": f"Unknown message type: {msg_type}"
-                        }))
+                        })
                 
                 except json.JSONDecodeError:
-                    await websocket.send(json.dumps({
+                    await self.send(websocket, {
                         "type": "error",
                         "message": "Invalid JSON"
-                    }))
+                    })
         
         except websockets.exceptions.ConnectionClosed:
             pass
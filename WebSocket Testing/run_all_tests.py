@@ -53,6 +53,7 @@ def main():
         "test_basic_websocket.py",
         "test_websocket_crew_integration.py",
         "test_websocket_control_messages.py",
+        "test_websocket_concurrency.py",
     ]
     
     results = {}
@@ -0,0 +1,160 @@
+"""
+Test that crew executions do not block the WebSocket server's event loop.
+Many clients start crews at once while a probe client measures ping round-trips;
+latency must stay flat compared with an idle server.
+Uses a stand-in crew command (progress lines on stderr, JSON on stdout) so no LLM calls are made.
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Try to import websockets
+try:
+    import websockets
+    from example_websocket_server import CrewAIWebSocketServer
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+
+PORT = 8771
+CLIENTS = 20
+STEPS = 20
+STEP_DELAY = 0.1  # each fake crew runs ~2 seconds
+PINGS = 40
+MAX_P95_MS = 100.0
+
+# Behaves like `python -m crew.run --stdin`: JSON in on stdin, progress on stderr, result on stdout
+FAKE_CREW = f"""
+import json, sys, time
+payload = json.loads(sys.stdin.readline())
+for i in range({STEPS}):
+    time.sleep({STEP_DELAY})
+    print(json.dumps({{"type": "progress", "agent": "planner", "task": f"step {{i}}"}}), file=sys.stderr, flush=True)
+print(json.dumps({{"status": "complete", "output": payload["user_input"]}}))
+"""
+
+
+async def measure_pings(ws, count: int) -> list:
+    """Sequential ping/pong round-trips in milliseconds."""
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await ws.send(json.dumps({"type": "ping"}))
+        while json.loads(await ws.recv()).get("type") != "pong":
+            pass
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.05)
+    return latencies
+
+
+def p95(values: list) -> float:
+    return statistics.quantiles(values, n=20)[-1]
+
+
+async def run_crew_client(index: int) -> dict:
+    """Start one crew and collect its messages until it finishes."""
+    async with websockets.connect(f"ws://localhost:{PORT}") as ws:
+        await ws.recv()  # connected
+        await ws.send(json.dumps({
+            "type": "execute_crew",
+            "crew_id": f"crew_{index}",
+            "user_input": f"brief {index}"
+        }))
+        progress = 0
+        while True:
+            data = json.loads(await asyncio.wait_for(ws.recv(), timeout=60))
+            if data["type"] == "progress":
+                progress += 1
+            elif data["type"] in ("crew_completed", "crew_error"):
+                return {"type": data["type"], "progress": progress, "result": data.get("result")}
+
+
+async def test_ping_latency_under_load() -> bool:
+    """Ping latency while CLIENTS crews run concurrently."""
+    print("=" * 60)
+    print(f"Test: ping latency with {CLIENTS} concurrent crews")
+    print("=" * 60)
+
+    server = CrewAIWebSocketServer(
+        host="localhost",
+        port=PORT,
+        crew_command=[sys.executable, "-c", FAKE_CREW]
+    )
+    server_task = asyncio.create_task(server.start())
+    await asyncio.sleep(1)
+
+    try:
+        async with websockets.connect(f"ws://localhost:{PORT}") as probe:
+            await probe.recv()  # connected
+
+            print("\n[1/3] Baseline ping latency (idle server)...")
+            idle = await measure_pings(probe, PINGS)
+            print(f"  -> p50 {statistics.median(idle):.1f} ms, p95 {p95(idle):.1f} ms")
+
+            print(f"\n[2/3] Ping latency while {CLIENTS} crews run...")
+            crews = [asyncio.create_task(run_crew_client(i)) for i in range(CLIENTS)]
+            await asyncio.sleep(0.3)  # let the crews start
+            loaded = await measure_pings(probe, PINGS)
+            print(f"  -> p50 {statistics.median(loaded):.1f} ms, p95 {p95(loaded):.1f} ms")
+
+            results = await asyncio.gather(*crews)
+    finally:
+        server_task.cancel()
+        try:
+            await server_task
+        except asyncio.CancelledError:
+            pass
+
+    print("\n[3/3] Checking crew results...")
+    completed = [r for r in results if r["type"] == "crew_completed"]
+    full_progress = [r for r in completed if r["progress"] == STEPS]
+    print(f"  -> {len(completed)}/{CLIENTS} completed, {len(full_progress)} with all {STEPS} progress updates")
+
+    ok = True
+    if len(full_progress) != CLIENTS:
+        print("  [FAIL] Not every crew completed with full progress")
+        ok = False
+    if p95(loaded) > MAX_P95_MS:
+        print(f"  [FAIL] p95 ping latency {p95(loaded):.1f} ms exceeds {MAX_P95_MS:.0f} ms while crews run")
+        ok = False
+    if ok:
+        print("  [OK] Event loop stayed responsive while crews ran")
+    return ok
+
+
+async def main() -> bool:
+    """Run all concurrency tests."""
+    print("\n" + "=" * 60)
+    print("CrewAI WebSocket Testing - Concurrency")
+    print("=" * 60)
+
+    if not WEBSOCKETS_AVAILABLE:
+        print("\n⚠ websockets library not installed")
+        print("Install with: pip install websockets")
+        return False
+
+    result = await test_ping_latency_under_load()
+
+    print("\n" + "=" * 60)
+    print("Test Summary")
+    print("=" * 60)
+    print(f"Ping latency under load: {'[OK] Passed' if result else '[FAIL] Failed'}")
+    print("=" * 60)
+    return result
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(0 if asyncio.run(main()) else 1)
+    except KeyboardInterrupt:
+        print("\n\nTest interrupted by user")
+    except Exception as e:
+        print(f"\n\nTest failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -1,21 +1,68 @@
 """
-Test WebSocket control messages (pause, cancel, modify).
-Demonstrates bidirectional communication for controlling crew execution.
+Test WebSocket control messages (pause, resume, cancel, status).
+Demonstrates bidirectional communication for controlling crew execution: control messages
+are forwarded to the running crew process (crew.control), which applies them between steps.
+Uses a stand-in crew built on crew.control (same protocol as `crew.run --stdin --control`),
+so no LLM calls are made.
 """
 import asyncio
 import json
 import sys
+import time
 from pathlib import Path
-from datetime import datetime
 from enum import Enum
 
+sys.path.insert(0, str(Path(__file__).parent))
+
 # Try to import websockets
 try:
     import websockets
-    from websockets.server import WebSocketServerProtocol
+    from example_websocket_server import CrewAIWebSocketServer
     WEBSOCKETS_AVAILABLE = True
 except ImportError:
     WEBSOCKETS_AVAILABLE = False
+    CrewAIWebSocketServer = object
+
+PORT = 8768
+STEPS = 20
+STEP_DELAY = 0.1
+SLOW_STEP_DELAY = 30  # one "LLM call" that would outlive the test unless cancel aborts it
+CANCEL_GRACE = 0.3
+
+# Stand-in crew: argv = [steps, step_delay]. Mirrors crew.run's --control mode:
+# progress on stderr, checkpoint() after each step, partial result on cancel.
+FAKE_CREW = f"""
+import json, os, sys, time
+from crew.control import CrewCancelled, CrewControl
+
+steps, delay = int(sys.argv[1]), float(sys.argv[2])
+outputs = []
+
+def result(status):
+    return {{"status": status, "output": outputs[-1]["output"] if outputs else "", "task_outputs": list(outputs)}}
+
+def abort():
+    json.dump(result("cancelled"), sys.stdout)
+    sys.stdout.flush()
+    os._exit(0)
+
+payload = json.loads(sys.stdin.readline())
+control = CrewControl(cancel_grace={CANCEL_GRACE}, on_abort=abort)
+control.listen(sys.stdin)
+try:
+    for i in range(steps):
+        time.sleep(delay)  # one LLM call
+        outputs.append({{"task": f"step_{{i}}", "output": f"output {{i}}"}})
+        print(json.dumps({{"type": "progress", "agent": "Content Planner", "task": f"step_{{i}}"}}), file=sys.stderr, flush=True)
+        control.checkpoint()
+    final = result("complete")
+except CrewCancelled:
+    final = result("cancelled")
+if control.finish(cancelled=final["status"] == "cancelled"):
+    json.dump(final, sys.stdout)
+else:
+    control.wait_aborted()
+"""
 
 
 class CrewStatus(Enum):
@@ -28,223 +75,202 @@ class CrewStatus(Enum):
     ERROR = "error"
 
 
-class ControllableCrewServer:
-    """WebSocket server with crew execution control."""
-    
-    def __init__(self, host: str = "localhost", port: int = 8768):
-        self.host = host
-        self.port = port
-        self.clients: dict = {}
-        self.crews: dict = {}  # crew_id -> status
-    
-    async def handle_control_message(self, websocket, message: dict):
-        """Handle control messages."""
-        msg_type = message.get("type")
-        crew_id = message.get("crew_id")
-        
-        if msg_type == "pause_crew":
-            if crew_id in self.crews and self.crews[crew_id] == CrewStatus.RUNNING:
-                self.crews[crew_id] = CrewStatus.PAUSED
-                await websocket.send(json.dumps({
-                    "type": "crew_paused",
-                    "crew_id": crew_id,
-                    "timestamp": datetime.now().isoformat()
-                }))
-                return True
-        
-        elif msg_type == "resume_crew":
-            if crew_id in self.crews and self.crews[crew_id] == CrewStatus.PAUSED:
-                self.crews[crew_id] = CrewStatus.RUNNING
-                await websocket.send(json.dumps({
-                    "type": "crew_resumed",
-                    "crew_id": crew_id,
-                    "timestamp": datetime.now().isoformat()
-                }))
-                return True
-        
-        elif msg_type == "cancel_crew":
-            if crew_id in self.crews:
-                self.crews[crew_id] = CrewStatus.CANCELLED
-                await websocket.send(json.dumps({
-                    "type": "crew_cancelled",
-                    "crew_id": crew_id,
-                    "timestamp": datetime.now().isoformat()
-                }))
-                return True
-        
-        elif msg_type == "get_status":
-            status = self.crews.get(crew_id, CrewStatus.PENDING)
-            await websocket.send(json.dumps({
-                "type": "crew_status",
-                "crew_id": crew_id,
-                "status": status.value,
-                "timestamp": datetime.now().isoformat()
-            }))
-            return True
-        
-        return False
-    
-    async def handle_client(self, websocket: WebSocketServerProtocol, path: str):
-        """Handle client connection."""
-        client_id = f"client_{datetime.now().timestamp()}"
-        self.clients[client_id] = websocket
-        
-        await websocket.send(json.dumps({
-            "type": "connected",
-            "client_id": client_id,
-            "timestamp": datetime.now().isoformat()
-        }))
-        
-        try:
-            async for message in websocket:
-                try:
-                    data = json.loads(message)
-                    msg_type = data.get("type")
-                    
-                    # Handle control messages
-                    if msg_type in ["pause_crew", "resume_crew", "cancel_crew", "get_status"]:
-                        handled = await self.handle_control_message(websocket, data)
-                        if not handled:
-                            await websocket.send(json.dumps({
-                                "type": "error",
-                                "message": f"Failed to handle {msg_type}",
-                                "crew_id": data.get("crew_id")
-                            }))
-                    
-                    elif msg_type == "ping":
-                        await websocket.send(json.dumps({
-                            "type": "pong",
-                            "timestamp": datetime.now().isoformat()
-                        }))
-                    
-                    else:
-                        await websocket.send(json.dumps({
-                            "type": "error",
-                            "message": f"Unknown message type: {msg_type}"
-                        }))
-                
-                except json.JSONDecodeError:
-                    await websocket.send(json.dumps({
-                        "type": "error",
-                        "message": "Invalid JSON"
-                    }))
-        
-        except websockets.exceptions.ConnectionClosed:
-            pass
-        finally:
-            if client_id in self.clients:
-                del self.clients[client_id]
-    
-    async def start(self):
-        """Start the server."""
-        if not WEBSOCKETS_AVAILABLE:
-            return
-        
-        async with websockets.serve(self.handle_client, self.host, self.port):
-            print(f"[Server] Control server running on ws://{self.host}:{self.port}")
-            await asyncio.Future()
+class ControllableCrewServer(CrewAIWebSocketServer):
+    """WebSocket server with crew execution control (see CrewAIWebSocketServer.control_crew)."""
 
+    def __init__(self, host: str = "localhost", port: int = PORT, step_delay: float = STEP_DELAY):
+        super().__init__(
+            host=host,
+            port=port,
+            crew_command=[sys.executable, "-c", FAKE_CREW, str(STEPS), str(step_delay)]
+        )
 
-async def test_control_messages():
-    """Test control message handling."""
-    print("=" * 60)
-    print("Test: WebSocket Control Messages")
-    print("=" * 60)
-    
-    if not WEBSOCKETS_AVAILABLE:
-        print("⚠ websockets library not available")
-        return False
-    
-    server = ControllableCrewServer(host="localhost", port=8768)
-    
-    # Initialize a test crew
-    server.crews["test_crew_1"] = CrewStatus.RUNNING
-    
-    print("\n[1/4] Starting control server...")
-    server_task = asyncio.create_task(server.start())
+    @property
+    def crews(self) -> dict:
+        """crew_id -> CrewStatus, as confirmed by the crews themselves."""
+        return {crew_id: CrewStatus(state) for crew_id, state in self.crew_states.items()}
+
+
+async def recv_until(ws, types: set, timeout: float = 10.0) -> tuple:
+    """Receive until a message of one of types; returns (message, progress updates seen)."""
+    progress = 0
+    while True:
+        data = json.loads(await asyncio.wait_for(ws.recv(), timeout=timeout))
+        if data.get("type") == "progress":
+            progress += 1
+        elif data.get("type") in types:
+            return data, progress
+
+
+async def start_crew(ws, crew_id: str):
+    await ws.recv()  # connected
+    await ws.send(json.dumps({"type": "execute_crew", "crew_id": crew_id, "user_input": "Control test"}))
+    await recv_until(ws, {"crew_started"})
+
+
+async def run_server(server: ControllableCrewServer):
+    task = asyncio.create_task(server.start())
     await asyncio.sleep(0.5)
-    
-    print("\n[2/4] Testing pause/resume...")
+    return task
+
+
+async def stop_server(task: asyncio.Task):
+    task.cancel()
     try:
-        async with websockets.connect("ws://localhost:8768") as ws:
-            # Receive connection message
-            await ws.recv()
-            
-            # Test pause
-            await ws.send(json.dumps({
-                "type": "pause_crew",
-                "crew_id": "test_crew_1"
-            }))
-            response = await ws.recv()
-            data = json.loads(response)
-            print(f"  -> {data.get('type')}: {data.get('crew_id')}")
-            
-            # Test resume
-            await ws.send(json.dumps({
-                "type": "resume_crew",
-                "crew_id": "test_crew_1"
-            }))
-            response = await ws.recv()
-            data = json.loads(response)
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def test_pause_resume() -> bool:
+    """Pause holds the crew at the next step boundary; resume lets it finish."""
+    server = ControllableCrewServer()
+    server_task = await run_server(server)
+    try:
+        async with websockets.connect(f"ws://localhost:{PORT}") as ws:
+            await start_crew(ws, "test_crew_1")
+            await asyncio.sleep(0.35)
+
+            await ws.send(json.dumps({"type": "pause_crew", "crew_id": "test_crew_1"}))
+            data, _ = await recv_until(ws, {"crew_paused"})
+            print(f"  -> {data.get('type')}: {data.get('crew_id')} (status {server.crews['test_crew_1'].value})")
+
+            await asyncio.sleep(0.5)  # held at the step boundary
+            await ws.send(json.dumps({"type": "resume_crew", "crew_id": "test_crew_1"}))
+            data, _ = await recv_until(ws, {"crew_resumed"})
             print(f"  -> {data.get('type')}: {data.get('crew_id')}")
-    
+
+            data, _ = await recv_until(ws, {"crew_completed", "crew_cancelled", "crew_error"})
+            outputs = len(data.get("result", {}).get("task_outputs", []))
+            print(f"  -> {data.get('type')}: {outputs}/{STEPS} task outputs")
+            return data.get("type") == "crew_completed" and outputs == STEPS
     finally:
-        server_task.cancel()
-        try:
-            await server_task
-        except asyncio.CancelledError:
-            pass
-    
-    print("\n[3/4] Testing cancel...")
-    server.crews["test_crew_2"] = CrewStatus.RUNNING
-    server_task = asyncio.create_task(server.start())
-    await asyncio.sleep(0.5)
-    
+        await stop_server(server_task)
+
+
+async def test_pause_blocks_progress() -> bool:
+    """After crew_paused, no progress arrives until resume."""
+    server = ControllableCrewServer()
+    server_task = await run_server(server)
     try:
-        async with websockets.connect("ws://localhost:8768") as ws:
-            await ws.recv()
-            
-            await ws.send(json.dumps({
-                "type": "cancel_crew",
-                "crew_id": "test_crew_2"
-            }))
-            response = await ws.recv()
-            data = json.loads(response)
-            print(f"  -> {data.get('type')}: {data.get('crew_id')}")
-    
+        async with websockets.connect(f"ws://localhost:{PORT}") as ws:
+            await start_crew(ws, "test_crew_2")
+            await asyncio.sleep(0.25)
+            await ws.send(json.dumps({"type": "pause_crew", "crew_id": "test_crew_2"}))
+            await recv_until(ws, {"crew_paused"})
+
+            leaked = 0
+            deadline = time.monotonic() + 0.6
+            while time.monotonic() < deadline:
+                try:
+                    data = json.loads(await asyncio.wait_for(ws.recv(), timeout=deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+                if data.get("type") == "progress":
+                    leaked += 1
+            print(f"  -> progress updates while paused: {leaked}")
+
+            await ws.send(json.dumps({"type": "cancel_crew", "crew_id": "test_crew_2"}))
+            await recv_until(ws, {"crew_cancelled"})
+            return leaked == 0
     finally:
-        server_task.cancel()
-        try:
-            await server_task
-        except asyncio.CancelledError:
-            pass
-    
-    print("\n[4/4] Testing status query...")
-    server.crews["test_crew_3"] = CrewStatus.RUNNING
-    server_task = asyncio.create_task(server.start())
-    await asyncio.sleep(0.5)
-    
+        await stop_server(server_task)
+
+
+async def test_cancel() -> bool:
+    """Cancel stops the crew within one step and returns partial outputs."""
+    server = ControllableCrewServer()
+    server_task = await run_server(server)
+    try:
+        async with websockets.connect(f"ws://localhost:{PORT}") as ws:
+            await start_crew(ws, "test_crew_3")
+            await asyncio.sleep(0.35)
+
+            started = time.monotonic()
+            await ws.send(json.dumps({"type": "cancel_crew", "crew_id": "test_crew_3"}))
+            data, _ = await recv_until(ws, {"crew_cancelled", "crew_completed"})
+            elapsed = time.monotonic() - started
+            outputs = len(data.get("result", {}).get("task_outputs", []))
+            print(f"  -> {data.get('type')} after {elapsed * 1000:.0f} ms with {outputs}/{STEPS} partial outputs")
+            return (
+                data.get("type") == "crew_cancelled"
+                and 0 < outputs < STEPS
+                and elapsed < STEP_DELAY + CANCEL_GRACE + 0.5
+                and server.crews["test_crew_3"] == CrewStatus.CANCELLED
+            )
+    finally:
+        await stop_server(server_task)
+
+
+async def test_cancel_in_flight() -> bool:
+    """Cancel during a long step (in-flight LLM call) aborts it instead of waiting it out."""
+    server = ControllableCrewServer(step_delay=SLOW_STEP_DELAY)
+    server_task = await run_server(server)
+    try:
+        async with websockets.connect(f"ws://localhost:{PORT}") as ws:
+            await start_crew(ws, "test_crew_4")
+            await asyncio.sleep(0.2)
+
+            started = time.monotonic()
+            await ws.send(json.dumps({"type": "cancel_crew", "crew_id": "test_crew_4"}))
+            data, _ = await recv_until(ws, {"crew_cancelled", "crew_completed", "crew_error"})
+            elapsed = time.monotonic() - started
+            print(f"  -> {data.get('type')} after {elapsed * 1000:.0f} ms (step would take {SLOW_STEP_DELAY}s)")
+            return data.get("type") == "crew_cancelled" and elapsed < CANCEL_GRACE + 1.0
+    finally:
+        await stop_server(server_task)
+
+
+async def test_status_query() -> bool:
+    """get_status reports the confirmed crew state; unknown crews are pending."""
+    server = ControllableCrewServer()
+    server_task = await run_server(server)
     try:
-        async with websockets.connect("ws://localhost:8768") as ws:
-            await ws.recv()
-            
-            await ws.send(json.dumps({
-                "type": "get_status",
-                "crew_id": "test_crew_3"
-            }))
-            response = await ws.recv()
-            data = json.loads(response)
+        async with websockets.connect(f"ws://localhost:{PORT}") as ws:
+            await start_crew(ws, "test_crew_5")
+            await ws.send(json.dumps({"type": "get_status", "crew_id": "test_crew_5"}))
+            data, _ = await recv_until(ws, {"crew_status"})
             print(f"  -> Status: {data.get('status')}")
-    
+            running = data.get("status") == CrewStatus.RUNNING.value
+
+            await ws.send(json.dumps({"type": "get_status", "crew_id": "unknown_crew"}))
+            data, _ = await recv_until(ws, {"crew_status"})
+            print(f"  -> Unknown crew status: {data.get('status')}")
+
+            await ws.send(json.dumps({"type": "cancel_crew", "crew_id": "test_crew_5"}))
+            await recv_until(ws, {"crew_cancelled"})
+            return running and data.get("status") == CrewStatus.PENDING.value
     finally:
-        server_task.cancel()
-        try:
-            await server_task
-        except asyncio.CancelledError:
-            pass
-    
-    print("\n[OK] Control message tests completed")
-    return True
+        await stop_server(server_task)
+
+
+async def test_control_messages():
+    """Test control message handling."""
+    print("=" * 60)
+    print("Test: WebSocket Control Messages")
+    print("=" * 60)
+
+    if not WEBSOCKETS_AVAILABLE:
+        print("⚠ websockets library not available")
+        return False
+
+    tests = [
+        ("[1/5] Testing pause/resume...", test_pause_resume),
+        ("[2/5] Testing that pause blocks the next step...", test_pause_blocks_progress),
+        ("[3/5] Testing cancel with partial outputs...", test_cancel),
+        ("[4/5] Testing cancel during an in-flight step...", test_cancel_in_flight),
+        ("[5/5] Testing status query...", test_status_query),
+    ]
+
+    ok = True
+    for label, test in tests:
+        print(f"\n{label}")
+        passed = await test()
+        print(f"  {'[OK]' if passed else '[FAIL]'} {test.__name__}")
+        ok = ok and passed
+
+    print(f"\n{'[OK]' if ok else '[FAIL]'} Control message tests completed")
+    return ok
 
 
 async def main():
@@ -252,19 +278,20 @@ async def main():
     print("\n" + "=" * 60)
     print("CrewAI WebSocket Testing - Control Messages")
     print("=" * 60)
-    
+
     result = await test_control_messages()
-    
+
     print("\n" + "=" * 60)
     print("Test Summary")
     print("=" * 60)
     print(f"Control Messages: {'[OK] Passed' if result else '[FAIL] Failed'}")
     print("=" * 60)
+    return result
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        sys.exit(0 if asyncio.run(main()) else 1)
     except KeyboardInterrupt:
         print("\n\nTest interrupted by user")
     except Exception as e:
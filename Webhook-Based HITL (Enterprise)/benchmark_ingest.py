@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Ingest benchmark for the /webhook/crewai request path.
+Compares the previous path (body read, request.json() parse, pydantic WebhookPayload, .dict())
+with the single-parse path (webhook_ingest.parse_event, stdlib json and orjson when installed)
+for small, medium and large deliveries, including HMAC verification, and reports per-event
+time, deliveries/s and peak memory allocated per large delivery.
+
+Usage: python benchmark_ingest.py [--events 20000] [--large-events 200]
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import webhook_ingest
+from webhook_ingest import parse_event
+from webhook_security import WebhookSecurity
+
+try:
+    from pydantic import BaseModel
+except ImportError:
+    BaseModel = None
+
+SECRET = "benchmark-secret"
+
+
+if BaseModel is not None:
+    class WebhookPayload(BaseModel):
+        """The previous request model."""
+        event_type: Optional[str] = None
+        kickoff_id: Optional[str] = None
+        task_id: Optional[str] = None
+        step_id: Optional[str] = None
+        status: Optional[str] = None
+        result: Optional[Dict[str, Any]] = None
+        error: Optional[str] = None
+        checkpoint_id: Optional[str] = None
+        checkpoint_name: Optional[str] = None
+        context: Optional[Dict[str, Any]] = None
+        timestamp: Optional[str] = None
+
+
+def make_body(result_bytes: int) -> bytes:
+    """A task.completed delivery whose result carries about result_bytes of output."""
+    paragraphs = max(1, result_bytes // 200)
+    return json.dumps({
+        "event_type": "task.completed",
+        "kickoff_id": "kickoff-123",
+        "task_id": "create_content_plan",
+        "status": "complete",
+        "result": {
+            "output": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 3,
+            "sections": [{"title": f"Section {i}", "body": "x" * 180} for i in range(paragraphs)]
+        }
+    }).encode()
+
+
+def previous_path(security: WebhookSecurity, body: bytes, signature: str):
+    """request.body() + request.json() + WebhookPayload(**body) + payload.dict()."""
+    if not security.verify_signature(body, signature, SECRET):
+        raise RuntimeError("bad signature")
+    parsed = json.loads(body)  # request.json() parses the cached body again
+    if BaseModel is not None:
+        payload = WebhookPayload(**parsed)
+        return payload.model_dump() if hasattr(payload, "model_dump") else payload.dict()
+    return dict(parsed)  # without pydantic: the .dict() copy only (a lower bound)
+
+
+def single_parse_path(security: WebhookSecurity, body: bytes, signature: str):
+    if not security.verify_signature(body, signature, SECRET):
+        raise RuntimeError("bad signature")
+    return parse_event(body)
+
+
+def time_path(path, security, body: bytes, signature: str, events: int, repeats: int = 3) -> float:
+    """Seconds per event (best of repeats)."""
+    path(security, body, signature)  # warm up
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for _ in range(events):
+            path(security, body, signature)
+        best = min(best, (time.perf_counter() - t0) / events)
+    return best
+
+
+def peak_alloc(path, security, body: bytes, signature: str) -> float:
+    """Peak bytes allocated while ingesting one delivery."""
+    tracemalloc.start()
+    result = path(security, body, signature)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--events", type=int, default=20000, help="deliveries per small/medium run")
+    ap.add_argument("--large-events", type=int, default=200, help="deliveries per large (1 MB) run")
+    args = ap.parse_args()
+
+    security = WebhookSecurity()
+    orjson = webhook_ingest.orjson
+    paths = [("previous", previous_path)]
+    backends = [("single-parse (json)", None)]
+    if orjson is not None:
+        backends.append(("single-parse (orjson)", orjson))
+
+    print("=" * 60)
+    print("BAGANA AI - Webhook ingest benchmark")
+    print("=" * 60)
+    print(f"pydantic: {'yes' if BaseModel is not None else 'not installed (previous path without model validation)'}")
+    print(f"orjson: {'yes' if orjson is not None else 'not installed'}")
+    print()
+
+    sizes = [("small", 500, args.events), ("medium", 50_000, args.events // 10), ("large", 1_000_000, args.large_events)]
+    for label, size, events in sizes:
+        body = make_body(size)
+        signature = security.generate_signature(body, SECRET)
+        print(f"{label} delivery ({len(body) / 1024:.1f} KB), {events} events")
+        runs = []
+        for name, path in paths:
+            runs.append((name, path, None))
+        for name, backend in backends:
+            runs.append((name, single_parse_path, backend))
+        baseline = None
+        for name, path, backend in runs:
+            webhook_ingest.orjson = backend
+            per_event = time_path(path, security, body, signature, events)
+            baseline = baseline or per_event
+            line = (
+                f"  {name:<24} {per_event * 1e6:10.1f} us/event  {1 / per_event:10.0f} deliveries/s"
+                f"  x{baseline / per_event:.2f}"
+            )
+            if label == "large":
+                line += f"  peak alloc {peak_alloc(path, security, body, signature) / 1e6:.1f} MB"
+            print(line)
+        webhook_ingest.orjson = orjson
+        print()
+
+    print("[OK] Benchmark complete")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
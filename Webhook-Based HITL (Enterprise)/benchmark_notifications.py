@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Fan-out benchmark for NotificationService WebSocket broadcast.
+Simulates thousands of connected clients, a few of them slow or dead, and compares the previous
+sequential broadcast (await each client in turn) with per-client queues: how long one
+broadcast blocks the webhook task, how fast healthy clients get the latest event, and what
+happens to slow consumers (dropped / coalesced / disconnected).
+
+Usage: python benchmark_notifications.py [--clients 5000] [--slow 20] [--dead 10] [--events 200]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from notification_service import NotificationService
+
+
+class SimulatedClient:
+    """Stands in for a Starlette WebSocket: send_text/send_json/close."""
+
+    def __init__(self, delay: float = 0.0, dead: bool = False):
+        self.delay = delay
+        self.dead = dead
+        self.received = 0
+        self.last = None
+        self.closed = False
+
+    async def send_text(self, text: str):
+        if self.dead:
+            raise ConnectionResetError("client went away")
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+        self.last = text
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data))
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+def make_clients(total: int, slow: int, dead: int, slow_delay: float):
+    clients = [SimulatedClient(delay=slow_delay) for _ in range(slow)]
+    clients += [SimulatedClient(dead=True) for _ in range(dead)]
+    clients += [SimulatedClient() for _ in range(total - slow - dead)]
+    return clients
+
+
+def make_events(count: int):
+    """Per task: four step events (coalescible) then a task.completed (always delivered)."""
+    events = []
+    for seq in range(count):
+        task_id = f"task_{seq // 5}"
+        if seq % 5 == 4 or seq == count - 1:
+            events.append(("task.completed", {"kickoff_id": "k1", "task_id": task_id, "seq": seq}))
+        else:
+            events.append(("step.completed", {"kickoff_id": "k1", "task_id": task_id, "seq": seq}))
+    return events
+
+
+async def sequential_broadcast(clients, event_type, payload):
+    """Previous implementation: await every client's send in turn."""
+    message = {"event_type": event_type, "payload": payload, "timestamp": "t"}
+    for client in clients:
+        try:
+            await client.send_json(message)
+        except Exception:
+            pass
+
+
+async def bench_sequential(args):
+    clients = make_clients(args.clients, args.slow, args.dead, args.slow_delay)
+    events = make_events(args.baseline_events)
+    t0 = time.perf_counter()
+    for event_type, payload in events:
+        await sequential_broadcast(clients, event_type, payload)
+    per_event = (time.perf_counter() - t0) / len(events)
+    print(f"  {'sequential (previous)':<24} broadcast blocks {per_event * 1000:10.1f} ms/event")
+
+
+async def bench_queued(args, policy: str):
+    service = NotificationService(ws_queue_size=args.queue_size, ws_slow_consumer_policy=policy, ws_send_timeout=1.0)
+    clients = make_clients(args.clients, args.slow, args.dead, args.slow_delay)
+    for client in clients:
+        service.register_websocket_client(client)
+    await asyncio.sleep(0)  # let sender tasks start
+
+    events = make_events(args.events)
+    healthy = [c for c in clients if not c.delay and not c.dead]
+    blocked = 0.0
+    t0 = time.perf_counter()
+    for event_type, payload in events:
+        t1 = time.perf_counter()
+        await service.send_websocket_notification(event_type, payload)
+        blocked += time.perf_counter() - t1
+        await asyncio.sleep(0)  # events arrive as separate webhook requests
+
+    last_seq = f'"seq": {len(events) - 1}'
+    deadline = time.monotonic() + 30
+    current = 0
+    while time.monotonic() < deadline:
+        current = sum(1 for c in healthy if c.last is not None and last_seq in c.last)
+        if current == len(healthy):
+            break
+        await asyncio.sleep(0.01)
+    delivered = time.perf_counter() - t0
+    await service.send_websocket_notification("crew.started", {"kickoff_id": "k2"})  # reaps dead clients
+    stats = service.websocket_stats()
+    slow_sends = sum(c.received for c in clients if c.delay) / max(1, args.slow)
+    print(
+        f"  {'queued, ' + policy:<24} broadcast blocks {blocked / len(events) * 1000:10.2f} ms/event, "
+        f"{current}/{len(healthy)} healthy clients current after {delivered * 1000:.0f} ms"
+    )
+    print(
+        f"  {'':<24} sends per client for {len(events)} events: healthy {healthy[0].received}, "
+        f"slow {slow_sends:.0f}; coalesced {stats['coalesced']}, dropped {stats['dropped']}, "
+        f"disconnected {stats['disconnected_slow']}"
+    )
+    for client in clients:
+        service.unregister_websocket_client(client)
+    await asyncio.sleep(0)
+
+
+async def main_async(args) -> int:
+    print("=" * 60)
+    print("BAGANA AI - NotificationService WebSocket fan-out benchmark")
+    print("=" * 60)
+    print(
+        f"Clients: {args.clients} ({args.slow} slow at {args.slow_delay * 1000:.0f} ms/send, {args.dead} dead), "
+        f"events: {args.events}"
+    )
+    print()
+    await bench_sequential(args)
+    await bench_queued(args, "drop_oldest")
+    await bench_queued(args, "disconnect")
+    print()
+    print("[OK] Benchmark complete")
+    return 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--clients", type=int, default=5000)
+    ap.add_argument("--slow", type=int, default=20, help="clients that take --slow-delay per send")
+    ap.add_argument("--dead", type=int, default=10, help="clients whose sends fail")
+    ap.add_argument("--slow-delay", type=float, default=0.05)
+    ap.add_argument("--events", type=int, default=200)
+    ap.add_argument("--baseline-events", type=int, default=3, help="events for the (slow) sequential baseline")
+    ap.add_argument("--queue-size", type=int, default=32)
+    args = ap.parse_args()
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,8 +5,7 @@ Configures CrewAI to send webhooks for HITL checkpoints.
 
 import sys
 from pathlib import Path
-from typing import Dict, Any, Optional
-import json
+from typing import Dict, Any, Optional, Tuple
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -48,43 +47,82 @@ def create_checkpoint_webhook_payload(
     }
 
 
+_security = None  # shared WebhookSecurity, created on first signed send
+
+
+def _checkpoint_request(
+    checkpoint_id: str,
+    checkpoint_name: str,
+    context: Dict[str, Any],
+    kickoff_id: Optional[str]
+) -> Tuple[bytes, Dict[str, str]]:
+    """Serialized checkpoint payload and its headers (the Idempotency-Key is stable per checkpoint)."""
+    from webhook_ingest import dumps
+    
+    payload = create_checkpoint_webhook_payload(
+        checkpoint_id=checkpoint_id,
+        checkpoint_name=checkpoint_name,
+        context=context,
+        kickoff_id=kickoff_id
+    )
+    headers = {"Content-Type": "application/json", "Idempotency-Key": f"checkpoint.required:{checkpoint_id}"}
+    return dumps(payload), headers
+
+
 def send_checkpoint_webhook(
     webhook_url: str,
     checkpoint_id: str,
     checkpoint_name: str,
     context: Dict[str, Any],
     kickoff_id: Optional[str] = None,
-    secret: Optional[str] = None
+    secret: Optional[str] = None,
+    timeout: float = 10.0
 ):
     """
     Send checkpoint webhook manually (for custom integrations).
+    Blocking, single attempt; use send_checkpoint_webhook_async for queued delivery with retries.
     """
+    global _security
     import httpx
     from webhook_security import WebhookSecurity
     
-    payload = create_checkpoint_webhook_payload(
-        checkpoint_id=checkpoint_id,
-        checkpoint_name=checkpoint_name,
-        context=context,
-        kickoff_id=kickoff_id
-    )
+    body, headers = _checkpoint_request(checkpoint_id, checkpoint_name, context, kickoff_id)
     
-    headers = {"Content-Type": "application/json"}
-    
-    # Add signature if secret provided
+    # Sign the exact bytes that are sent
     if secret:
-        security = WebhookSecurity()
-        body_bytes = json.dumps(payload).encode()
-        signature = security.generate_signature(body_bytes, secret)
-        headers["X-CrewAI-Signature"] = signature
+        if _security is None:
+            _security = WebhookSecurity()
+        headers["X-CrewAI-Signature"] = _security.generate_signature(body, secret)
     
     # Send webhook
-    response = httpx.post(webhook_url, json=payload, headers=headers)
+    response = httpx.post(webhook_url, content=body, headers=headers, timeout=timeout)
     response.raise_for_status()
     
     return response.json()
 
 
+async def send_checkpoint_webhook_async(
+    engine,
+    webhook_url: str,
+    checkpoint_id: str,
+    checkpoint_name: str,
+    context: Dict[str, Any],
+    kickoff_id: Optional[str] = None,
+    wait: bool = False
+):
+    """
+    Queue a checkpoint webhook on a WebhookDeliveryEngine (pooled, persistent outbox, retries,
+    per-destination limits and circuit breakers; signed with the engine's secret).
+    Returns the delivery ID, or with wait=True the receiver's response once delivered
+    (raises webhook_delivery.DeliveryFailed when it is dead-lettered).
+    """
+    body, headers = _checkpoint_request(checkpoint_id, checkpoint_name, context, kickoff_id)
+    delivery_id = f"checkpoint.required:{checkpoint_id}"
+    if wait:
+        return await engine.deliver(webhook_url, body, headers, delivery_id=delivery_id)
+    return engine.enqueue(webhook_url, body, headers, delivery_id=delivery_id)
+
+
 # Example: Integrate with crew/run.py
 def integrate_with_crew_run():
     """
@@ -3,39 +3,336 @@ Notification Service for Enterprise HITL
 Sends notifications via multiple channels: Slack, Email, WebSocket, etc.
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Deque, Tuple, Callable, Awaitable
+from collections import deque
 import asyncio
+import json
+import time
 import httpx
 from datetime import datetime
 
 
+# Progress events: only the latest per (kickoff, task) matters to a client that is behind
+COALESCED_EVENT_TYPES = {"step.started", "step.completed", "task.started"}
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "disconnect")
+# Step events are collapsed into one digest message per (kickoff, task) on Slack/email
+DIGEST_EVENT_TYPES = {"step.started", "step.completed"}
+
+
+class WebSocketSubscriber:
+    """
+    Outbound queue of one WebSocket client, drained by its own sender task so a slow or
+    half-dead client never delays the broadcast or other clients.
+    When the queue is full, policy "drop_oldest" discards the oldest pending message and
+    "disconnect" closes the client. A queued progress event is replaced in place by a newer
+    one for the same kickoff/task (coalescing).
+    """
+    
+    def __init__(
+        self,
+        client: Any,
+        max_pending: int = 256,
+        policy: str = "drop_oldest",
+        send_timeout: float = 5.0
+    ):
+        self.client = client
+        self.max_pending = max_pending
+        self.policy = policy
+        self.send_timeout = send_timeout
+        # Entries are [coalesce_key, text] so coalescing can replace the text in place
+        self.pending: Deque[List[Any]] = deque()
+        self._by_key: Dict[Tuple, List[Any]] = {}
+        self._wakeup = asyncio.Event()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        self.task = asyncio.create_task(self._drain())
+    
+    def offer(self, text: str, coalesce_key: Optional[Tuple] = None) -> bool:
+        """Queue a serialized message without waiting; False if the client must be dropped."""
+        if self.closed:
+            return False
+        if coalesce_key is not None:
+            entry = self._by_key.get(coalesce_key)
+            if entry is not None:
+                entry[1] = text
+                self.coalesced += 1
+                return True
+        if len(self.pending) >= self.max_pending:
+            if self.policy == "disconnect":
+                self.close()
+                return False
+            oldest = self.pending.popleft()
+            if oldest[0] is not None and self._by_key.get(oldest[0]) is oldest:
+                del self._by_key[oldest[0]]
+            self.dropped += 1
+        entry = [coalesce_key, text]
+        self.pending.append(entry)
+        if coalesce_key is not None:
+            self._by_key[coalesce_key] = entry
+        self._wakeup.set()
+        return True
+    
+    def close(self):
+        self.closed = True
+        self.pending.clear()
+        self._by_key.clear()
+        self._wakeup.set()
+    
+    async def _drain(self):
+        try:
+            while not self.closed:
+                if not self.pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                entry = self.pending.popleft()
+                if entry[0] is not None and self._by_key.get(entry[0]) is entry:
+                    del self._by_key[entry[0]]
+                await asyncio.wait_for(self.client.send_text(entry[1]), self.send_timeout)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Send failed or timed out: the client is gone or too slow to keep
+            self.closed = True
+        if self.closed:
+            try:
+                await self.client.close()
+            except Exception:
+                pass
+
+
+class ChannelDispatcher:
+    """
+    Outbound queue of one notification channel (Slack, email) with at most `concurrency`
+    sends in flight. Step events are collected for digest_window seconds per (kickoff, task)
+    and sent as one "step.digest" message; any other event of that task flushes its digest
+    first, and a kickoff-level event (no task_id: crew.completed, crew.failed,
+    checkpoint.required) flushes every digest of its kickoff, so order is preserved.
+    Records delivery latency (queued -> sent) and failures.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        send: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+        concurrency: int = 4,
+        max_queue: int = 1000,
+        digest_window: float = 5.0
+    ):
+        self.name = name
+        self.send = send
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.digest_window = digest_window
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._digests: Dict[Tuple, Dict[str, Any]] = {}
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.digested = 0
+        self.last_error: Optional[str] = None
+    
+    def submit(self, event_type: str, payload: Dict[str, Any]):
+        """Queue an event without waiting on the channel (needs a running event loop)."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        
+        key = (payload.get("kickoff_id"), payload.get("task_id"))
+        if self.digest_window > 0 and event_type in DIGEST_EVENT_TYPES:
+            digest = self._digests.get(key)
+            if digest is None:
+                digest = self._digests[key] = {"events": [], "first_at": time.monotonic()}
+                digest["timer"] = asyncio.get_running_loop().call_later(
+                    self.digest_window, self._flush_digest, key
+                )
+            digest["events"].append((event_type, payload))
+            return
+        if self._digests:
+            kickoff_id, task_id = key
+            if task_id is None:
+                keys = [k for k in self._digests if k[0] == kickoff_id]  # oldest digest first
+            else:
+                keys = [k for k in ((kickoff_id, None), key) if k in self._digests]
+            for k in keys:
+                self._flush_digest(k)
+        self._enqueue(event_type, payload, time.monotonic())
+    
+    def _flush_digest(self, key: Tuple):
+        digest = self._digests.pop(key, None)
+        if not digest:
+            return
+        digest["timer"].cancel()
+        events = digest["events"]
+        if len(events) == 1:
+            self._enqueue(events[0][0], events[0][1], digest["first_at"])
+            return
+        self.digested += len(events) - 1
+        kickoff_id, task_id = key
+        last_type, last = events[-1]
+        message = f"⏳ {len(events)} step updates for task {task_id or '?'}\n"
+        message += f"Kickoff ID: {kickoff_id or '?'}\n"
+        message += f"Latest: {last.get('message') or last_type}"
+        self._enqueue("step.digest", {
+            "event_type": "step_digest",
+            "kickoff_id": kickoff_id,
+            "task_id": task_id,
+            "steps": len(events),
+            "message": message
+        }, digest["first_at"])
+    
+    def _enqueue(self, event_type: str, payload: Dict[str, Any], queued_at: float):
+        try:
+            self._queue.put_nowait((event_type, payload, queued_at))
+        except asyncio.QueueFull:
+            self.dropped += 1
+    
+    async def _worker(self):
+        while True:
+            event_type, payload, queued_at = await self._queue.get()
+            self.in_flight += 1
+            try:
+                await self.send(event_type, payload)
+                self.sent += 1
+                self._latencies.append(time.monotonic() - queued_at)
+            except Exception as e:
+                self.failed += 1
+                self.last_error = str(e)
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+    
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+        
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "in_flight": self.in_flight,
+            "pending_digests": len(self._digests),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "digested": self.digested,
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+            "last_error": self.last_error
+        }
+    
+    async def close(self, timeout: float = 5.0):
+        """Flush digests, give queued sends up to timeout seconds, then stop the workers."""
+        if self._queue is None:
+            return
+        for key in list(self._digests):
+            self._flush_digest(key)
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+
 class NotificationService:
     """Enterprise notification service for HITL workflows."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        ws_queue_size: int = 256,
+        ws_slow_consumer_policy: str = "drop_oldest",
+        ws_send_timeout: float = 5.0,
+        channel_concurrency: int = 4,
+        channel_queue_size: int = 1000,
+        digest_window: float = 5.0,
+        http_max_connections: int = 10
+    ):
+        if ws_slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(
+                f"Unknown slow consumer policy '{ws_slow_consumer_policy}'. Use one of {list(SLOW_CONSUMER_POLICIES)}"
+            )
         self.slack_webhook_url = None  # Set from env: SLACK_WEBHOOK_URL
         self.email_config = None  # Set from env: SMTP config
-        self.websocket_clients: List[Any] = []
+        self.ws_queue_size = ws_queue_size
+        self.ws_slow_consumer_policy = ws_slow_consumer_policy
+        self.ws_send_timeout = ws_send_timeout
+        self._subscribers: Dict[int, WebSocketSubscriber] = {}  # id(client) -> subscriber
+        self._ws_disconnected = 0
+        self.channel_concurrency = channel_concurrency
+        self.channel_queue_size = channel_queue_size
+        self.digest_window = digest_window
+        self.http_max_connections = http_max_connections
+        self._http: Optional[httpx.AsyncClient] = None  # pooled, created on first use
+        self._channels: Dict[str, ChannelDispatcher] = {}
+    
+    @property
+    def websocket_clients(self) -> List[Any]:
+        return [s.client for s in self._subscribers.values()]
     
     async def send_event_notification(
         self,
         event_type: str,
         payload: Dict[str, Any]
     ):
-        """Send notification for any event."""
+        """Send notification for any event (queued per channel; does not wait for delivery)."""
         # Send to all configured channels
-        tasks = []
-        
         if self.slack_webhook_url:
-            tasks.append(self.send_slack_notification(event_type, payload))
+            self._channel("slack").submit(event_type, payload)
         
         if self.email_config:
-            tasks.append(self.send_email_notification(event_type, payload))
+            self._channel("email").submit(event_type, payload)
         
         # Send WebSocket notifications
-        tasks.append(self.send_websocket_notification(event_type, payload))
-        
-        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.send_websocket_notification(event_type, payload)
+    
+    def _channel(self, name: str) -> ChannelDispatcher:
+        dispatcher = self._channels.get(name)
+        if dispatcher is None:
+            send = {"slack": self._post_slack, "email": self.send_email_notification}[name]
+            dispatcher = self._channels[name] = ChannelDispatcher(
+                name,
+                send,
+                concurrency=self.channel_concurrency,
+                max_queue=self.channel_queue_size,
+                digest_window=self.digest_window
+            )
+        return dispatcher
+    
+    def _http_client(self) -> httpx.AsyncClient:
+        """Long-lived pooled client: one TLS handshake per connection, not per message."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(10.0),
+                limits=httpx.Limits(
+                    max_connections=self.http_max_connections,
+                    max_keepalive_connections=self.http_max_connections
+                )
+            )
+        return self._http
+    
+    def channel_stats(self) -> Dict[str, Any]:
+        """Per-channel delivery metrics for /health."""
+        return {name: dispatcher.stats() for name, dispatcher in self._channels.items()}
+    
+    async def aclose(self):
+        """Flush channel queues and close the pooled HTTP client (app shutdown)."""
+        for dispatcher in self._channels.values():
+            await dispatcher.close()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
     
     async def send_checkpoint_notification(
         self,
@@ -106,52 +403,51 @@ class NotificationService:
             return
         
         try:
-            message = payload.get("message", f"Event: {event_type}")
-            
-            slack_payload = {
-                "text": message,
-                "blocks": [
+            await self._post_slack(event_type, payload)
+        except Exception as e:
+            print(f"Failed to send Slack notification: {e}")
+    
+    async def _post_slack(self, event_type: str, payload: Dict[str, Any]):
+        """POST one message to the Slack webhook over the pooled client; raises on failure."""
+        message = payload.get("message", f"Event: {event_type}")
+        
+        slack_payload = {
+            "text": message,
+            "blocks": [
+                {
+                    "type": "section",
+                    "text": {
+                        "type": "mrkdwn",
+                        "text": message
+                    }
+                }
+            ]
+        }
+        
+        # Add action buttons for checkpoints
+        if event_type == "checkpoint.required":
+            slack_payload["blocks"].append({
+                "type": "actions",
+                "elements": [
+                    {
+                        "type": "button",
+                        "text": {"type": "plain_text", "text": "Approve"},
+                        "style": "primary",
+                        "value": f"approve_{payload.get('checkpoint_id')}",
+                        "action_id": "approve_checkpoint"
+                    },
                     {
-                        "type": "section",
-                        "text": {
-                            "type": "mrkdwn",
-                            "text": message
-                        }
+                        "type": "button",
+                        "text": {"type": "plain_text", "text": "Reject"},
+                        "style": "danger",
+                        "value": f"reject_{payload.get('checkpoint_id')}",
+                        "action_id": "reject_checkpoint"
                     }
                 ]
-            }
-            
-            # Add action buttons for checkpoints
-            if event_type == "checkpoint.required":
-                slack_payload["blocks"].append({
-                    "type": "actions",
-                    "elements": [
-                        {
-                            "type": "button",
-                            "text": {"type": "plain_text", "text": "Approve"},
-                            "style": "primary",
-                            "value": f"approve_{payload.get('checkpoint_id')}",
-                            "action_id": "approve_checkpoint"
-                        },
-                        {
-                            "type": "button",
-                            "text": {"type": "plain_text", "text": "Reject"},
-                            "style": "danger",
-                            "value": f"reject_{payload.get('checkpoint_id')}",
-                            "action_id": "reject_checkpoint"
-                        }
-                    ]
-                })
-            
-            async with httpx.AsyncClient() as client:
-                await client.post(
-                    self.slack_webhook_url,
-                    json=slack_payload,
-                    timeout=10.0
-                )
+            })
         
-        except Exception as e:
-            print(f"Failed to send Slack notification: {e}")
+        response = await self._http_client().post(self.slack_webhook_url, json=slack_payload)
+        response.raise_for_status()
     
     async def send_email_notification(
         self,
@@ -172,8 +468,11 @@ class NotificationService:
         event_type: str,
         payload: Dict[str, Any]
     ):
-        """Send notification via WebSocket to connected clients."""
-        if not self.websocket_clients:
+        """
+        Send notification via WebSocket to connected clients.
+        Serializes once and queues the text on every client; returns without waiting on any send.
+        """
+        if not self._subscribers:
             return
         
         message = {
@@ -181,24 +480,55 @@ class NotificationService:
             "payload": payload,
             "timestamp": datetime.utcnow().isoformat()
         }
+        text = json.dumps(message, default=str)
+        coalesce_key = None
+        if event_type in COALESCED_EVENT_TYPES:
+            coalesce_key = (payload.get("kickoff_id"), payload.get("task_id"))
         
-        # Send to all connected clients
         disconnected = []
-        for client in self.websocket_clients:
-            try:
-                await client.send_json(message)
-            except Exception:
-                disconnected.append(client)
+        for key, subscriber in self._subscribers.items():
+            if not subscriber.offer(text, coalesce_key):
+                disconnected.append(key)
         
-        # Remove disconnected clients
-        for client in disconnected:
-            self.websocket_clients.remove(client)
+        # Remove disconnected / too slow clients
+        for key in disconnected:
+            self._remove_subscriber(key)
     
     def register_websocket_client(self, client: Any):
-        """Register a WebSocket client for real-time notifications."""
-        self.websocket_clients.append(client)
+        """Register a WebSocket client for real-time notifications (needs a running event loop)."""
+        subscriber = WebSocketSubscriber(
+            client,
+            max_pending=self.ws_queue_size,
+            policy=self.ws_slow_consumer_policy,
+            send_timeout=self.ws_send_timeout
+        )
+        self._subscribers[id(client)] = subscriber
+        subscriber.start()
     
     def unregister_websocket_client(self, client: Any):
         """Unregister a WebSocket client."""
-        if client in self.websocket_clients:
-            self.websocket_clients.remove(client)
+        subscriber = self._subscribers.pop(id(client), None)
+        if subscriber:
+            subscriber.close()
+            if subscriber.task:
+                subscriber.task.cancel()
+    
+    def _remove_subscriber(self, key: int):
+        subscriber = self._subscribers.pop(key, None)
+        if subscriber:
+            self._ws_disconnected += 1
+            subscriber.close()  # drain task exits and closes the socket
+    
+    def websocket_stats(self) -> Dict[str, Any]:
+        """Fan-out counters for /health."""
+        subscribers = list(self._subscribers.values())
+        # Clients whose drain task failed are reaped lazily on the next broadcast
+        return {
+            "clients": len(subscribers),
+            "queued": sum(len(s.pending) for s in subscribers),
+            "sent": sum(s.sent for s in subscribers),
+            "dropped": sum(s.dropped for s in subscribers),
+            "coalesced": sum(s.coalesced for s in subscribers),
+            "disconnected_slow": self._ws_disconnected,
+            "policy": self.ws_slow_consumer_policy
+        }
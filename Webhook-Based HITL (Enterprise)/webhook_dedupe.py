@@ -0,0 +1,149 @@
+"""
+Webhook Delivery Deduplication
+Bounded, time-windowed index of delivery keys so retried webhook deliveries are
+acknowledged without being processed (or notified) twice.
+"""
+
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
+
+
+def delivery_key(delivery_id: Optional[str], body: bytes) -> str:
+    """Sender's delivery ID when present, otherwise a hash of the exact body bytes."""
+    if delivery_id:
+        return f"id:{delivery_id.strip()}"
+    return f"sha256:{hashlib.sha256(body).hexdigest()}"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for capacity keys at error_rate (enhanced double hashing)."""
+
+    def __init__(self, capacity: int, error_rate: float = 1e-6):
+        self.bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Enhanced double hashing: the step itself changes per probe, so no key collapses onto
+        # a few bits (plain h1 + i*h2 does whenever h2 shares a factor with the bit count)
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        x = int.from_bytes(digest[:8], "little") % self.bits
+        y = int.from_bytes(digest[8:], "little") % self.bits
+        for i in range(self.hashes):
+            yield x
+            x = (x + y) % self.bits
+            y = (y + i + 1) % self.bits
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class DedupeIndex:
+    """
+    LRU of delivery key -> event_id, bounded by max_entries and by window_seconds since a
+    key was last seen; claim() is O(1) (dict lookup + eviction from the cold end).
+    With bloom_capacity > 0, keys also go into two rotating Bloom filter generations
+    covering one to two windows (less when more than bloom_capacity keys arrive per window,
+    since a full generation is rotated out early), so duplicates of keys already evicted from
+    the LRU (under memory pressure) are still caught, at the filter's false-positive rate. Timestamps are
+    wall-clock so entries survive a restart via export()/load().
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 86400,
+        max_entries: int = 100000,
+        bloom_capacity: int = 0,
+        bloom_error_rate: float = 1e-6
+    ):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (event_id, last seen)
+        self._blooms: List[BloomFilter] = []
+        self._bloom_started = 0.0
+        self.duplicates = 0
+        self.probable_duplicates = 0
+
+    def claim(self, key: str, event_id: str, now: Optional[float] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Record a delivery. Returns (True, event_id) for a new key; (False, earlier event_id)
+        for a duplicate, with None when only the Bloom filter remembered the key.
+        """
+        now = time.time() if now is None else now
+        self._expire(now)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries[key] = (entry[0], now)
+            self._entries.move_to_end(key)
+            self.duplicates += 1
+            return False, entry[0]
+        if self.bloom_capacity > 0:
+            self._rotate_blooms(now)
+        if any(key in bloom for bloom in self._blooms):
+            self.duplicates += 1
+            self.probable_duplicates += 1
+            return False, None
+        self.add(key, event_id, now)
+        return True, event_id
+
+    def add(self, key: str, event_id: str, seen_at: Optional[float] = None):
+        """Insert or refresh a key (also used when rebuilding from the event log)."""
+        seen_at = time.time() if seen_at is None else seen_at
+        self._entries[key] = (event_id, seen_at)
+        self._entries.move_to_end(key)
+        if self.bloom_capacity > 0:
+            self._rotate_blooms(seen_at)
+            self._blooms[0].add(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._entries:
+            key, (_, seen_at) = next(iter(self._entries.items()))
+            if seen_at >= cutoff:
+                break
+            self._entries.popitem(last=False)
+
+    def _rotate_blooms(self, now: float):
+        """
+        Start a new generation every window, or as soon as the current one holds capacity keys
+        (beyond that its false-positive rate climbs); keep only the previous one.
+        """
+        elapsed = now - self._bloom_started
+        if self._blooms and elapsed < self.window_seconds and self._blooms[0].count < self.bloom_capacity:
+            return
+        keep = self._blooms[:1] if self._blooms and elapsed < 2 * self.window_seconds else []
+        self._blooms = [BloomFilter(self.bloom_capacity, self.bloom_error_rate)] + keep
+        self._bloom_started = now
+
+    def export(self) -> List[List[Any]]:
+        """[key, event_id, last seen] of live entries, oldest first (for snapshots)."""
+        self._expire(time.time())
+        return [[key, event_id, seen_at] for key, (event_id, seen_at) in self._entries.items()]
+
+    def load(self, entries: List[List[Any]]):
+        for key, event_id, seen_at in entries:
+            self.add(key, event_id, seen_at)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "duplicates": self.duplicates,
+            "probable_duplicates": self.probable_duplicates,
+            "bloom_keys": sum(bloom.count for bloom in self._blooms)
+        }
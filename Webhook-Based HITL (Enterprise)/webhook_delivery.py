@@ -0,0 +1,568 @@
+"""
+Outbound Webhook Delivery Engine
+Async, persistent delivery of outgoing webhooks (checkpoint events to a webhook server) with
+a pooled HTTP client, retries with backoff, per-destination concurrency limits and circuit breakers.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+import uuid
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, Set, Deque
+from urllib.parse import urlsplit
+
+import httpx
+
+from webhook_event_log import EventLog
+from webhook_ingest import dumps, loads
+from webhook_security import WebhookSecurity
+
+
+# Client errors that will not succeed on a retry are dead-lettered at once; these are retried
+_RETRYABLE_STATUS = {408, 425, 429}
+
+
+class DeliveryFailed(Exception):
+    """A delivery was dead-lettered (retries exhausted or rejected by the receiver)."""
+
+    def __init__(self, delivery_id: str, error: str):
+        super().__init__(f"Webhook delivery {delivery_id} failed: {error}")
+        self.delivery_id = delivery_id
+        self.error = error
+
+
+class CircuitBreaker:
+    """
+    Per-destination breaker. Closed: requests flow. After failure_threshold consecutive failures
+    it opens and no requests are sent for reset_timeout seconds; then it is half-open and lets a
+    single probe through, which closes it on success or re-opens it on failure.
+    """
+
+    __slots__ = ("failure_threshold", "reset_timeout", "state", "failures", "opened_at", "probing", "opened")
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.opened = 0
+
+    def allow(self, now: float) -> bool:
+        """Whether a request may be sent now (claims the probe when half-open)."""
+        if self.state == "open":
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def reopens_at(self) -> float:
+        return self.opened_at + self.reset_timeout
+
+    def release_probe(self):
+        """End a half-open probe without a verdict; the next allow() may start another."""
+        self.probing = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self, now: float):
+        self.failures += 1
+        self.probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self.opened_at = now
+
+
+class _Destination:
+    """Delivery state of one scheme://host:port: breaker, attempts in flight, due deliveries waiting."""
+
+    __slots__ = ("breaker", "in_flight", "waiting", "wakeup_due")
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.in_flight = 0
+        self.waiting: Deque[str] = deque()
+        self.wakeup_due = 0.0
+
+
+def destination_key(url: str) -> str:
+    """scheme://host:port that concurrency limits and circuit breakers apply to."""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+class WebhookDeliveryEngine:
+    """
+    enqueue() serializes the payload once, signs those exact bytes once, records the delivery in
+    the outbox and returns at once; the bytes that were signed are the bytes sent on every attempt.
+    One scheduler task keeps deliveries in a min-heap by next-attempt time and hands due ones to
+    their destination, which runs at most per_destination_concurrency attempts at a time over a
+    shared pooled httpx.AsyncClient. 2xx is delivered; transport errors, timeouts, 408/425/429
+    and 5xx are retried with exponential backoff and jitter (Retry-After is honoured) and count
+    against the destination's circuit breaker; other 4xx, requests the client fails to send for
+    any other reason (an invalid URL, say) and exhausted retries are dead-lettered.
+    With an event_log the outbox is durable: undelivered deliveries are sent again after a
+    restart (same delivery ID and Idempotency-Key, so the receiver drops duplicates).
+    """
+
+    def __init__(
+        self,
+        event_log: Optional[EventLog] = None,
+        secret: Optional[str] = None,
+        max_retries: int = 8,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 300.0,
+        timeout: float = 10.0,
+        max_connections: int = 100,
+        per_destination_concurrency: int = 4,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_pending: int = 100000,
+        max_dead_letters: int = 1000,
+        snapshot_every: int = 10000,
+        client: Optional[httpx.AsyncClient] = None
+    ):
+        self._security = WebhookSecurity()
+        self.secret = secret if secret is not None else self._security.get_webhook_secret()
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.per_destination_concurrency = max(1, per_destination_concurrency)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_pending = max_pending
+        self.max_dead_letters = max_dead_letters
+        self._client = client
+        self._owns_client = client is None
+
+        self._pending: Dict[str, Dict[str, Any]] = {}  # delivery_id -> delivery (in the outbox)
+        self._dead_letters: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._destinations: Dict[str, _Destination] = {}
+        self._heap: List[Tuple[float, int, str, str]] = []  # (due, seq, delivery_id or "", destination)
+        self._heap_seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        self._attempts: Set[asyncio.Task] = set()
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self.delivered = 0
+        self.retried = 0
+        self.dead_lettered = 0
+
+        self._event_log = event_log
+        self._snapshot_every = snapshot_every
+        self._records_since_snapshot = 0
+        if event_log is not None:
+            self._recover()
+
+    def enqueue(
+        self,
+        url: str,
+        payload: Any,
+        headers: Optional[Dict[str, str]] = None,
+        delivery_id: Optional[str] = None
+    ) -> str:
+        """
+        Queue a JSON delivery (payload is serialized here; bytes are sent as they are) and return
+        its delivery ID, which is also sent as X-Webhook-Delivery-Id. An Idempotency-Key header
+        defaults to the delivery ID. Raises asyncio.QueueFull when max_pending are undelivered.
+        """
+        if len(self._pending) >= self.max_pending:
+            raise asyncio.QueueFull()
+        body = payload if isinstance(payload, bytes) else dumps(payload)
+        delivery_id = delivery_id or uuid.uuid4().hex
+        if delivery_id in self._pending:
+            return delivery_id  # already queued
+        headers = {"Content-Type": "application/json", **(headers or {})}
+        headers.setdefault("Idempotency-Key", delivery_id)
+        headers["X-Webhook-Delivery-Id"] = delivery_id
+        if self.secret:
+            headers["X-CrewAI-Signature"] = self._security.generate_signature(body, self.secret)
+        delivery = {
+            "delivery_id": delivery_id,
+            "url": url,
+            "headers": headers,
+            "body": body.decode("utf-8"),
+            "attempts": 0,
+            "created_at": time.time()
+        }
+        delivery["_body"] = body
+        self._pending[delivery_id] = delivery
+        self._log("delivery.enqueued", {k: v for k, v in delivery.items() if not k.startswith("_")})
+        self._schedule(delivery, time.monotonic())
+        return delivery_id
+
+    async def deliver(self, url: str, payload: Any, headers: Optional[Dict[str, str]] = None, **kwargs) -> Any:
+        """
+        enqueue() and wait until delivered; returns the receiver's JSON response (None when the
+        body is not JSON). Raises DeliveryFailed when the delivery is dead-lettered.
+        """
+        delivery_id = self.enqueue(url, payload, headers, **kwargs)
+        waiter = self._waiters.get(delivery_id)
+        if waiter is None:
+            waiter = self._waiters[delivery_id] = asyncio.get_running_loop().create_future()
+        return await asyncio.shield(waiter)
+
+    def _destination(self, key: str) -> _Destination:
+        destination = self._destinations.get(key)
+        if destination is None:
+            destination = self._destinations[key] = _Destination(
+                CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            )
+        return destination
+
+    def _schedule(self, delivery: Dict[str, Any], due: float):
+        self._push(due, delivery["delivery_id"], destination_key(delivery["url"]))
+
+    def _push(self, due: float, delivery_id: str, destination: str):
+        entry = (due, next(self._heap_seq), delivery_id, destination)
+        heapq.heappush(self._heap, entry)
+        if self._wakeup is not None and self._heap[0] is entry:
+            self._wakeup.set()  # earlier than what the scheduler is sleeping for
+        self._ensure_scheduler()
+
+    def _ensure_scheduler(self):
+        if self._scheduler is not None and not self._scheduler.done():
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # started by start() / the first enqueue on a running loop
+        self._wakeup = asyncio.Event()
+        self._scheduler = asyncio.create_task(self._run_scheduler())
+
+    async def _run_scheduler(self):
+        """Sleep until the earliest due delivery, then hand it to its destination."""
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            delay = self._heap[0][0] - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, delivery_id, key = heapq.heappop(self._heap)
+            destination = self._destination(key)
+            if delivery_id:
+                if delivery_id not in self._pending:
+                    continue  # delivered or dead-lettered meanwhile
+                destination.waiting.append(delivery_id)
+            else:
+                destination.wakeup_due = 0.0  # breaker reset timer
+            self._pump(key, destination)
+
+    def _pump(self, key: str, destination: _Destination):
+        """Start due attempts for a destination while its concurrency limit and breaker allow."""
+        now = time.monotonic()
+        while destination.waiting and destination.in_flight < self.per_destination_concurrency:
+            delivery = self._pending.get(destination.waiting[0])
+            if delivery is None:
+                destination.waiting.popleft()
+                continue
+            if not destination.breaker.allow(now):
+                breaker = destination.breaker
+                if breaker.state == "open" and not destination.wakeup_due:
+                    destination.wakeup_due = breaker.reopens_at()
+                    self._push(destination.wakeup_due, "", key)
+                return  # a half-open probe in flight pumps again when it finishes
+            destination.waiting.popleft()
+            destination.in_flight += 1
+            task = asyncio.create_task(self._attempt(key, destination, delivery))
+            self._attempts.add(task)
+            task.add_done_callback(self._attempts.discard)
+
+    def _http_client(self) -> httpx.AsyncClient:
+        """Long-lived pooled client shared by all destinations."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    async def _attempt(self, key: str, destination: _Destination, delivery: Dict[str, Any]):
+        delivery["attempts"] += 1
+        retry_after = None
+        pump = True
+        try:
+            try:
+                response = await self._http_client().post(
+                    delivery["url"], content=delivery["_body"], headers=delivery["headers"]
+                )
+            except httpx.HTTPError as e:
+                error, retryable = f"{type(e).__name__}: {e}", True
+                destination.breaker.record_failure(time.monotonic())
+            except Exception as e:
+                # Not a transport failure (an invalid URL or header, say): it fails the same way every time
+                error, retryable = f"{type(e).__name__}: {e}", False
+                destination.breaker.release_probe()  # says nothing about the receiver
+            else:
+                status = response.status_code
+                if 200 <= status < 300:
+                    destination.breaker.record_success()
+                    self._complete(delivery, response)
+                    return
+                error = f"HTTP {status}"
+                retryable = status >= 500 or status in _RETRYABLE_STATUS
+                retry_after = _retry_after(response.headers.get("Retry-After"))
+                if retryable:
+                    destination.breaker.record_failure(time.monotonic())
+                else:
+                    destination.breaker.record_success()  # the receiver is up, it rejected this delivery
+
+            if retryable and delivery["attempts"] <= self.max_retries:
+                delay = max(self._backoff(delivery["attempts"]), min(retry_after or 0.0, self.max_retry_delay))
+                self.retried += 1
+                self._record("delivery.retrying", {
+                    "delivery_id": delivery["delivery_id"],
+                    "attempts": delivery["attempts"],
+                    "error": error,
+                    "next_attempt_at": time.time() + delay
+                })
+                self._schedule(delivery, time.monotonic() + delay)
+            else:
+                self._record("delivery.dead_lettered", {
+                    "delivery_id": delivery["delivery_id"],
+                    "attempts": delivery["attempts"],
+                    "error": error,
+                    "dead_lettered_at": time.time()
+                })
+                self._resolve(delivery["delivery_id"], error=error)
+        except asyncio.CancelledError:
+            pump = False  # closing: the delivery stays in the outbox for the next start
+            destination.breaker.release_probe()
+            raise
+        finally:
+            destination.in_flight -= 1
+            if pump:
+                self._pump(key, destination)
+
+    def _backoff(self, attempts: int) -> float:
+        """Exponential backoff with jitter: uniform in [d/2, d], d = base * 2^(n-1), capped."""
+        delay = min(self.max_retry_delay, self.retry_delay * (2 ** (attempts - 1)))
+        return random.uniform(delay / 2, delay)
+
+    def _complete(self, delivery: Dict[str, Any], response: httpx.Response):
+        self._record("delivery.delivered", {
+            "delivery_id": delivery["delivery_id"],
+            "attempts": delivery["attempts"],
+            "status_code": response.status_code
+        })
+        try:
+            result = loads(response.content) if response.content else None
+        except ValueError:
+            result = None
+        self._resolve(delivery["delivery_id"], result=result)
+
+    def _resolve(self, delivery_id: str, result: Any = None, error: Optional[str] = None):
+        waiter = self._waiters.pop(delivery_id, None)
+        if waiter is None or waiter.done():
+            return
+        if error is None:
+            waiter.set_result(result)
+        else:
+            waiter.set_exception(DeliveryFailed(delivery_id, error))
+
+    def _apply_enqueued(self, data: Dict[str, Any]):
+        delivery = dict(data)
+        delivery["_body"] = delivery["body"].encode("utf-8")
+        self._pending[delivery["delivery_id"]] = delivery
+
+    def _apply_retrying(self, data: Dict[str, Any]):
+        delivery = self._pending.get(data["delivery_id"])
+        if delivery is not None:
+            delivery.update(attempts=data["attempts"], error=data["error"], next_attempt_at=data["next_attempt_at"])
+
+    def _apply_delivered(self, data: Dict[str, Any]):
+        if self._pending.pop(data["delivery_id"], None) is not None:
+            self.delivered += 1
+
+    def _apply_dead_lettered(self, data: Dict[str, Any]):
+        delivery = self._pending.pop(data["delivery_id"], None)
+        if delivery is None:
+            return
+        delivery.update(attempts=data["attempts"], error=data["error"], dead_lettered_at=data["dead_lettered_at"])
+        delivery.pop("next_attempt_at", None)
+        self.dead_lettered += 1
+        self._dead_letters[data["delivery_id"]] = delivery
+        while len(self._dead_letters) > self.max_dead_letters:
+            self._dead_letters.popitem(last=False)
+
+    def _apply_replayed(self, data: Dict[str, Any]):
+        delivery = self._dead_letters.pop(data["delivery_id"], None)
+        if delivery is not None:
+            for field in ("error", "dead_lettered_at", "next_attempt_at"):
+                delivery.pop(field, None)
+            delivery["attempts"] = 0
+            self._pending[data["delivery_id"]] = delivery
+
+    _APPLY = {
+        "delivery.enqueued": _apply_enqueued,
+        "delivery.retrying": _apply_retrying,
+        "delivery.delivered": _apply_delivered,
+        "delivery.dead_lettered": _apply_dead_lettered,
+        "delivery.replayed": _apply_replayed
+    }
+
+    def _record(self, kind: str, data: Dict[str, Any]):
+        """Apply an outbox mutation and log it (replay applies the same records)."""
+        self._APPLY[kind](self, data)
+        self._log(kind, data)
+
+    def _log(self, kind: str, data: Dict[str, Any]):
+        if self._event_log is None:
+            return
+        self._event_log.append(kind, data)
+        self._records_since_snapshot += 1
+        if self._records_since_snapshot >= self._snapshot_every:
+            self.snapshot()
+
+    def _recover(self):
+        """Rebuild the outbox from the latest snapshot plus the records after it."""
+        seq, state = self._event_log.load_snapshot()
+        if state:
+            self.delivered = state["delivered"]
+            for delivery in state["pending"]:
+                self._apply_enqueued(delivery)
+            for delivery in state["dead_letters"]:
+                self._apply_enqueued(delivery)
+                self._dead_letters[delivery["delivery_id"]] = self._pending.pop(delivery["delivery_id"])
+            self.dead_lettered = state["dead_lettered"]
+        for record in self._event_log.iter_records(after_seq=seq):
+            self._APPLY[record["kind"]](self, record["data"])
+        # Undelivered deliveries go out again when due (interrupted attempts right away)
+        now, wall = time.monotonic(), time.time()
+        for delivery in self._pending.values():
+            self._schedule(delivery, now + max(0.0, delivery.get("next_attempt_at", wall) - wall))
+
+    def snapshot(self):
+        """Snapshot the outbox (undelivered and dead-lettered deliveries) to the log."""
+        if self._event_log is None:
+            return
+        state = {
+            "pending": [{k: v for k, v in d.items() if not k.startswith("_")} for d in self._pending.values()],
+            "dead_letters": [{k: v for k, v in d.items() if not k.startswith("_")} for d in self._dead_letters.values()],
+            "delivered": self.delivered,
+            "dead_lettered": self.dead_lettered
+        }
+        self._event_log.save_snapshot(self._event_log.last_seq, dumps(state))
+        self._records_since_snapshot = 0
+
+    def list_dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent dead-lettered deliveries first."""
+        items = []
+        for delivery in reversed(self._dead_letters.values()):
+            if len(items) >= limit:
+                break
+            items.append({k: v for k, v in delivery.items() if not k.startswith("_")})
+        return items
+
+    def replay_dead_letter(self, delivery_id: str) -> bool:
+        """Send a dead-lettered delivery again (same bytes and signature) with a fresh retry budget."""
+        if delivery_id not in self._dead_letters:
+            return False
+        self._record("delivery.replayed", {"delivery_id": delivery_id})
+        self._schedule(self._pending[delivery_id], time.monotonic())
+        return True
+
+    async def start(self):
+        """Start the scheduler (recovered deliveries are sent from here on)."""
+        self._ensure_scheduler()
+
+    async def close(self, timeout: float = 10.0):
+        """
+        Let attempts in flight finish (up to timeout), then stop. Undelivered deliveries stay in
+        the outbox for the next start.
+        """
+        if self._attempts:
+            await asyncio.wait(set(self._attempts), timeout=timeout)
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            await asyncio.gather(self._scheduler, return_exceptions=True)
+            self._scheduler = None
+        for task in list(self._attempts):
+            task.cancel()
+        await asyncio.gather(*self._attempts, return_exceptions=True)
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+        if self._event_log is not None:
+            self.snapshot()
+            self._event_log.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "in_flight": sum(destination.in_flight for destination in self._destinations.values()),
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "dead_letters": len(self._dead_letters),
+            "destinations": {
+                key: {
+                    "circuit": destination.breaker.state,
+                    "in_flight": destination.in_flight,
+                    "waiting": len(destination.waiting),
+                    "consecutive_failures": destination.breaker.failures,
+                    "times_opened": destination.breaker.opened
+                }
+                for key, destination in self._destinations.items()
+            }
+        }
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (the delta-seconds form only)."""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+def create_delivery_engine_from_env(secret: Optional[str] = None) -> WebhookDeliveryEngine:
+    """
+    Engine configured from WEBHOOK_DELIVERY_* variables. The outbox is persisted in
+    WEBHOOK_OUTBOX_DIR (default: webhook_outbox/ next to this module) unless WEBHOOK_OUTBOX=memory.
+    """
+    kind = os.getenv("WEBHOOK_OUTBOX", "file").strip().lower()
+    if kind not in ("file", "memory"):
+        raise ValueError(f"Unknown WEBHOOK_OUTBOX '{kind}'. Use 'file' or 'memory'.")
+    event_log = None
+    if kind == "file":
+        event_log = EventLog(os.getenv("WEBHOOK_OUTBOX_DIR") or str(Path(__file__).parent / "webhook_outbox"))
+    return WebhookDeliveryEngine(
+        event_log=event_log,
+        secret=secret,
+        max_retries=int(os.getenv("WEBHOOK_DELIVERY_MAX_RETRIES", "8")),
+        retry_delay=float(os.getenv("WEBHOOK_DELIVERY_RETRY_DELAY", "1")),
+        max_retry_delay=float(os.getenv("WEBHOOK_DELIVERY_MAX_RETRY_DELAY", "300")),
+        timeout=float(os.getenv("WEBHOOK_DELIVERY_TIMEOUT", "10")),
+        max_connections=int(os.getenv("WEBHOOK_DELIVERY_MAX_CONNECTIONS", "100")),
+        per_destination_concurrency=int(os.getenv("WEBHOOK_DELIVERY_CONCURRENCY", "4")),
+        failure_threshold=int(os.getenv("WEBHOOK_DELIVERY_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("WEBHOOK_DELIVERY_BREAKER_RESET", "30"))
+    )
@@ -0,0 +1,204 @@
+"""
+Keyed Event Dispatcher for the Webhook Server
+Per-kickoff ordered, cross-kickoff parallel processing of received webhook events.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple, Set, Callable, Awaitable
+
+
+class _KeyState:
+    """Reorder state of one key: next expected sender sequence and the events held for it."""
+
+    __slots__ = ("next_seq", "held", "held_since")
+
+    def __init__(self, next_seq: int):
+        self.next_seq = next_seq
+        self.held: List[Tuple[int, int, Dict[str, Any]]] = []  # (sequence, arrival, item)
+        self.held_since = 0.0
+
+
+class KeyedEventDispatcher:
+    """
+    Hashes each event's key (kickoff_id) onto one of `workers` bounded queues, each drained
+    by its own task: events of one kickoff are handled one at a time in arrival order, while
+    different kickoffs proceed in parallel on other workers.
+    Events carrying a sender sequence number are also put back in sender order: one that
+    arrives ahead of a gap is held (per key) until the missing ones arrive, or for at most
+    reorder_timeout seconds, after which the gap is skipped. Sequences below the next expected
+    one (late or re-sent events) are handled immediately. Reorder state is kept for the
+    max_keys most recently active keys per worker.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[..., Awaitable[None]],
+        workers: int = 8,
+        queue_size: int = 1000,
+        reorder_timeout: float = 2.0,
+        max_keys: int = 10000,
+        first_sequence: int = 1
+    ):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.reorder_timeout = reorder_timeout
+        self.max_keys = max_keys
+        self.first_sequence = first_sequence
+        self._queues: List[asyncio.Queue] = []
+        self._states: List["OrderedDict[str, _KeyState]"] = [OrderedDict() for _ in range(self.workers)]
+        self._holding: List[Set[str]] = [set() for _ in range(self.workers)]
+        self._tasks: List[asyncio.Task] = []
+        self._arrivals = itertools.count()
+        self.processed = 0
+        self.reordered = 0
+        self.gaps_skipped = 0
+        self.failed = 0
+
+    def shard(self, key: str) -> int:
+        """Stable worker index for a key."""
+        return zlib.crc32(key.encode("utf-8")) % self.workers
+
+    def has_capacity(self, key: str) -> bool:
+        """Whether submit(key, ...) would be accepted now."""
+        return not self._queues or not self._queues[self.shard(key)].full()
+
+    def submit(self, key: str, item: Dict[str, Any], sequence: Optional[int] = None):
+        """
+        Queue handler(**item) behind earlier events of the same key.
+        Raises asyncio.QueueFull when that key's worker queue is full.
+        """
+        self._ensure_started()
+        self._queues[self.shard(key)].put_nowait((key, sequence, item))
+
+    def _ensure_started(self):
+        if not self._tasks:
+            self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def _worker(self, index: int):
+        queue = self._queues[index]
+        getter: Optional[asyncio.Future] = None  # kept across reorder timeouts so no item is lost
+        try:
+            while True:
+                if getter is None:
+                    getter = asyncio.ensure_future(queue.get())
+                timeout = self._next_deadline(index)
+                done, _ = await asyncio.wait({getter}, timeout=None if timeout is None else max(0.0, timeout))
+                if not done:
+                    await self._skip_expired_gaps(index)
+                    continue
+                key, sequence, item = getter.result()
+                getter = None
+                try:
+                    await self._accept(index, key, sequence, item)
+                finally:
+                    queue.task_done()
+        finally:
+            if getter is not None:
+                getter.cancel()
+
+    async def _accept(self, index: int, key: str, sequence: Optional[int], item: Dict[str, Any]):
+        if sequence is None:
+            await self._run(item)
+            return
+        state = self._state(index, key)
+        if sequence < state.next_seq:
+            await self._run(item)  # late or re-sent: its gap was already skipped
+        elif sequence == state.next_seq:
+            await self._run(item)
+            state.next_seq = sequence + 1
+            await self._release(index, key, state)
+        else:
+            if not state.held:
+                state.held_since = time.monotonic()
+                self._holding[index].add(key)
+            heapq.heappush(state.held, (sequence, next(self._arrivals), item))
+
+    def _state(self, index: int, key: str) -> _KeyState:
+        states = self._states[index]
+        state = states.get(key)
+        if state is None:
+            state = states[key] = _KeyState(self.first_sequence)
+            if len(states) > self.max_keys:
+                # Forget the least recently active key that holds nothing
+                for old_key, old_state in states.items():
+                    if not old_state.held and old_key != key:
+                        del states[old_key]
+                        break
+        else:
+            states.move_to_end(key)
+        return state
+
+    async def _release(self, index: int, key: str, state: _KeyState):
+        """Handle held events that are now next in sequence."""
+        while state.held and state.held[0][0] <= state.next_seq:
+            sequence, _, item = heapq.heappop(state.held)
+            self.reordered += 1
+            await self._run(item)
+            state.next_seq = max(state.next_seq, sequence + 1)
+        if state.held:
+            state.held_since = time.monotonic()  # a further gap gets its own timeout
+        else:
+            self._holding[index].discard(key)
+
+    def _next_deadline(self, index: int) -> Optional[float]:
+        holding = self._holding[index]
+        if not holding:
+            return None
+        states = self._states[index]
+        oldest = min(states[key].held_since for key in holding)
+        return oldest + self.reorder_timeout - time.monotonic()
+
+    async def _skip_expired_gaps(self, index: int):
+        now = time.monotonic()
+        for key in list(self._holding[index]):
+            state = self._states[index][key]
+            if now - state.held_since >= self.reorder_timeout:
+                self.gaps_skipped += 1
+                state.next_seq = state.held[0][0]
+                await self._release(index, key, state)
+
+    async def _run(self, item: Dict[str, Any]):
+        try:
+            await self.handler(**item)
+            self.processed += 1
+        except Exception as e:
+            # The handler owns retries (WebhookEventProcessor); this only keeps the worker alive
+            self.failed += 1
+            print(f"[webhook_dispatcher] handler failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": sum(queue.qsize() for queue in self._queues),
+            "held": sum(len(self._states[i][key].held) for i in range(self.workers) for key in self._holding[i]),
+            "processed": self.processed,
+            "reordered": self.reordered,
+            "gaps_skipped": self.gaps_skipped,
+            "failed": self.failed
+        }
+
+    async def close(self, timeout: float = 10.0):
+        """Finish queued events (held ones are released in order), then stop the workers."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for index in range(self.workers):
+            for key in list(self._holding[index]):
+                state = self._states[index][key]
+                while state.held:
+                    state.next_seq = state.held[0][0]
+                    await self._release(index, key, state)
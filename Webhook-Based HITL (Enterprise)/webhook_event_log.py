@@ -0,0 +1,422 @@
+"""
+Durable Event Log for the Webhook Server
+Append-only, segmented log of webhook events and state mutations, plus periodic snapshots of
+derived state, so WebhookEventProcessor survives restarts and deploys.
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, Iterator
+
+
+logger = logging.getLogger(__name__)
+
+_FRAME = struct.Struct("<II")  # body length, crc32(body)
+_SEGMENT_RE = re.compile(r"^segment-(\d{20})\.log$")
+_SNAPSHOT_RE = re.compile(r"^snapshot-(\d{20})\.json$")
+
+
+class _Segment:
+    """
+    One log file named after its first sequence number.
+    offsets[i] is the byte offset of record first_seq + i; it is mirrored in a .idx file so
+    sealed segments open without a scan. Reads go through a read-only memory map.
+    """
+
+    def __init__(self, path: Path, first_seq: int):
+        self.path = path
+        self.index_path = path.with_suffix(".idx")
+        self.first_seq = first_seq
+        self.offsets = array("Q")
+        self.size = 0
+        self.retired = False  # deleted once a kept snapshot covered it
+        self._map: Optional[mmap.mmap] = None
+        self._map_size = 0
+
+    @property
+    def last_seq(self) -> int:
+        return self.first_seq + len(self.offsets) - 1
+
+    def load(self, trust_index: bool):
+        """Load the offset index; rescan (and cut a torn tail) when it cannot be trusted."""
+        self.size = self.path.stat().st_size
+        if trust_index and self._load_index():
+            return
+        offsets, end = _scan(self.view()) if self.size else (array("Q"), 0)
+        if end < self.size:
+            # Torn tail from a crash mid-write: drop the partial record
+            with open(self.path, "r+b") as f:
+                f.truncate(end)
+            self.size = end
+            self._map = None
+        self.offsets = offsets
+        self.index_path.write_bytes(offsets.tobytes())
+
+    def _load_index(self) -> bool:
+        try:
+            raw = self.index_path.read_bytes()
+        except FileNotFoundError:
+            return False
+        if not raw or len(raw) % 8 or not self.size:
+            return False
+        offsets = array("Q")
+        offsets.frombytes(raw)
+        view = self.view()
+        last = offsets[-1]
+        if last + _FRAME.size > self.size:
+            return False
+        length, _ = _FRAME.unpack_from(view, last)
+        if last + _FRAME.size + length != self.size:
+            return False
+        self.offsets = offsets
+        return True
+
+    @property
+    def mapped(self) -> bool:
+        """True if view() can return without opening the file."""
+        return self._map is not None and self._map_size >= self.size
+
+    def view(self) -> mmap.mmap:
+        """Memory map covering the segment's current size (remapped as it grows)."""
+        if self._map is None or self._map_size < self.size:
+            with open(self.path, "rb") as f:
+                # Older maps are not closed here: generators may still be reading them
+                self._map = mmap.mmap(f.fileno(), self.size, access=mmap.ACCESS_READ)
+            self._map_size = self.size
+        return self._map
+
+
+def _scan(data) -> Tuple[array, int]:
+    """Offsets of the valid records in data and the end of the last one."""
+    offsets = array("Q")
+    pos = 0
+    size = len(data)
+    while pos + _FRAME.size <= size:
+        length, crc = _FRAME.unpack_from(data, pos)
+        end = pos + _FRAME.size + length
+        if end > size or zlib.crc32(data[pos + _FRAME.size:end]) != crc:
+            break
+        offsets.append(pos)
+        pos = end
+    return offsets, pos
+
+
+class EventLog:
+    """
+    Segmented append-only log with batched fsync.
+    append() only assigns a sequence number and frames the record ({"seq", "kind", "data"}
+    as compact JSON behind a length + CRC32 header); a writer thread writes pending frames
+    and fsyncs once per batch, every fsync_interval seconds or as soon as batch_bytes are
+    queued. Segments roll at segment_bytes. Snapshots (seq + JSON state) are written by the
+    same thread after the records they cover, atomically, keeping the newest keep_snapshots;
+    sealed segments covered by the oldest kept snapshot are then deleted, so disk usage stays
+    bounded by the records since that snapshot.
+    Recovery: load_snapshot() and then iter_records(after_seq=snapshot seq).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 64 * 1024 * 1024,
+        fsync_interval: float = 0.05,
+        batch_bytes: int = 1024 * 1024,
+        keep_snapshots: int = 2
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.batch_bytes = batch_bytes
+        self.keep_snapshots = max(1, keep_snapshots)
+
+        self._segments: List[_Segment] = []
+        for path in sorted(self.directory.iterdir()):
+            m = _SEGMENT_RE.match(path.name)
+            if m:
+                self._segments.append(_Segment(path, int(m.group(1))))
+        for i, segment in enumerate(self._segments):
+            segment.load(trust_index=i < len(self._segments) - 1)
+        self._first_seqs = [segment.first_seq for segment in self._segments]
+
+        self._next_seq = self._segments[-1].last_seq + 1 if self._segments else 1
+        self._written_seq = self._next_seq - 1
+        self._file = None
+        self._index_file = None
+        if self._segments:
+            self._file = open(self._segments[-1].path, "ab")
+            self._index_file = open(self._segments[-1].index_path, "ab")
+
+        self._pending: List[Tuple[int, bytes]] = []
+        self._pending_bytes = 0
+        self._pending_snapshot: Optional[Tuple[int, Any]] = None
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()  # serializes flushes, segment rolls and map access
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run_writer, name="webhook-event-log", daemon=True)
+        self._writer.start()
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the last appended record (possibly not yet fsynced)."""
+        with self._pending_lock:
+            return self._next_seq - 1
+
+    def append(self, kind: str, data: Dict[str, Any]) -> int:
+        """Queue a record and return its sequence number (durable after the next flush)."""
+        with self._pending_lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            body = json.dumps({"seq": seq, "kind": kind, "data": data}, separators=(",", ":")).encode("utf-8")
+            frame = _FRAME.pack(len(body), zlib.crc32(body)) + body
+            self._pending.append((seq, frame))
+            self._pending_bytes += len(frame)
+            full = self._pending_bytes >= self.batch_bytes
+        if full:
+            self._wakeup.set()
+        return seq
+
+    def save_snapshot(self, seq: int, state: Any):
+        """
+        Queue a snapshot of state as of record seq (replaces a not yet written one). state is
+        JSON bytes, or an object the writer thread encodes; it must not be mutated afterwards.
+        """
+        with self._pending_lock:
+            self._pending_snapshot = (seq, state)
+        self._wakeup.set()
+
+    def load_snapshot(self) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Newest readable snapshot as (seq, state); (0, None) when there is none."""
+        for seq, path in reversed(self._snapshot_files()):
+            try:
+                return seq, json.loads(path.read_bytes())
+            except (OSError, ValueError):
+                continue
+        return 0, None
+
+    def iter_records(self, after_seq: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Records with seq > after_seq in order, read from the memory-mapped segments.
+        Segments are mapped as the iteration reaches them; one retired before that (its
+        records covered by a snapshot) is skipped, as if it had been retired before the call.
+        """
+        self.flush()
+        with self._write_lock:
+            bounds = [(segment, segment.last_seq) for segment in self._segments]
+            start_index = max(0, bisect_right(self._first_seqs, after_seq + 1) - 1)
+        for segment, last_seq in bounds[start_index:]:
+            seq = max(after_seq + 1, segment.first_seq)
+            if seq > last_seq:
+                continue
+            with self._write_lock:
+                if segment.retired and not segment.mapped:
+                    continue
+                view = segment.view()
+            offset = segment.offsets[seq - segment.first_seq]
+            while seq <= last_seq:
+                length, _ = _FRAME.unpack_from(view, offset)
+                start = offset + _FRAME.size
+                yield json.loads(view[start:start + length])
+                offset = start + length
+                seq += 1
+
+    def read(self, after_seq: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Up to limit records after after_seq (offset index lookup, no scan)."""
+        records = []
+        for record in self.iter_records(after_seq):
+            records.append(record)
+            if len(records) >= limit:
+                break
+        return records
+
+    def flush(self):
+        """Write and fsync queued records (then a queued snapshot) now."""
+        with self._write_lock:
+            with self._pending_lock:
+                pending = self._pending
+                snapshot = self._pending_snapshot
+                self._pending = []
+                self._pending_bytes = 0
+                self._pending_snapshot = None
+            try:
+                if pending:
+                    self._write(pending)
+            except OSError:
+                # Nothing of the batch is kept on disk; queue it (and the snapshot after it) again
+                self._requeue(pending, snapshot)
+                raise
+            if snapshot:
+                try:
+                    self._write_snapshot(*snapshot)
+                except OSError:
+                    self._requeue([], snapshot)
+                    raise
+
+    def _requeue(self, pending: List[Tuple[int, bytes]], snapshot: Optional[Tuple[int, Any]]):
+        """Put a failed batch back in front of records appended since (sequence order is kept)."""
+        with self._pending_lock:
+            self._pending[:0] = pending
+            self._pending_bytes += sum(len(frame) for _, frame in pending)
+            if self._pending_snapshot is None:
+                self._pending_snapshot = snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        with self._write_lock:
+            snapshots = self._snapshot_files()
+            return {
+                "segments": len(self._segments),
+                "bytes": sum(segment.size for segment in self._segments),
+                "last_seq": self.last_seq,
+                "durable_seq": self._written_seq,
+                "snapshot_seq": snapshots[-1][0] if snapshots else 0
+            }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join()
+        self.flush()
+        if self._file:
+            self._file.close()
+            self._index_file.close()
+
+    def _write(self, pending: List[Tuple[int, bytes]]):
+        """
+        Append frames to the active segment(s) and fsync once; on failure the log is rolled
+        back to where the batch started. Caller holds the write lock.
+        """
+        segment = self._segments[-1] if self._segments else None
+        start = (len(self._segments), segment.size if segment else 0, len(segment.offsets) if segment else 0)
+        try:
+            for seq, frame in pending:
+                if segment is None or (segment.size and segment.size + len(frame) > self.segment_bytes):
+                    segment = self._roll(seq)
+                self._file.write(frame)
+                segment.offsets.append(segment.size)
+                self._index_file.write(struct.pack("<Q", segment.size))
+                segment.size += len(frame)
+            self._sync()
+        except OSError:
+            self._rollback(*start)
+            raise
+        self._written_seq = pending[-1][0]
+
+    def _rollback(self, segments: int, size: int, records: int):
+        """Undo a partly written batch: drop segments it started, truncate the one it extended."""
+        for handle in (self._file, self._index_file):
+            if handle:
+                try:
+                    handle.close()
+                except OSError:
+                    pass  # unwritten buffered bytes are discarded by the truncation below
+        self._file = self._index_file = None
+        while len(self._segments) > segments:
+            segment = self._segments.pop()
+            self._first_seqs.pop()
+            segment.path.unlink(missing_ok=True)
+            segment.index_path.unlink(missing_ok=True)
+        if self._segments:
+            segment = self._segments[-1]
+            os.truncate(segment.path, size)
+            os.truncate(segment.index_path, records * 8)
+            del segment.offsets[records:]
+            segment.size = size
+            segment._map = None
+            self._file = open(segment.path, "ab")
+            self._index_file = open(segment.index_path, "ab")
+
+    def _roll(self, first_seq: int) -> _Segment:
+        """Seal the active segment and start a new one at first_seq."""
+        if self._file:
+            self._sync()
+            self._file.close()
+            self._index_file.close()
+        segment = _Segment(self.directory / f"segment-{first_seq:020d}.log", first_seq)
+        self._file = open(segment.path, "ab")
+        self._index_file = open(segment.index_path, "ab")
+        self._segments.append(segment)
+        self._first_seqs.append(first_seq)
+        return segment
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._index_file.flush()  # the index is rebuilt from the log if it is behind
+
+    def _write_snapshot(self, seq: int, state: Any):
+        if not isinstance(state, bytes):
+            state = json.dumps(state, separators=(",", ":")).encode("utf-8")
+        path = self.directory / f"snapshot-{seq:020d}.json"
+        tmp = path.with_suffix(".json.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(state)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            raise
+        snapshots = self._snapshot_files()
+        for _, old in snapshots[:-self.keep_snapshots]:
+            old.unlink(missing_ok=True)
+        self._drop_segments_before(snapshots[-self.keep_snapshots:][0][0])
+
+    def _drop_segments_before(self, seq: int):
+        """
+        Delete sealed segments whose records are all covered by the snapshot at seq (the oldest
+        one kept, so recovery can still fall back to it). Caller holds the write lock.
+        """
+        while len(self._segments) > 1 and self._segments[0].last_seq <= seq:
+            segment = self._segments.pop(0)
+            self._first_seqs.pop(0)
+            segment.retired = True
+            # Readers that mapped it keep their memory map (the others skip it); the files go now
+            segment.path.unlink(missing_ok=True)
+            segment.index_path.unlink(missing_ok=True)
+
+    def _snapshot_files(self) -> List[Tuple[int, Path]]:
+        files = []
+        for path in self.directory.iterdir():
+            m = _SNAPSHOT_RE.match(path.name)
+            if m:
+                files.append((int(m.group(1)), path))
+        return sorted(files)
+
+    def _run_writer(self):
+        while not self._closed:
+            self._wakeup.wait(self.fsync_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                # Keep the writer alive; the batch was re-queued and is retried on the next tick
+                logger.warning("Event log flush failed, retrying: %s", e)
+
+
+def create_event_log_from_env() -> Optional[EventLog]:
+    """
+    Log selected by WEBHOOK_EVENT_LOG ("file", default, or "memory" for no persistence).
+    WEBHOOK_EVENT_LOG_DIR sets the directory (default: webhook_event_log/ next to this module).
+    """
+    kind = os.getenv("WEBHOOK_EVENT_LOG", "file").strip().lower()
+    if kind == "memory":
+        return None
+    if kind != "file":
+        raise ValueError(f"Unknown WEBHOOK_EVENT_LOG '{kind}'. Use 'file' or 'memory'.")
+    return EventLog(
+        os.getenv("WEBHOOK_EVENT_LOG_DIR") or str(Path(__file__).parent / "webhook_event_log"),
+        segment_bytes=int(os.getenv("WEBHOOK_EVENT_LOG_SEGMENT_MB", "64")) * 1024 * 1024,
+        fsync_interval=float(os.getenv("WEBHOOK_EVENT_LOG_FSYNC_INTERVAL", "0.05"))
+    )
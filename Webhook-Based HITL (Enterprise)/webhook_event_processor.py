@@ -3,12 +3,20 @@ Webhook Event Processor
 Processes and stores webhook events with retry logic and error handling.
 """
 
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple, Set, Deque, Callable, Awaitable
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
 import asyncio
+import hashlib
+import heapq
 import json
+import random
+import time
 from enum import Enum
 
+from webhook_dedupe import DedupeIndex, delivery_key as make_delivery_key
+from webhook_event_log import EventLog
+
 
 class EventStatus(Enum):
     """Event processing status."""
@@ -17,58 +25,198 @@ class EventStatus(Enum):
     COMPLETED = "completed"
     FAILED = "failed"
     RETRYING = "retrying"
+    DEAD_LETTER = "dead_letter"
+
+
+EventHandler = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+# Event fields written to the log on every status change
+_STATUS_FIELDS = ("status", "retry_count", "error", "processed_at", "dead_lettered_at", "replayed_at")
+
+
+def _detach_execution(execution: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of an execution whose containers later mutations do not touch."""
+    copy = dict(execution)
+    if "checkpoints" in copy:
+        copy["checkpoints"] = list(copy["checkpoints"])
+    if "tasks" in copy:
+        copy["tasks"] = dict(copy["tasks"])
+    return copy
+
+
+class _RollingCounter:
+    """Counts over the last `seconds` seconds in one-second buckets (ring buffer, O(1) add)."""
+    
+    def __init__(self, seconds: int = 60):
+        self._counts = [0] * seconds
+        self._stamps = [0] * seconds
+    
+    def add(self, n: int = 1):
+        second = int(time.monotonic())
+        i = second % len(self._counts)
+        if self._stamps[i] != second:
+            self._stamps[i] = second
+            self._counts[i] = 0
+        self._counts[i] += n
+    
+    def total(self) -> int:
+        oldest = int(time.monotonic()) - len(self._counts)
+        return sum(count for count, stamp in zip(self._counts, self._stamps) if stamp > oldest)
 
 
 class WebhookEventProcessor:
-    """Processes webhook events with enterprise features."""
+    """
+    Processes webhook events with enterprise features.
+    Failed events are retried with exponential backoff and jitter from a min-heap keyed by
+    next-attempt time; one background task sleeps until the earliest due retry (woken early
+    when an earlier one is scheduled). Events still failing after max_retries retries move to
+    a bounded dead-letter store that can be inspected and replayed (events evicted from it
+    leave memory and stay counted as dead-lettered).
+    With an event_log, every event and state mutation is appended to it and state is
+    rebuilt on construction (latest snapshot + replay of the records after it); events that
+    were in flight or waiting for a retry are retried once start() runs. Every snapshot_every
+    records the checkpoints, executions and open events are snapshotted and completed
+    events leave memory (they stay readable from the log until its segments are retired).
+    Without an event_log, completed events leave memory every snapshot_every completions.
+    Deliveries are deduplicated by delivery key (claim_delivery); the dedupe index is part
+    of the snapshot and rebuilt from logged events, so sender retries that straddle a
+    restart are still recognised.
+    Health figures never scan events: status transitions maintain per-status counters, and
+    rolling one-minute counters plus a window of recent processing latencies back the rates
+    and percentiles in event_stats().
+    """
     
-    def __init__(self):
+    def __init__(
+        self,
+        max_retries: int = 3,
+        retry_delay: float = 5,
+        max_retry_delay: float = 300,
+        max_dead_letters: int = 1000,
+        event_log: Optional[EventLog] = None,
+        snapshot_every: int = 10000,
+        dedupe: Optional[DedupeIndex] = None
+    ):
         self._events: Dict[str, Dict[str, Any]] = {}
         self._checkpoints: Dict[str, Dict[str, Any]] = {}
         self._executions: Dict[str, Dict[str, Any]] = {}
-        self._retry_queue: list = []
-        self._max_retries = 3
-        self._retry_delay = 5  # seconds
+        # Events per status, including completed events compacted out of _events
+        self._status_counts: Dict[str, int] = {status.value: 0 for status in EventStatus}
+        self._compactable: List[str] = []  # completed event IDs, dropped at the next compaction
+        self._rates = {
+            name: _RollingCounter() for name in ("received", "completed", "retried", "dead_lettered")
+        }
+        self._latencies: Deque[float] = deque(maxlen=1000)  # received -> completed, seconds
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay  # seconds, base of the exponential backoff
+        self._max_retry_delay = max_retry_delay
+        self._max_dead_letters = max_dead_letters
+        # Processes one event; the webhook server installs its full pipeline (state + notifications)
+        self.handler: EventHandler = self.dispatch_event
+        self._retry_heap: List[Tuple[float, int, str]] = []  # (due monotonic time, seq, event_id)
+        self._retry_seq = 0
+        self._retry_wakeup: Optional[asyncio.Event] = None
+        self._retry_task: Optional[asyncio.Task] = None
+        self._attempts_in_flight: Set[asyncio.Task] = set()
+        self._dead_letters: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._evicted_dead_letters = 0  # dead-lettered events dropped by the max_dead_letters bound
+        self._dedupe = dedupe or DedupeIndex()
+        self._event_log = event_log
+        self._snapshot_every = snapshot_every
+        self._records_since_snapshot = 0
+        if event_log is not None:
+            self._recover()
     
-    async def process_event(self, event_type: str, payload: Dict[str, Any]):
-        """Process a webhook event."""
-        event_id = f"{event_type}_{payload.get('kickoff_id', 'unknown')}_{datetime.utcnow().timestamp()}"
+    def claim_delivery(
+        self,
+        event_type: str,
+        payload: Dict[str, Any],
+        delivery_key: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Claim a webhook delivery before processing it (O(1)).
+        Returns (True, event_id) for a new delivery; (False, event_id of the original) for a
+        duplicate (event_id None when only the Bloom filter remembered it).
+        """
+        return self._dedupe.claim(delivery_key, self._event_id(event_type, payload, delivery_key))
+    
+    @staticmethod
+    def _event_id(event_type: str, payload: Dict[str, Any], delivery_key: str) -> str:
+        """Stable event ID of a delivery: the same delivery always maps to the same event."""
+        digest = hashlib.sha256(delivery_key.encode("utf-8")).hexdigest()[:16]
+        return f"{event_type}_{payload.get('kickoff_id', 'unknown')}_{digest}"
+    
+    async def process_event(
+        self,
+        event_type: str,
+        payload: Dict[str, Any],
+        event_id: Optional[str] = None,
+        delivery_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Process a webhook event; failures are retried in the background. Without event_id the
+        ID is derived from delivery_key, or from a hash of the payload, so a re-sent event maps
+        to the one already processed.
+        """
+        if event_id is None:
+            body = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+            key = delivery_key or make_delivery_key(None, body)
+            event_id = self._event_id(event_type, payload, key)
+        if event_id in self._events:
+            return self._events[event_id]  # already processed or retrying
         
-        event = {
+        record = {
             "event_id": event_id,
             "event_type": event_type,
             "payload": payload,
-            "status": EventStatus.PROCESSING.value,
-            "created_at": datetime.utcnow().isoformat(),
-            "retry_count": 0
+            "created_at": datetime.utcnow().isoformat()
         }
-        
-        self._events[event_id] = event
-        
+        if delivery_key:
+            record["delivery_key"] = delivery_key
+        event = self._apply_event(record)
+        event["_received_at"] = time.monotonic()
+        self._rates["received"].add()
+        self._log("event", record)
+        await self._attempt(event)
+        return event
+    
+    async def dispatch_event(self, event_type: str, payload: Dict[str, Any]):
+        """Route an event to its store handler by type (default handler)."""
+        if "checkpoint" in event_type:
+            await self._process_checkpoint_event(payload)
+        elif "task" in event_type:
+            await self._process_task_event(payload)
+        elif "crew" in event_type:
+            await self._process_crew_event(payload)
+    
+    async def _attempt(self, event: Dict[str, Any]):
+        """Run the handler once; on failure schedule a retry or dead-letter the event."""
+        self._set_status(event, EventStatus.PROCESSING)
         try:
-            # Process based on event type
-            if "checkpoint" in event_type:
-                await self._process_checkpoint_event(payload)
-            elif "task" in event_type:
-                await self._process_task_event(payload)
-            elif "crew" in event_type:
-                await self._process_crew_event(payload)
+            await self.handler(event["event_type"], event["payload"])
             
-            event["status"] = EventStatus.COMPLETED.value
+            self._set_status(event, EventStatus.COMPLETED)
             event["processed_at"] = datetime.utcnow().isoformat()
+            event.pop("next_attempt_at", None)
+            self._rates["completed"].add()
+            if "_received_at" in event:
+                self._latencies.append(time.monotonic() - event["_received_at"])
             
         except Exception as e:
-            event["status"] = EventStatus.FAILED.value
             event["error"] = str(e)
             
             # Retry logic
             if event["retry_count"] < self._max_retries:
                 event["retry_count"] += 1
-                event["status"] = EventStatus.RETRYING.value
-                await self._schedule_retry(event_id, event)
+                self._set_status(event, EventStatus.RETRYING)
+                self._rates["retried"].add()
+                await self._schedule_retry(event["event_id"], event)
             else:
                 # Max retries exceeded
-                await self.handle_error(event_type, payload, str(e))
+                self._dead_letter(event)
+                self._log_status(event)
+                await self.handle_error(event["event_type"], event["payload"], str(e))
+                return
+        self._log_status(event)
     
     async def _process_checkpoint_event(self, payload: Dict[str, Any]):
         """Process checkpoint event."""
@@ -117,31 +265,13 @@ class WebhookEventProcessor:
         context: Dict[str, Any]
     ):
         """Store checkpoint state."""
-        checkpoint = {
+        self._record("checkpoint", {
             "checkpoint_id": checkpoint_id,
             "kickoff_id": kickoff_id,
             "checkpoint_name": checkpoint_name,
             "context": context,
-            "status": "pending",
-            "created_at": datetime.utcnow().isoformat(),
-            "feedback": None
-        }
-        
-        self._checkpoints[checkpoint_id] = checkpoint
-        
-        # Update execution state
-        if kickoff_id:
-            if kickoff_id not in self._executions:
-                self._executions[kickoff_id] = {
-                    "kickoff_id": kickoff_id,
-                    "status": "running",
-                    "checkpoints": [],
-                    "created_at": datetime.utcnow().isoformat()
-                }
-            
-            self._executions[kickoff_id]["checkpoints"].append(checkpoint_id)
-            self._executions[kickoff_id]["current_checkpoint"] = checkpoint_id
-            self._executions[kickoff_id]["status"] = "waiting_feedback"
+            "at": datetime.utcnow().isoformat()
+        })
     
     async def store_task_result(
         self,
@@ -150,18 +280,12 @@ class WebhookEventProcessor:
         result: Dict[str, Any]
     ):
         """Store task result."""
-        if kickoff_id not in self._executions:
-            self._executions[kickoff_id] = {
-                "kickoff_id": kickoff_id,
-                "status": "running",
-                "tasks": {},
-                "created_at": datetime.utcnow().isoformat()
-            }
-        
-        if "tasks" not in self._executions[kickoff_id]:
-            self._executions[kickoff_id]["tasks"] = {}
-        
-        self._executions[kickoff_id]["tasks"][task_id] = result
+        self._record("task_result", {
+            "kickoff_id": kickoff_id,
+            "task_id": task_id,
+            "result": result,
+            "at": datetime.utcnow().isoformat()
+        })
     
     async def store_crew_result(
         self,
@@ -169,16 +293,11 @@ class WebhookEventProcessor:
         result: Dict[str, Any]
     ):
         """Store crew completion result."""
-        if kickoff_id not in self._executions:
-            self._executions[kickoff_id] = {
-                "kickoff_id": kickoff_id,
-                "status": "completed",
-                "created_at": datetime.utcnow().isoformat()
-            }
-        
-        self._executions[kickoff_id]["status"] = "completed"
-        self._executions[kickoff_id]["result"] = result
-        self._executions[kickoff_id]["completed_at"] = datetime.utcnow().isoformat()
+        self._record("crew_result", {
+            "kickoff_id": kickoff_id,
+            "result": result,
+            "at": datetime.utcnow().isoformat()
+        })
     
     async def store_error(
         self,
@@ -186,16 +305,7 @@ class WebhookEventProcessor:
         error: str
     ):
         """Store error."""
-        if kickoff_id not in self._executions:
-            self._executions[kickoff_id] = {
-                "kickoff_id": kickoff_id,
-                "status": "error",
-                "created_at": datetime.utcnow().isoformat()
-            }
-        
-        self._executions[kickoff_id]["status"] = "error"
-        self._executions[kickoff_id]["error"] = error
-        self._executions[kickoff_id]["failed_at"] = datetime.utcnow().isoformat()
+        self._record("error", {"kickoff_id": kickoff_id, "error": error, "at": datetime.utcnow().isoformat()})
     
     async def process_feedback(
         self,
@@ -204,13 +314,78 @@ class WebhookEventProcessor:
         feedback: Optional[str] = None
     ):
         """Process feedback for a checkpoint."""
-        checkpoint = self._checkpoints.get(checkpoint_id)
-        if not checkpoint:
+        if checkpoint_id not in self._checkpoints:
             raise ValueError(f"Checkpoint {checkpoint_id} not found")
         
+        self._record("feedback", {
+            "checkpoint_id": checkpoint_id,
+            "action": action,
+            "feedback": feedback,
+            "at": datetime.utcnow().isoformat()
+        })
+    
+    def _record(self, kind: str, data: Dict[str, Any]):
+        """Apply a state mutation and log it (replay applies the same records)."""
+        self._APPLY[kind](self, data)
+        self._log(kind, data)
+    
+    def _execution(self, kickoff_id: str, status: str, at: str) -> Dict[str, Any]:
+        if kickoff_id not in self._executions:
+            self._executions[kickoff_id] = {
+                "kickoff_id": kickoff_id,
+                "status": status,
+                "created_at": at
+            }
+        return self._executions[kickoff_id]
+    
+    def _apply_checkpoint(self, data: Dict[str, Any]):
+        checkpoint_id = data["checkpoint_id"]
+        kickoff_id = data["kickoff_id"]
+        checkpoint = {
+            "checkpoint_id": checkpoint_id,
+            "kickoff_id": kickoff_id,
+            "checkpoint_name": data["checkpoint_name"],
+            "context": data["context"],
+            "status": "pending",
+            "created_at": data["at"],
+            "feedback": None
+        }
+        
+        self._checkpoints[checkpoint_id] = checkpoint
+        
+        # Update execution state
+        if kickoff_id:
+            execution = self._execution(kickoff_id, "running", data["at"])
+            checkpoints = execution.setdefault("checkpoints", [])
+            if checkpoint_id not in checkpoints:  # a retried event stores it again
+                checkpoints.append(checkpoint_id)
+            execution["current_checkpoint"] = checkpoint_id
+            execution["status"] = "waiting_feedback"
+    
+    def _apply_task_result(self, data: Dict[str, Any]):
+        execution = self._execution(data["kickoff_id"], "running", data["at"])
+        execution.setdefault("tasks", {})[data["task_id"]] = data["result"]
+    
+    def _apply_crew_result(self, data: Dict[str, Any]):
+        execution = self._execution(data["kickoff_id"], "completed", data["at"])
+        execution["status"] = "completed"
+        execution["result"] = data["result"]
+        execution["completed_at"] = data["at"]
+    
+    def _apply_error(self, data: Dict[str, Any]):
+        execution = self._execution(data["kickoff_id"], "error", data["at"])
+        execution["status"] = "error"
+        execution["error"] = data["error"]
+        execution["failed_at"] = data["at"]
+    
+    def _apply_feedback(self, data: Dict[str, Any]):
+        checkpoint = self._checkpoints.get(data["checkpoint_id"])
+        if not checkpoint:
+            return
+        action = data["action"]
         checkpoint["status"] = action
-        checkpoint["feedback"] = feedback
-        checkpoint["resolved_at"] = datetime.utcnow().isoformat()
+        checkpoint["feedback"] = data["feedback"]
+        checkpoint["resolved_at"] = data["at"]
         
         # Update execution state
         kickoff_id = checkpoint.get("kickoff_id")
@@ -222,6 +397,134 @@ class WebhookEventProcessor:
             elif action in ["continue", "skip"]:
                 self._executions[kickoff_id]["status"] = "running"
     
+    def _set_status(self, event: Dict[str, Any], status: EventStatus):
+        """Change an event's status, keeping the per-status counters in step."""
+        old = event.get("status")
+        if old == status.value:
+            return
+        if old is not None:
+            self._status_counts[old] -= 1
+        self._status_counts[status.value] += 1
+        event["status"] = status.value
+        if status == EventStatus.COMPLETED:
+            self._compactable.append(event["event_id"])
+    
+    def _apply_event(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        event = dict(data, retry_count=0)
+        previous = self._events.get(event["event_id"])
+        if previous is not None:
+            self._status_counts[previous["status"]] -= 1
+        self._set_status(event, EventStatus.PROCESSING)
+        self._events[event["event_id"]] = event
+        if "delivery_key" in data and data["delivery_key"] not in self._dedupe:
+            # Replay: remember deliveries seen before the restart
+            seen_at = datetime.fromisoformat(data["created_at"]).replace(tzinfo=timezone.utc).timestamp()
+            self._dedupe.add(data["delivery_key"], event["event_id"], min(seen_at, time.time()))
+        return event
+    
+    def _apply_event_status(self, data: Dict[str, Any]):
+        event = self._events.get(data["event_id"])
+        if event is None:
+            return
+        self._set_status(event, EventStatus(data["status"]))
+        for field in _STATUS_FIELDS[1:]:
+            if field in data:
+                event[field] = data[field]
+            else:
+                event.pop(field, None)
+        if event["status"] == EventStatus.DEAD_LETTER.value:
+            self._dead_letter(event)
+        else:
+            self._dead_letters.pop(event["event_id"], None)
+    
+    _APPLY = {
+        "event": _apply_event,
+        "event_status": _apply_event_status,
+        "checkpoint": _apply_checkpoint,
+        "task_result": _apply_task_result,
+        "crew_result": _apply_crew_result,
+        "error": _apply_error,
+        "feedback": _apply_feedback
+    }
+    
+    def _log(self, kind: str, data: Dict[str, Any]):
+        if self._event_log is None:
+            # Nothing to read them back from: just keep completed events from piling up
+            if len(self._compactable) >= self._snapshot_every:
+                self._compact()
+            return
+        self._event_log.append(kind, data)
+        self._records_since_snapshot += 1
+        if self._records_since_snapshot >= self._snapshot_every:
+            self.snapshot()
+    
+    def _log_status(self, event: Dict[str, Any]):
+        record = {"event_id": event["event_id"]}
+        record.update({k: event[k] for k in _STATUS_FIELDS if k in event})
+        self._log("event_status", record)
+    
+    def _recover(self):
+        """Rebuild state from the latest snapshot plus the log records written after it."""
+        seq, state = self._event_log.load_snapshot()
+        if state:
+            self._checkpoints = state["checkpoints"]
+            self._executions = state["executions"]
+            self._status_counts[EventStatus.COMPLETED.value] = state["processed_events"]
+            self._evicted_dead_letters = state.get("evicted_dead_letters", 0)
+            self._status_counts[EventStatus.DEAD_LETTER.value] = self._evicted_dead_letters
+            for event in state["events"]:
+                self._events[event["event_id"]] = event
+                self._status_counts[event["status"]] += 1
+            for event_id in state["dead_letters"]:
+                self._dead_letters[event_id] = self._events[event_id]
+            self._dedupe.load(state.get("dedupe", []))
+        for record in self._event_log.iter_records(after_seq=seq):
+            self._APPLY[record["kind"]](self, record["data"])
+        # Interrupted attempts and pending retries run again once the scheduler starts
+        now = time.monotonic()
+        for event in self._events.values():
+            if event["status"] in (EventStatus.PROCESSING.value, EventStatus.RETRYING.value):
+                self._set_status(event, EventStatus.RETRYING)
+                self._push_retry(event, now)
+    
+    def _compact(self):
+        """Drop completed events from memory; they stay counted as completed."""
+        for event_id in self._compactable:
+            event = self._events.get(event_id)
+            if event is not None and event["status"] == EventStatus.COMPLETED.value:
+                del self._events[event_id]
+        self._compactable = []
+    
+    def snapshot(self):
+        """Snapshot derived state to the log and drop completed events from memory."""
+        self._compact()
+        if self._event_log is None:
+            return
+        # Detached copies of everything mutated later; the log's writer thread encodes them
+        state = {
+            "checkpoints": {cid: dict(checkpoint) for cid, checkpoint in self._checkpoints.items()},
+            "executions": {kid: _detach_execution(execution) for kid, execution in self._executions.items()},
+            "events": [{k: v for k, v in e.items() if not k.startswith("_")} for e in self._events.values()],
+            "dead_letters": list(self._dead_letters),
+            "processed_events": self._status_counts[EventStatus.COMPLETED.value],
+            "evicted_dead_letters": self._evicted_dead_letters,
+            "dedupe": self._dedupe.export()
+        }
+        self._event_log.save_snapshot(self._event_log.last_seq, state)
+        self._records_since_snapshot = 0
+    
+    def read_log(self, after_seq: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Historical log records (events and state mutations) after after_seq."""
+        if self._event_log is None:
+            return []
+        return self._event_log.read(after_seq=after_seq, limit=limit)
+    
+    def dedupe_stats(self) -> Dict[str, Any]:
+        return self._dedupe.stats()
+    
+    def log_stats(self) -> Optional[Dict[str, Any]]:
+        return self._event_log.stats() if self._event_log is not None else None
+    
     async def get_checkpoint(self, checkpoint_id: str) -> Optional[Dict[str, Any]]:
         """Get checkpoint information."""
         return self._checkpoints.get(checkpoint_id)
@@ -230,13 +533,119 @@ class WebhookEventProcessor:
         """Get execution status."""
         return self._executions.get(kickoff_id)
     
+    def _backoff(self, retry_count: int) -> float:
+        """Exponential backoff with jitter: uniform in [d/2, d], d = base * 2^(n-1), capped."""
+        delay = min(self._max_retry_delay, self._retry_delay * (2 ** (retry_count - 1)))
+        return random.uniform(delay / 2, delay)
+    
     async def _schedule_retry(self, event_id: str, event: Dict[str, Any]):
         """Schedule event retry."""
-        self._retry_queue.append({
-            "event_id": event_id,
-            "event": event,
-            "retry_at": datetime.utcnow().timestamp() + self._retry_delay
-        })
+        delay = self._backoff(event["retry_count"])
+        event["next_attempt_at"] = datetime.utcfromtimestamp(time.time() + delay).isoformat()
+        entry = self._push_retry(event, time.monotonic() + delay)
+        self._ensure_retry_task()
+        if self._retry_heap[0] is entry:
+            self._retry_wakeup.set()  # earlier than what the scheduler is sleeping for
+    
+    def _push_retry(self, event: Dict[str, Any], due: float) -> Tuple[float, int, str]:
+        self._retry_seq += 1
+        event["_retry_seq"] = self._retry_seq
+        entry = (due, self._retry_seq, event["event_id"])
+        heapq.heappush(self._retry_heap, entry)
+        return entry
+    
+    def _ensure_retry_task(self):
+        if self._retry_task is None or self._retry_task.done():
+            self._retry_wakeup = asyncio.Event()
+            self._retry_task = asyncio.create_task(self._run_retries())
+    
+    async def _run_retries(self):
+        """Single scheduler: sleep until the earliest due retry, then start its attempt."""
+        while True:
+            self._retry_wakeup.clear()
+            if not self._retry_heap:
+                await self._retry_wakeup.wait()
+                continue
+            delay = self._retry_heap[0][0] - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._retry_wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, seq, event_id = heapq.heappop(self._retry_heap)
+            event = self._events.get(event_id)
+            if event is None or event.get("_retry_seq") != seq or event["status"] != EventStatus.RETRYING.value:
+                continue  # superseded (e.g. replayed)
+            task = asyncio.create_task(self._attempt(event))
+            self._attempts_in_flight.add(task)
+            task.add_done_callback(self._attempts_in_flight.discard)
+    
+    def _dead_letter(self, event: Dict[str, Any]):
+        if event["status"] != EventStatus.DEAD_LETTER.value:
+            self._rates["dead_lettered"].add()
+        self._set_status(event, EventStatus.DEAD_LETTER)
+        event.setdefault("dead_lettered_at", datetime.utcnow().isoformat())
+        event.pop("next_attempt_at", None)
+        self._dead_letters[event["event_id"]] = event
+        self._dead_letters.move_to_end(event["event_id"])
+        while len(self._dead_letters) > self._max_dead_letters:
+            # Evicted dead letters leave memory too (still counted, still readable from the log)
+            evicted_id, _ = self._dead_letters.popitem(last=False)
+            self._events.pop(evicted_id, None)
+            self._evicted_dead_letters += 1
+    
+    def list_dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent dead-lettered events first."""
+        items = []
+        for event in reversed(self._dead_letters.values()):
+            if len(items) >= limit:
+                break
+            items.append({k: v for k, v in event.items() if not k.startswith("_")})
+        return items
+    
+    async def replay_dead_letter(self, event_id: str) -> Optional[Dict[str, Any]]:
+        """Re-run a dead-lettered event now with a fresh retry budget; None if unknown."""
+        event = self._dead_letters.pop(event_id, None)
+        if event is None:
+            return None
+        event["retry_count"] = 0
+        event["replayed_at"] = datetime.utcnow().isoformat()
+        event.pop("dead_lettered_at", None)
+        await self._attempt(event)
+        return {k: v for k, v in event.items() if not k.startswith("_")}
+    
+    async def replay_all_dead_letters(self) -> Dict[str, int]:
+        results = {"replayed": 0, "completed": 0}
+        for event_id in list(self._dead_letters):
+            event = await self.replay_dead_letter(event_id)
+            results["replayed"] += 1
+            if event and event["status"] == EventStatus.COMPLETED.value:
+                results["completed"] += 1
+        return results
+    
+    def retry_stats(self) -> Dict[str, Any]:
+        return {
+            "scheduled_retries": self._status_counts[EventStatus.RETRYING.value],
+            "retries_in_flight": len(self._attempts_in_flight),
+            "dead_letters": len(self._dead_letters)
+        }
+    
+    async def start(self):
+        """Start the retry scheduler if recovery left events to retry."""
+        if self._retry_heap:
+            self._ensure_retry_task()
+    
+    async def stop(self):
+        """Stop the retry scheduler, snapshot and close the event log."""
+        if self._retry_task:
+            self._retry_task.cancel()
+            await asyncio.gather(self._retry_task, return_exceptions=True)
+        for task in list(self._attempts_in_flight):
+            task.cancel()
+        if self._event_log is not None:
+            self.snapshot()
+            self._event_log.close()
     
     async def handle_error(self, event_type: str, payload: Dict[str, Any], error: str):
         """Handle processing error."""
@@ -245,9 +654,32 @@ class WebhookEventProcessor:
         # Could send to error tracking service (Sentry, etc.)
     
     def get_pending_count(self) -> int:
-        """Get count of pending events."""
-        return len([e for e in self._events.values() if e["status"] == EventStatus.PENDING.value])
+        """Get count of pending events (being processed or waiting for a retry)."""
+        return sum(
+            self._status_counts[status.value]
+            for status in (EventStatus.PENDING, EventStatus.PROCESSING, EventStatus.RETRYING)
+        )
     
     def get_processed_count(self) -> int:
         """Get count of processed events."""
-        return len([e for e in self._events.values() if e["status"] == EventStatus.COMPLETED.value])
+        return self._status_counts[EventStatus.COMPLETED.value]
+    
+    def event_stats(self) -> Dict[str, Any]:
+        """Counters by status, events per minute and processing latency (received -> completed)."""
+        latencies = sorted(self._latencies)
+        
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+        
+        return {
+            "by_status": dict(self._status_counts),
+            "per_minute": {name: counter.total() for name, counter in self._rates.items()},
+            "latency_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": percentile(1.0)
+            }
+        }
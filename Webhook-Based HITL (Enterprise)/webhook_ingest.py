@@ -0,0 +1,89 @@
+"""
+Webhook Ingest Path
+Decodes a CrewAI webhook delivery once into an immutable event that is passed downstream
+(dedupe, dispatcher, event processor, log) without further parsing or copying.
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Any, Optional, NamedTuple
+
+try:
+    import orjson  # optional, faster JSON decoding
+except ImportError:
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+# Fields ingest itself routes on (dedupe, ordering, event type), checked eagerly when present.
+# Everything else is passed through as parsed; handlers read it with .get() when they need it.
+_ROUTING_FIELDS = ("event_type", "kickoff_id", "checkpoint_id", "status")
+
+
+class PayloadError(ValueError):
+    """The delivery is not a JSON object with correctly typed routing fields."""
+
+
+def loads(body: bytes) -> Any:
+    """Parse JSON bytes with the fastest available backend."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact JSON bytes with the fastest available backend."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+class WebhookEvent(NamedTuple):
+    """
+    One received delivery (immutable, cheap to build). payload is the dict parsed from body
+    (with "timestamp" defaulted); downstream code reads it and must not modify it.
+    """
+    event_type: str
+    payload: Dict[str, Any]
+    body: bytes
+    kickoff_id: Optional[str] = None
+    sequence: Optional[int] = None
+
+
+def infer_event_type(payload: Dict[str, Any]) -> str:
+    """Event type for deliveries without one (CrewAI crew webhooks)."""
+    if payload.get("checkpoint_id"):
+        return "checkpoint.required"
+    if payload.get("status") == "complete":
+        return "crew.completed"
+    if payload.get("status") == "error":
+        return "crew.failed"
+    return "crew.started"
+
+
+def parse_event(body: bytes) -> WebhookEvent:
+    """Parse and check a delivery body; raises PayloadError for malformed payloads."""
+    try:
+        payload = loads(body)
+    except ValueError as e:
+        raise PayloadError(f"Invalid JSON: {e}") from None
+    if not isinstance(payload, dict):
+        raise PayloadError("Webhook payload must be a JSON object")
+
+    for field in _ROUTING_FIELDS:
+        value = payload.get(field)
+        if value is not None and type(value) is not str:
+            raise PayloadError(f"Field '{field}' must be str")
+    sequence = payload.get("sequence")
+    if sequence is not None and (isinstance(sequence, bool) or not isinstance(sequence, int)):
+        raise PayloadError("Field 'sequence' must be int")
+
+    if payload.get("timestamp") is None:
+        payload["timestamp"] = datetime.utcnow().isoformat()
+    return WebhookEvent(
+        event_type=payload.get("event_type") or infer_event_type(payload),
+        payload=payload,
+        body=body,
+        kickoff_id=payload.get("kickoff_id"),
+        sequence=sequence
+    )
@@ -8,19 +8,23 @@ Handles webhook events from CrewAI with enterprise-grade features:
 - Audit logging
 """
 
-from fastapi import FastAPI, HTTPException, Request, Header, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, Header, BackgroundTasks, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 import hmac
 import hashlib
 import json
+import os
 import time
 from datetime import datetime
 from enum import Enum
 import asyncio
 from webhook_event_processor import WebhookEventProcessor
+from webhook_event_log import create_event_log_from_env
+from webhook_dedupe import DedupeIndex, delivery_key
+from webhook_dispatcher import KeyedEventDispatcher
+from webhook_ingest import WebhookEvent, parse_event
 from notification_service import NotificationService
 from webhook_security import WebhookSecurity
 
@@ -40,8 +44,29 @@ app.add_middleware(
 )
 
 # Initialize services
-event_processor = WebhookEventProcessor()
-notification_service = NotificationService()
+event_processor = WebhookEventProcessor(
+    max_retries=int(os.getenv("WEBHOOK_MAX_RETRIES", "3")),
+    retry_delay=float(os.getenv("WEBHOOK_RETRY_DELAY", "5")),
+    max_retry_delay=float(os.getenv("WEBHOOK_MAX_RETRY_DELAY", "300")),
+    max_dead_letters=int(os.getenv("WEBHOOK_MAX_DEAD_LETTERS", "1000")),
+    event_log=create_event_log_from_env(),
+    snapshot_every=int(os.getenv("WEBHOOK_SNAPSHOT_EVERY", "10000")),
+    dedupe=DedupeIndex(
+        window_seconds=float(os.getenv("WEBHOOK_DEDUPE_WINDOW", "86400")),
+        max_entries=int(os.getenv("WEBHOOK_DEDUPE_MAX_ENTRIES", "100000")),
+        bloom_capacity=int(os.getenv("WEBHOOK_DEDUPE_BLOOM_CAPACITY", "0"))
+    )
+)
+notification_service = NotificationService(
+    ws_queue_size=int(os.getenv("WS_QUEUE_SIZE", "256")),
+    ws_slow_consumer_policy=os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest"),
+    ws_send_timeout=float(os.getenv("WS_SEND_TIMEOUT", "5")),
+    channel_concurrency=int(os.getenv("NOTIFY_CHANNEL_CONCURRENCY", "4")),
+    channel_queue_size=int(os.getenv("NOTIFY_QUEUE_SIZE", "1000")),
+    digest_window=float(os.getenv("NOTIFY_DIGEST_WINDOW", "5")),
+    http_max_connections=int(os.getenv("NOTIFY_HTTP_MAX_CONNECTIONS", "10"))
+)
+notification_service.slack_webhook_url = os.getenv("SLACK_WEBHOOK_URL")
 security = WebhookSecurity()
 
 
@@ -58,19 +83,21 @@ class WebhookEventType(Enum):
     CHECKPOINT_REQUIRED = "checkpoint.required"
 
 
-class WebhookPayload(BaseModel):
-    """Webhook payload model."""
-    event_type: Optional[str] = None
-    kickoff_id: Optional[str] = None
-    task_id: Optional[str] = None
-    step_id: Optional[str] = None
-    status: Optional[str] = None
-    result: Optional[Dict[str, Any]] = None
-    error: Optional[str] = None
-    checkpoint_id: Optional[str] = None
-    checkpoint_name: Optional[str] = None
-    context: Optional[Dict[str, Any]] = None
-    timestamp: Optional[str] = None
+@app.on_event("startup")
+async def startup():
+    """Resume retries of events recovered from the event log."""
+    await event_processor.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """
+    Finish dispatched events, stop the retry scheduler (snapshotting the event log),
+    deliver queued notifications and close the pooled HTTP client.
+    """
+    await event_dispatcher.close()
+    await event_processor.stop()
+    await notification_service.aclose()
 
 
 @app.get("/")
@@ -89,30 +116,53 @@ async def health():
     return {
         "status": "healthy",
         "pending_events": event_processor.get_pending_count(),
-        "processed_events": event_processor.get_processed_count()
+        "processed_events": event_processor.get_processed_count(),
+        "events": event_processor.event_stats(),
+        "retries": event_processor.retry_stats(),
+        "event_log": event_processor.log_stats(),
+        "dedupe": event_processor.dedupe_stats(),
+        "dispatcher": event_dispatcher.stats(),
+        "websocket": notification_service.websocket_stats(),
+        "notifications": notification_service.channel_stats()
     }
 
 
+@app.websocket("/ws")
+async def notifications_websocket(websocket: WebSocket):
+    """Real-time notifications: every event broadcast by NotificationService."""
+    await websocket.accept()
+    notification_service.register_websocket_client(websocket)
+    try:
+        while True:
+            await websocket.receive_text()  # keeps the connection open; client messages are ignored
+    except WebSocketDisconnect:
+        pass
+    finally:
+        notification_service.unregister_websocket_client(websocket)
+
+
 @app.post("/webhook/crewai")
 async def receive_crewai_webhook(
     request: Request,
-    background_tasks: BackgroundTasks,
     x_crewai_signature: Optional[str] = Header(None, alias="X-CrewAI-Signature"),
-    x_webhook_secret: Optional[str] = Header(None, alias="X-Webhook-Secret")
+    x_webhook_secret: Optional[str] = Header(None, alias="X-Webhook-Secret"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    x_delivery_id: Optional[str] = Header(None, alias="X-Webhook-Delivery-Id")
 ):
     """
     Receive webhook from CrewAI Cloud or local crew execution.
     
     Supports:
     - Signature verification
+    - Idempotent ingestion (Idempotency-Key / X-Webhook-Delivery-Id, else body hash)
+    - Per-kickoff ordered processing (optional sender `sequence`)
     - Event processing
     - Notification dispatch
     - Retry logic
     """
     try:
-        # Get raw body for signature verification
+        # Read the body once: the HMAC, the dedupe hash and the parse all use these bytes
         body_bytes = await request.body()
-        body = await request.json()
         
         # Verify webhook signature
         secret = security.get_webhook_secret()
@@ -121,34 +171,38 @@ async def receive_crewai_webhook(
             if not signature or not security.verify_signature(body_bytes, signature, secret):
                 raise HTTPException(status_code=401, detail="Invalid webhook signature")
         
-        # Parse webhook payload
-        payload = WebhookPayload(**body)
+        # Single parse into an immutable event (event type inferred when missing)
+        event = parse_event(body_bytes)
+        event_type = event.event_type
         
-        # Determine event type
-        event_type = payload.event_type
-        if not event_type:
-            # Infer from payload structure
-            if payload.checkpoint_id:
-                event_type = WebhookEventType.CHECKPOINT_REQUIRED.value
-            elif payload.status == "complete":
-                event_type = WebhookEventType.CREW_COMPLETED.value
-            elif payload.status == "error":
-                event_type = WebhookEventType.CREW_FAILED.value
-            else:
-                event_type = WebhookEventType.CREW_STARTED.value
+        # Acknowledge retried deliveries without processing or notifying again
+        key = delivery_key(idempotency_key or x_delivery_id, body_bytes)
+        order_key = event.kickoff_id or key
+        if not event_dispatcher.has_capacity(order_key):
+            # Checked before claiming, so the sender's retry is not mistaken for a duplicate
+            return JSONResponse(
+                status_code=503,
+                headers={"Retry-After": "1"},
+                content={"received": False, "error": "Event queue full"}
+            )
+        is_new, event_id = event_processor.claim_delivery(event_type, event.payload, key)
+        if not is_new:
+            return JSONResponse(
+                status_code=200,
+                content={"received": True, "duplicate": True, "event_type": event_type, "event_id": event_id}
+            )
         
-        # Process event in background
-        background_tasks.add_task(
-            process_webhook_event,
-            event_type=event_type,
-            payload=payload.dict(),
-            raw_body=body
+        # Process event in background, after earlier events of the same kickoff
+        event_dispatcher.submit(
+            order_key,
+            {"event": event, "event_id": event_id, "delivery_key": key},
+            sequence=event.sequence
         )
         
         # Return immediately (webhook best practice)
         return JSONResponse(
             status_code=200,
-            content={"received": True, "event_type": event_type}
+            content={"received": True, "event_type": event_type, "event_id": event_id}
         )
         
     except HTTPException:
@@ -162,37 +216,46 @@ async def receive_crewai_webhook(
 
 
 async def process_webhook_event(
-    event_type: str,
-    payload: Dict[str, Any],
-    raw_body: Dict[str, Any]
+    event: WebhookEvent,
+    event_id: Optional[str] = None,
+    delivery_key: Optional[str] = None
 ):
     """
     Process webhook event asynchronously.
+    Failures are retried with backoff by the event processor, then dead-lettered.
     """
-    try:
-        # Add timestamp if missing
-        if "timestamp" not in payload:
-            payload["timestamp"] = datetime.utcnow().isoformat()
-        
-        # Process event based on type
-        if event_type == WebhookEventType.CHECKPOINT_REQUIRED.value:
-            await handle_checkpoint_required(payload)
-        elif event_type == WebhookEventType.TASK_COMPLETED.value:
-            await handle_task_completed(payload)
-        elif event_type == WebhookEventType.CREW_COMPLETED.value:
-            await handle_crew_completed(payload)
-        elif event_type == WebhookEventType.CREW_FAILED.value:
-            await handle_crew_failed(payload)
-        else:
-            # Generic event handling
-            await event_processor.process_event(event_type, payload)
-        
-        # Send notifications
-        await notification_service.send_event_notification(event_type, payload)
-        
-    except Exception as e:
-        # Log error and potentially retry
-        await event_processor.handle_error(event_type, payload, str(e))
+    await event_processor.process_event(
+        event.event_type, event.payload, event_id=event_id, delivery_key=delivery_key
+    )
+
+
+async def handle_webhook_event(event_type: str, payload: Dict[str, Any]):
+    """Full pipeline for one event (store + notify); re-run as a whole on retry."""
+    # Process event based on type
+    if event_type == WebhookEventType.CHECKPOINT_REQUIRED.value:
+        await handle_checkpoint_required(payload)
+    elif event_type == WebhookEventType.TASK_COMPLETED.value:
+        await handle_task_completed(payload)
+    elif event_type == WebhookEventType.CREW_COMPLETED.value:
+        await handle_crew_completed(payload)
+    elif event_type == WebhookEventType.CREW_FAILED.value:
+        await handle_crew_failed(payload)
+    else:
+        # Generic event handling
+        await event_processor.dispatch_event(event_type, payload)
+    
+    # Send notifications
+    await notification_service.send_event_notification(event_type, payload)
+
+
+event_processor.handler = handle_webhook_event
+
+event_dispatcher = KeyedEventDispatcher(
+    process_webhook_event,
+    workers=int(os.getenv("WEBHOOK_WORKERS", "8")),
+    queue_size=int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000")),
+    reorder_timeout=float(os.getenv("WEBHOOK_REORDER_TIMEOUT", "2"))
+)
 
 
 async def handle_checkpoint_required(payload: Dict[str, Any]):
@@ -309,6 +372,53 @@ async def receive_feedback_webhook(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/webhook/dlq")
+async def list_dead_letters(limit: int = 100, authorization: Optional[str] = Header(None)):
+    """Events that failed every retry (most recent first)."""
+    if not security.verify_authorization(authorization):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    return {
+        "count": event_processor.retry_stats()["dead_letters"],
+        "events": event_processor.list_dead_letters(limit=max(1, min(limit, 1000)))
+    }
+
+
+@app.post("/webhook/dlq/replay")
+async def replay_all_dead_letters(authorization: Optional[str] = Header(None)):
+    """Replay every dead-lettered event; failures go back through the retry schedule."""
+    if not security.verify_authorization(authorization):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    return await event_processor.replay_all_dead_letters()
+
+
+@app.post("/webhook/dlq/{event_id}/replay")
+async def replay_dead_letter(event_id: str, authorization: Optional[str] = Header(None)):
+    """Replay one dead-lettered event now with a fresh retry budget."""
+    if not security.verify_authorization(authorization):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    event = await event_processor.replay_dead_letter(event_id)
+    if event is None:
+        raise HTTPException(status_code=404, detail="Dead-lettered event not found")
+    
+    return event
+
+
+@app.get("/webhook/events")
+async def read_event_log(after_seq: int = 0, limit: int = 100, authorization: Optional[str] = Header(None)):
+    """Historical events and state mutations from the durable log, in order."""
+    if not security.verify_authorization(authorization):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    records = event_processor.read_log(after_seq=max(0, after_seq), limit=max(1, min(limit, 1000)))
+    return {
+        "records": records,
+        "next_after_seq": records[-1]["seq"] if records else after_seq
+    }
+
+
 @app.get("/webhook/checkpoint/{checkpoint_id}")
 async def get_checkpoint(checkpoint_id: str):
     """Get checkpoint information."""
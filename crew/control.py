@@ -0,0 +1,145 @@
+"""
+BAGANA AI — Control channel for a running crew (pause / resume / cancel).
+With `python -m crew.run --stdin --control` the first stdin line is the JSON payload and every
+further line is a control message: {"control": "pause" | "resume" | "cancel"}. Closing stdin
+counts as cancel, so a crew orphaned by its server stops instead of finishing on its own.
+
+crew.run checks the channel between agent steps (_step_callback / task callback):
+pause blocks at the next step boundary until resume; cancel raises CrewCancelled there.
+An LLM request already in flight when cancel arrives is not waited for: after cancel_grace
+seconds the on_abort hook runs (crew.run writes the partial result and exits the process,
+which closes the open HTTP connection).
+No crewai imports here, so stand-in crews and servers can use it too.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from typing import Callable, TextIO
+
+CONTROL_ACTIONS = ("pause", "resume", "cancel")
+
+
+class CrewCancelled(Exception):
+    """Raised at a step boundary once the run has been cancelled."""
+
+
+class CrewControl:
+    """Thread-safe run state shared by the stdin listener and the crew's step callbacks."""
+
+    def __init__(
+        self,
+        cancel_grace: float = 0.5,
+        on_abort: Callable[[], None] | None = None,
+        events: TextIO | None = None,
+    ):
+        self.cancel_grace = cancel_grace
+        self.on_abort = on_abort
+        self.events = events if events is not None else sys.stderr
+        self.state = "running"  # running | paused | cancelled
+        self._lock = threading.Lock()
+        self._resume = threading.Event()
+        self._resume.set()
+        self._cancelled = threading.Event()
+        self._finished = False
+        self._aborted = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def pause(self):
+        with self._lock:
+            if self.state != "running":
+                return
+            self.state = "paused"
+            self._resume.clear()
+
+    def resume(self):
+        with self._lock:
+            if self.state != "paused":
+                return
+            self.state = "running"
+            self._resume.set()
+        self._emit("running")
+
+    def cancel(self):
+        with self._lock:
+            if self.state == "cancelled" or self._finished:
+                return
+            self.state = "cancelled"
+            self._cancelled.set()
+            self._resume.set()  # a paused crew must wake up to exit
+        if self.on_abort is not None:
+            timer = threading.Timer(self.cancel_grace, self._abort)
+            timer.daemon = True
+            timer.start()
+
+    def finish(self, cancelled: bool = False) -> bool:
+        """
+        Mark the run as done; False if it already was (the result was written elsewhere,
+        e.g. aborted after cancel). Only the caller that gets True writes the result.
+        """
+        with self._lock:
+            if self._finished:
+                return False
+            self._finished = True
+        if cancelled:
+            self._emit("cancelled")
+        return True
+
+    def wait_aborted(self, timeout: float | None = None):
+        """Block while the on_abort hook runs (for a caller whose finish() returned False)."""
+        self._aborted.wait(timeout)
+
+    def checkpoint(self):
+        """Step boundary: block while paused, raise CrewCancelled once cancelled."""
+        if not self._resume.is_set():
+            self._emit("paused")
+            self._resume.wait()
+        if self._cancelled.is_set():
+            raise CrewCancelled("Crew run cancelled")
+
+    def handle(self, message: dict):
+        action = message.get("control")
+        if action == "pause":
+            self.pause()
+        elif action == "resume":
+            self.resume()
+        elif action == "cancel":
+            self.cancel()
+
+    def listen(self, stream: TextIO) -> threading.Thread:
+        """Read control lines from stream on a daemon thread; EOF cancels the run."""
+        def run():
+            for line in stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self.handle(json.loads(line))
+                except (json.JSONDecodeError, AttributeError):
+                    continue
+            self.cancel()
+
+        thread = threading.Thread(target=run, name="crew-control", daemon=True)
+        thread.start()
+        return thread
+
+    def _abort(self):
+        """Cancel grace expired without reaching a step boundary (LLM call in flight)."""
+        if self.finish(cancelled=True):
+            try:
+                self.on_abort()
+            finally:
+                self._aborted.set()
+
+    def _emit(self, state: str):
+        """Report the effective state on the progress stream ({"type": "control", ...})."""
+        try:
+            self.events.write(json.dumps({"type": "control", "state": state}) + "\n")
+            self.events.flush()
+        except Exception:
+            pass
@@ -0,0 +1,307 @@
+"""
+BAGANA AI — Single-pass artifact parser.
+Turns task outputs (content plan, sentiment, trends) into typed records in one pass over the
+lines, so the API, storage and UI get pre-parsed JSON instead of re-scanning markdown with regex
+(lib/trends.ts, lib/sentimentAnalysis.ts, app/api/trends/route.ts). crew.run parses each task
+output once, when the task has finished; CrewAI hands it over whole, not token by token.
+Grammar follows config/tasks.yaml; value clamping matches the TypeScript parsers.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+# Shared line patterns (also used by crew/tools.py validators).
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+PIE_CHART_RE = re.compile(
+    r"Sentiment Composition\s*\([^)]*\)\s*:\s*(?:Positive|Positif)\s*(\d+(?:\.\d+)?)\s*%?\s*,?\s*"
+    r"(?:Neutral|Netral)\s*(\d+(?:\.\d+)?)\s*%?\s*,?\s*(?:Negative|Negatif)\s*(\d+(?:\.\d+)?)\s*%?",
+    re.IGNORECASE,
+)
+BAR_ROW_RE = re.compile(r"^(.+?)\s*\|\s*(\d+(?:\.\d+)?)\s*%?$")
+LINE_ROW_RE = re.compile(r"^(.+?)\s*\|\s*(.+)$")
+LINE_POINT_RE = re.compile(r"^(.+?):\s*(\d+(?:\.\d+)?)\s*%?$")
+BAR_SECTION_RE = re.compile(r"summary\s+bar\s+chart\s+data", re.IGNORECASE)
+LINE_SECTION_RE = re.compile(r"^\**\s*#*\s*trend\s+line\s+chart\s+data\b", re.IGNORECASE)
+
+_HEADING_CLEAN_RE = re.compile(r"^(?:\d+[.)]\s*)?\**\s*|\s*\**\s*:?\s*\**$")
+_LIST_MARKER_RE = re.compile(r"^(?:\d+[.)]|[-*+•])\s+")
+_BOLD_LABEL_RE = re.compile(r"^\*\*(.+?)\*\*\s*[:\-–—]?\s*(.*)$")
+_PLAIN_LABEL_RE = re.compile(r"^(.+?)(?::|\s[-–—]\s)\s*(.*)$")
+_TABLE_SEP_RE = re.compile(r"^\|?\s*:?-{2,}")
+
+# Section kinds keyed by a substring of the normalized heading.
+_SECTION_KINDS = (
+    ("key market trends", "key_trends"),
+    ("talent assignment", "talent"),
+    ("calendar", "calendar"),
+    ("timeline", "calendar"),
+)
+
+
+def normalize_heading(text: str) -> str:
+    """Lowercase heading text without numbering, bold markers or trailing colon."""
+    return " ".join(_HEADING_CLEAN_RE.sub("", text).split()).lower()
+
+
+def _clamp(value: str) -> float:
+    return min(100.0, max(0.0, float(value)))
+
+
+def _split_item(line: str) -> tuple[str, str] | None:
+    """Split a list item like '- **Label**: text' or '1. Label - text' into (label, text)."""
+    body = _LIST_MARKER_RE.sub("", line, count=1)
+    if body is line and not line.startswith("**"):
+        return None
+    m = _BOLD_LABEL_RE.match(body) or _PLAIN_LABEL_RE.match(body)
+    if not m:
+        return (body.strip(), "") if body.strip() else None
+    label = m.group(1).strip().rstrip(":").strip()
+    return (label, m.group(2).strip()) if label else None
+
+
+def _table_cells(line: str) -> list[str]:
+    return [c.strip().strip("*").strip() for c in line.strip().strip("|").split("|")]
+
+
+@dataclass(slots=True)
+class SentimentComposition:
+    positive_pct: float
+    neutral_pct: float
+    negative_pct: float
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "positive_pct": self.positive_pct,
+            "neutral_pct": self.neutral_pct,
+            "negative_pct": self.negative_pct,
+        }
+
+
+@dataclass(slots=True)
+class KeyTrend:
+    name: str
+    description: str
+
+    def to_dict(self) -> dict[str, str]:
+        return {"name": self.name, "description": self.description}
+
+
+@dataclass(slots=True)
+class SummaryBar:
+    name: str
+    value: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"name": self.name, "value": self.value}
+
+
+@dataclass(slots=True)
+class TrendPoint:
+    period: str
+    value: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"period": self.period, "value": self.value}
+
+
+@dataclass(slots=True)
+class TrendLine:
+    name: str
+    data: list[TrendPoint]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"name": self.name, "data": [p.to_dict() for p in self.data]}
+
+
+@dataclass(slots=True)
+class TalentAssignment:
+    talent: str
+    assignment: str
+
+    def to_dict(self) -> dict[str, str]:
+        return {"talent": self.talent, "assignment": self.assignment}
+
+
+@dataclass(slots=True)
+class CalendarEntry:
+    period: str
+    activity: str
+
+    def to_dict(self) -> dict[str, str]:
+        return {"period": self.period, "activity": self.activity}
+
+
+@dataclass(slots=True)
+class ParsedArtifact:
+    """Typed records extracted from one task output. sections maps normalized heading -> body text."""
+    sentiment: SentimentComposition | None = None
+    key_market_trends: list[KeyTrend] = field(default_factory=list)
+    summary_bar_chart_data: list[SummaryBar] = field(default_factory=list)
+    trend_line_chart_data: list[TrendLine] = field(default_factory=list)
+    talent_assignments: list[TalentAssignment] = field(default_factory=list)
+    content_calendar: list[CalendarEntry] = field(default_factory=list)
+    sections: dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self, include_sections: bool = True) -> dict[str, Any]:
+        """JSON-serializable form; empty record lists are omitted."""
+        out: dict[str, Any] = {}
+        if self.sentiment is not None:
+            out["sentiment"] = self.sentiment.to_dict()
+        for name in (
+            "key_market_trends",
+            "summary_bar_chart_data",
+            "trend_line_chart_data",
+            "talent_assignments",
+            "content_calendar",
+        ):
+            records = getattr(self, name)
+            if records:
+                out[name] = [r.to_dict() for r in records]
+        if include_sections and self.sections:
+            out["sections"] = dict(self.sections)
+        return out
+
+
+class ArtifactParser:
+    """
+    Incremental line parser. Call feed() with chunks of text (any split, even mid-line) and
+    close() once to flush the tail and get the ParsedArtifact.
+    Each line is classified once; no section is re-scanned.
+    """
+
+    __slots__ = (
+        "_buf", "_result", "_mode", "_section", "_section_lines",
+        "_table_header_seen", "_closed",
+    )
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._result = ParsedArtifact()
+        self._mode: str | None = None
+        self._section: str | None = None
+        self._section_lines: list[str] = []
+        self._table_header_seen = False
+        self._closed = False
+
+    @property
+    def result(self) -> ParsedArtifact:
+        """Records parsed so far (complete lines only)."""
+        return self._result
+
+    def feed(self, chunk: str) -> None:
+        if self._closed:
+            raise ValueError("ArtifactParser already closed")
+        if not chunk:
+            return
+        data = self._buf + chunk
+        start = 0
+        while True:
+            end = data.find("\n", start)
+            if end < 0:
+                break
+            self._line(data[start:end])
+            start = end + 1
+        self._buf = data[start:]
+
+    def close(self) -> ParsedArtifact:
+        if not self._closed:
+            if self._buf:
+                self._line(self._buf)
+                self._buf = ""
+            self._flush_section()
+            self._closed = True
+        return self._result
+
+    def _flush_section(self) -> None:
+        if self._section is not None:
+            text = "\n".join(self._section_lines).strip()
+            if text:
+                self._result.sections.setdefault(self._section, text)
+        self._section_lines = []
+
+    def _line(self, raw: str) -> None:
+        line = raw.strip()
+        heading = HEADING_RE.match(line) if line.startswith("#") else None
+        if heading is None and self._section is not None:
+            self._section_lines.append(raw.rstrip("\r"))
+        if not line:
+            return
+
+        result = self._result
+        if result.sentiment is None and "omposition" in line:
+            m = PIE_CHART_RE.search(line)
+            if m:
+                pos, neu, neg = (_clamp(v) for v in m.groups())
+                result.sentiment = SentimentComposition(pos, neu, neg)
+                return
+
+        if heading:
+            self._flush_section()
+            title = normalize_heading(heading.group(2))
+            self._section = title
+            self._table_header_seen = False
+            if BAR_SECTION_RE.search(title):
+                self._mode = "bar"
+            elif LINE_SECTION_RE.match(title):
+                self._mode = "line"
+            else:
+                self._mode = next((kind for key, kind in _SECTION_KINDS if key in title), None)
+            return
+
+        if LINE_SECTION_RE.match(line):
+            self._mode = "line"
+            return
+
+        mode = self._mode
+        if mode is None:
+            return
+        if mode == "bar":
+            m = BAR_ROW_RE.match(line.lstrip("-* ").strip())
+            if m:
+                result.summary_bar_chart_data.append(SummaryBar(m.group(1).strip(), _clamp(m.group(2))))
+        elif mode == "line":
+            m = LINE_ROW_RE.match(line.lstrip("-* ").strip())
+            if m:
+                points = []
+                for pair in m.group(2).split(","):
+                    p = LINE_POINT_RE.match(pair.strip())
+                    if p:
+                        points.append(TrendPoint(p.group(1).strip(), _clamp(p.group(2))))
+                if points:
+                    result.trend_line_chart_data.append(TrendLine(m.group(1).strip(), points))
+        elif mode == "key_trends":
+            item = _split_item(line)
+            if item and item[1]:
+                result.key_market_trends.append(KeyTrend(*item))
+        else:
+            pair = self._row(line)
+            if pair is None:
+                return
+            if mode == "talent":
+                result.talent_assignments.append(TalentAssignment(*pair))
+            else:
+                result.content_calendar.append(CalendarEntry(*pair))
+
+    def _row(self, line: str) -> tuple[str, str] | None:
+        """(label, text) from a list item or a markdown table row (header row skipped)."""
+        if line.startswith("|"):
+            if _TABLE_SEP_RE.match(line):
+                return None
+            if not self._table_header_seen:
+                self._table_header_seen = True
+                return None
+            cells = [c for c in _table_cells(line) if c]
+            if not cells:
+                return None
+            return cells[0], "; ".join(cells[1:])
+        return _split_item(line)
+
+
+def parse_artifact(text: str) -> ParsedArtifact:
+    """Parse a complete task output in one call."""
+    parser = ArtifactParser()
+    parser.feed(text or "")
+    return parser.close()
@@ -106,6 +106,8 @@ else:
 
 from crewai import Agent, Task, Crew, LLM
 
+from crew.control import CrewCancelled, CrewControl
+from crew.parsing import parse_artifact
 from crew.tools import (
     plan_schema_validator,
     sentiment_schema_validator,
@@ -163,6 +165,18 @@ TASK_PARAMS = {
     "output_file", "create_directory",
 }
 
+# MVP task order per SAD §2; phase-scoped runs (inputs["tasks"]) keep this order.
+TASK_ORDER = [
+    "create_content_plan",  # First: no dependencies
+    "analyze_sentiment",    # Second: depends on create_content_plan
+    "research_trends",      # Third: depends on create_content_plan (parallel with analyze_sentiment)
+]
+
+
+def _prior_output_key(task_id: str) -> str:
+    """Input key carrying the stored output of a task that ran in an earlier phase."""
+    return f"prior_output_{task_id}"
+
 
 def _load_yaml(path: Path) -> dict:
     """Load and parse YAML file."""
@@ -199,10 +213,15 @@ def _build_task(
     config: dict,
     agents: dict[str, Agent],
     task_refs: dict[str, Task],
+    prior_outputs: set[str] | frozenset[str] = frozenset(),
+    revise: bool = False,
 ) -> Task:
     """
     Build CrewAI Task from YAML config. Resolve context_from to Task refs.
     Per adapter rules: explicit Task.context for inter-task dependencies.
+    Dependencies listed in prior_outputs ran in an earlier phase: their stored output is
+    interpolated into the description from inputs instead of re-running the task.
+    revise appends the reviewer's {revision_feedback} (and the previous draft, when supplied).
     """
     agent_ref = config.get("agent")
     if agent_ref not in agents:
@@ -221,6 +240,11 @@ def _build_task(
         for ctx_task_id in context_from:
             if ctx_task_id in task_refs:
                 context_tasks.append(task_refs[ctx_task_id])
+            elif ctx_task_id in prior_outputs:
+                params["description"] = (
+                    params["description"].rstrip()
+                    + f"\n\nContext (approved output of {ctx_task_id}):\n{{{_prior_output_key(ctx_task_id)}}}\n"
+                )
             else:
                 import warnings
                 warnings.warn(f"Task {task_id}: context task '{ctx_task_id}' not yet built. This may cause issues.")
@@ -229,6 +253,17 @@ def _build_task(
         # Default to empty context if not specified
         params["context"] = []
 
+    if revise:
+        if task_id in prior_outputs:
+            params["description"] = (
+                params["description"].rstrip()
+                + f"\n\nPrevious draft (to revise):\n{{{_prior_output_key(task_id)}}}\n"
+            )
+        params["description"] = (
+            params["description"].rstrip()
+            + "\n\nReviewer feedback (address all of it in this revision):\n{revision_feedback}\n"
+        )
+
     return Task(**params)
 
 
@@ -239,11 +274,18 @@ def load_config() -> tuple[dict, dict]:
     return agents_data, tasks_data
 
 
-def build_crew() -> Crew:
+def build_crew(
+    task_ids: list[str] | None = None,
+    prior_outputs: set[str] | frozenset[str] = frozenset(),
+    revise: bool = False,
+) -> Crew:
     """
     Build Crew from YAML config.
     MVP Flow per SAD §2: content_planner → (sentiment_analyst, trend_researcher) with shared plan context.
     Sequential execution for deterministic builds; no delegation; memory=False for reproducibility.
+    task_ids limits the crew to a phase (e.g. HITL planning vs. analysis); prior_outputs names
+    tasks whose output is supplied via inputs (see _prior_output_key); revise re-runs the
+    selected tasks against {revision_feedback}.
     """
     agents_data, tasks_data = load_config()
     agents_cfg = agents_data.get("agents", {})
@@ -275,16 +317,18 @@ def build_crew() -> Crew:
 
     # Task order matches MVP flow: plan → sentiment + trend (parallel)
     # Dependencies are resolved via context_from in tasks.yaml
-    task_order = [
-        "create_content_plan",  # First: no dependencies
-        "analyze_sentiment",    # Second: depends on create_content_plan
-        "research_trends",      # Third: depends on create_content_plan (parallel with analyze_sentiment)
-    ]
+    if task_ids is not None:
+        unknown = [tid for tid in task_ids if tid not in TASK_ORDER]
+        if unknown:
+            raise ValueError(f"Unknown task ids {unknown}. Available: {TASK_ORDER}")
+        if not task_ids:
+            raise ValueError("task_ids is empty; nothing to run.")
+    task_order = [tid for tid in TASK_ORDER if task_ids is None or tid in task_ids]
 
     for tid in task_order:
         if tid not in tasks_cfg:
             raise ValueError(f"Task {tid} not found in tasks.yaml. Required for MVP flow.")
-        t = _build_task(tid, tasks_cfg[tid], agents, task_refs)
+        t = _build_task(tid, tasks_cfg[tid], agents, task_refs, prior_outputs, revise)
         task_refs[tid] = t
         tasks.append(t)
     
@@ -299,7 +343,28 @@ def build_crew() -> Crew:
                 import logging
                 logging.debug(f"Task {task_name} depends on: {context_task_names}")
 
-    return Crew(agents=list(agents.values()), tasks=tasks, verbose=False, step_callback=_step_callback)
+    # Only agents that own a task in this run (phase-scoped crews use a subset)
+    used_agents = [a for a in agents.values() if any(t.agent is a for t in tasks)]
+    return Crew(
+        agents=used_agents,
+        tasks=tasks,
+        verbose=False,
+        step_callback=_step_callback,
+        task_callback=_task_callback,
+    )
+
+
+# Pause/resume/cancel channel, set in --control mode (see crew.control); None for plain runs.
+_control: CrewControl | None = None
+# Outputs of tasks finished so far in this process; returned as the partial result on cancel.
+_completed_task_outputs: list = []
+
+
+def _task_callback(output: object) -> None:
+    """Record a finished task (partial result on cancel); task boundaries are step boundaries too."""
+    _completed_task_outputs.append(output)
+    if _control is not None:
+        _control.checkpoint()
 
 
 def _step_callback(step: object) -> None:
@@ -389,6 +454,10 @@ def _step_callback(step: object) -> None:
         except:
             pass  # Ignore if log file write fails
 
+    # Step boundary: block here while paused, abort here once cancelled (no further LLM calls)
+    if _control is not None:
+        _control.checkpoint()
+
 
 def _collect_token_usage(result: object, task_outputs: list) -> dict | None:
     """
@@ -413,12 +482,56 @@ def _collect_token_usage(result: object, task_outputs: list) -> dict | None:
     return None
 
 
+def _task_output_record(i: int, to: object) -> dict:
+    """JSON record of one task output: task name, agent, text and parsed artifact."""
+    task_name = getattr(to, "name", None) or getattr(to, "description", f"task_{i}")
+    # Try to get agent from task if available
+    task_agent = None
+    if hasattr(to, "agent"):
+        agent_obj = to.agent
+        if hasattr(agent_obj, "role"):
+            task_agent = agent_obj.role
+        elif isinstance(agent_obj, str):
+            task_agent = agent_obj
+
+    output_text = str(getattr(to, "raw", to))
+    return {
+        "task": str(task_name)[:50],
+        "agent": task_agent,  # Include agent info for frontend mapping
+        "output": output_text,
+        # Typed records (pie %, chart data, talents, calendar) so consumers skip re-parsing markdown.
+        # Section bodies are left out (they would copy "output" again); consumers that need them,
+        # like crew.store for the market_trends text columns, parse "output" themselves.
+        "parsed": parse_artifact(output_text).to_dict(include_sections=False),
+    }
+
+
+def _cancelled_result() -> dict:
+    """Result of a cancelled run: outputs of the tasks that finished before the cancel."""
+    outputs_list = [_task_output_record(i, to) for i, to in enumerate(list(_completed_task_outputs))]
+    return {
+        "status": "cancelled",
+        "output": outputs_list[-1]["output"] if outputs_list else "",
+        "task_outputs": outputs_list,
+    }
+
+
 def kickoff(inputs: dict | None = None) -> dict:
     """
     Run crew.kickoff(inputs). Returns structured result for API/Integration epic.
     inputs: { user_input: str, campaign_context?: str, language?: str, ... } for task interpolation.
+    Phase-scoped runs: tasks?: [task_id, ...] runs only those tasks; prior_outputs?: {task_id: output}
+    supplies outputs of dependencies that ran earlier (e.g. the approved plan for the analysis phase);
+    revision_feedback?: str re-runs the selected tasks with reviewer feedback (HITL "revise").
     """
-    inputs = inputs or {}
+    inputs = dict(inputs or {})
+    task_ids = inputs.pop("tasks", None)
+    prior_outputs = inputs.pop("prior_outputs", None) or {}
+    for tid, text in prior_outputs.items():
+        inputs[_prior_output_key(tid)] = str(text)
+    revision_feedback = inputs.get("revision_feedback")
+    if revision_feedback is not None:
+        inputs["revision_feedback"] = str(revision_feedback)
     if "user_input" not in inputs:
         inputs["user_input"] = inputs.get("message", inputs.get("campaign_context", "No context provided."))
     # Multi-language: agents will write output in this language (interpolated in task descriptions)
@@ -429,13 +542,21 @@ def kickoff(inputs: dict | None = None) -> dict:
         else:
             inputs["output_language"] = "the same language as the user's message (e.g. Indonesian, English, or other as appropriate)"
 
-    crew = build_crew()
+    try:
+        crew = build_crew(task_ids, frozenset(prior_outputs), revise=revision_feedback is not None)
+    except ValueError as e:
+        return {"status": "error", "error": str(e)}
     if crew.step_callback is None:
         crew.step_callback = _step_callback
 
+    _completed_task_outputs.clear()
     try:
         result = crew.kickoff(inputs=inputs)
+    except CrewCancelled:
+        return _cancelled_result()
     except Exception as e:
+        if _control is not None and _control.cancelled:
+            return _cancelled_result()  # CrewCancelled re-wrapped by crewai
         err = str(e)
         if "401" in err or "Incorrect API key" in err or "invalid_api_key" in err:
             if _use_openai_direct:
@@ -460,21 +581,7 @@ def kickoff(inputs: dict | None = None) -> dict:
             f.write(f"[{datetime.utcnow().isoformat()}Z] token_usage: {json.dumps(token_usage)}\n")
     
     # Map task outputs to include task name and agent info for frontend
-    outputs_list = []
-    for i, to in enumerate(task_outputs):
-        task_name = getattr(to, "name", None) or getattr(to, "description", f"task_{i}")
-        # Try to get agent from task if available
-        task_agent = None
-        if hasattr(to, "agent"):
-            agent_obj = to.agent
-            if hasattr(agent_obj, "role"):
-                task_agent = agent_obj.role
-        
-        outputs_list.append({
-            "task": str(task_name)[:50],
-            "agent": task_agent,  # Include agent info for frontend mapping
-            "output": str(getattr(to, "raw", to))
-        })
+    outputs_list = [_task_output_record(i, to) for i, to in enumerate(task_outputs)]
 
     out = {
         "status": "complete",
@@ -507,10 +614,30 @@ if __name__ == "__main__":
 
     if len(sys.argv) > 1 and sys.argv[1] == "--stdin":
         # API mode: read JSON from stdin, write JSON to stdout
+        # --control: payload is the first stdin line, later lines are pause/resume/cancel (crew.control)
         try:
-            payload = json.load(sys.stdin)
-            result = kickoff(payload)
-            json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+            if "--control" in sys.argv[2:]:
+                def _abort() -> None:
+                    # Cancel arrived mid LLM call: report partial outputs and exit, closing the request
+                    json.dump(_cancelled_result(), sys.stdout, indent=2, ensure_ascii=False)
+                    sys.stdout.flush()
+                    os._exit(0)
+
+                payload = json.loads(sys.stdin.readline())
+                _control = CrewControl(
+                    cancel_grace=float(os.getenv("CREW_CANCEL_GRACE_SEC", "0.5")),
+                    on_abort=_abort,
+                )
+                _control.listen(sys.stdin)
+                result = kickoff(payload)
+                if _control.finish(cancelled=result.get("status") == "cancelled"):
+                    json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+                else:
+                    _control.wait_aborted()  # the abort hook is writing the partial result
+            else:
+                payload = json.load(sys.stdin)
+                result = kickoff(payload)
+                json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
         except Exception as e:
             json.dump({"status": "error", "error": str(e)}, sys.stdout, indent=2, ensure_ascii=False)
             sys.exit(1)
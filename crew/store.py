@@ -0,0 +1,349 @@
+"""
+BAGANA AI — Bulk persistence of crew results into PostgreSQL.
+Writes a finished run's parsed outputs (crew.parsing) to sentiment_analyses, market_trends and
+content_plans / plan_versions / plan_talents in one transaction, batching rows with execute_values
+over a psycopg2 connection pool. Schemas: scripts/init-sentiment-db.py, scripts/init-trends-db-new.py,
+scripts/init-content-plans-db.py.
+
+CLI:
+  python -m crew.store store --brand "Brand" [--conversation-id ID] [result.json]   (default: stdin)
+  python -m crew.store backfill [--batch 500]   re-parse market_trends.full_output into JSONB columns
+
+Offline check of build_rows on kickoff()-shaped results: python scripts/validate-crew-store.py
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import Json, execute_values
+
+from crew.parsing import HEADING_RE, parse_artifact
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "127.0.0.1"),
+    "port": int(os.getenv("DB_PORT", "5432")),
+    "database": os.getenv("DB_NAME", "bagana-ai-cp"),
+    "user": os.getenv("DB_USER", "postgres"),
+    "password": os.getenv("DB_PASSWORD", "123456"),
+}
+POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "5"))
+PAGE_SIZE = 500
+
+# market_trends text column -> normalized heading (crew.parsing sections key)
+TREND_TEXT_COLUMNS = (
+    ("creator_economy_insights", "creator economy insights"),
+    ("competitive_landscape", "competitive landscape"),
+    ("content_format_trends", "content format trends"),
+    ("timing_seasonality", "timing and seasonality"),
+    ("implications_strategy", "implications for strategy"),
+    ("recommendations", "recommendations"),
+    ("sources", "sources"),
+    ("audit", "audit"),
+)
+TREND_JSON_COLUMNS = ("key_market_trends", "summary_bar_chart_data", "trend_line_chart_data")
+
+_INSERT_SENTIMENT = """
+    INSERT INTO sentiment_analyses
+        (id, brand_name, positive_pct, negative_pct, neutral_pct, full_output, conversation_id)
+    VALUES %s
+"""
+_INSERT_TRENDS = f"""
+    INSERT INTO market_trends
+        (id, brand_name, conversation_id, {", ".join(TREND_JSON_COLUMNS)},
+         {", ".join(c for c, _ in TREND_TEXT_COLUMNS)}, full_output)
+    VALUES %s
+"""
+_INSERT_PLANS = """
+    INSERT INTO content_plans (id, title, campaign, brand_name, conversation_id, schema_valid)
+    VALUES %s
+    ON CONFLICT (id) DO UPDATE SET
+        title = EXCLUDED.title, campaign = EXCLUDED.campaign, brand_name = EXCLUDED.brand_name,
+        conversation_id = EXCLUDED.conversation_id, schema_valid = EXCLUDED.schema_valid,
+        updated_at = CURRENT_TIMESTAMP
+"""
+_INSERT_PLAN_VERSIONS = """
+    INSERT INTO plan_versions (id, plan_id, version, content, metadata)
+    VALUES %s
+    ON CONFLICT (id) DO UPDATE SET content = EXCLUDED.content, metadata = EXCLUDED.metadata
+"""
+_INSERT_PLAN_TALENTS = """
+    INSERT INTO plan_talents (plan_id, talent_name) VALUES %s
+    ON CONFLICT (plan_id, talent_name) DO NOTHING
+"""
+_BACKFILL_UPDATE = f"""
+    UPDATE market_trends AS m SET
+        {", ".join(f"{c} = v.{c}" for c in TREND_JSON_COLUMNS)},
+        {", ".join(f"{c} = COALESCE(m.{c}, v.{c})" for c, _ in TREND_TEXT_COLUMNS)}
+    FROM (VALUES %s) AS v(id, {", ".join(TREND_JSON_COLUMNS)}, {", ".join(c for c, _ in TREND_TEXT_COLUMNS)})
+    WHERE m.id = v.id
+"""
+_BACKFILL_TEMPLATE = "(%s, " + ", ".join(["%s::jsonb"] * len(TREND_JSON_COLUMNS)) + ", " + ", ".join(
+    ["%s"] * len(TREND_TEXT_COLUMNS)) + ")"
+
+_pool: pg_pool.ThreadedConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> pg_pool.ThreadedConnectionPool:
+    """Process-wide connection pool (created lazily; DB_POOL_MIN / DB_POOL_MAX)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pg_pool.ThreadedConnectionPool(POOL_MIN, POOL_MAX, **DB_CONFIG)
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+@contextmanager
+def transaction() -> Iterator[Any]:
+    """Borrow a pooled connection; commit on success, roll back on error."""
+    p = get_pool()
+    conn = p.getconn()
+    try:
+        with conn.cursor() as cur:
+            yield cur
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        p.putconn(conn)
+
+
+def _gen_id(prefix: str) -> str:
+    """Same shape as the Next.js routes: <prefix>_<epoch ms>_<9 chars>."""
+    return f"{prefix}_{int(time.time() * 1000)}_{uuid.uuid4().hex[:9]}"
+
+
+def _task_kind(task_name: str) -> str | None:
+    """Map a task_outputs[].task name to plan / sentiment / trends (same matching as the UI)."""
+    name = (task_name or "").lower()
+    if "sentiment" in name:
+        return "sentiment"
+    if "trend" in name:
+        return "trends"
+    if "content_plan" in name or "content_strategy" in name or name.startswith("create_content"):
+        return "plan"
+    return None
+
+
+def _section(sections: dict[str, str], title: str) -> str | None:
+    if title in sections:
+        return sections[title]
+    return next((text for key, text in sections.items() if key.startswith(title)), None)
+
+
+def _plan_title(output: str, brand_name: str | None) -> str:
+    for line in output.splitlines():
+        m = HEADING_RE.match(line.strip())
+        if m and m.group(2):
+            return m.group(2).strip("* ")[:100]
+    return f"{brand_name} Content Plan" if brand_name else "Content Plan"
+
+
+def _trend_values(parsed: dict[str, Any]) -> list[Any]:
+    """JSONB + text column values for market_trends in TREND_*_COLUMNS order."""
+    sections = parsed.get("sections", {})
+    values: list[Any] = [Json(parsed[c]) if parsed.get(c) else None for c in TREND_JSON_COLUMNS]
+    values.extend(_section(sections, title) for _, title in TREND_TEXT_COLUMNS)
+    return values
+
+
+@dataclass
+class RunRows:
+    """Rows for one or more runs, grouped by target table."""
+    sentiment: list[tuple] = field(default_factory=list)
+    trends: list[tuple] = field(default_factory=list)
+    plans: list[tuple] = field(default_factory=list)
+    plan_versions: list[tuple] = field(default_factory=list)
+    plan_talents: list[tuple] = field(default_factory=list)
+
+    def ids(self) -> dict[str, list[str]]:
+        return {
+            "sentiment_analyses": [r[0] for r in self.sentiment],
+            "market_trends": [r[0] for r in self.trends],
+            "content_plans": [r[0] for r in self.plans],
+        }
+
+
+def build_rows(
+    result: dict[str, Any],
+    brand_name: str,
+    conversation_id: str | None = None,
+    campaign: str | None = None,
+    rows: RunRows | None = None,
+) -> RunRows:
+    """
+    Turn a kickoff() result into table rows. Uses task_outputs[].parsed when present
+    (crew.run attaches it) and parses the markdown for older results, and for trends
+    whenever parsed has no section bodies (crew.run omits them).
+    """
+    rows = rows or RunRows()
+    brand = (brand_name or "").strip() or "Unknown Brand"
+    for to in result.get("task_outputs") or []:
+        kind = _task_kind(str(to.get("task", "")))
+        output = str(to.get("output") or "")
+        if kind is None or not output.strip():
+            continue
+        parsed = to.get("parsed")
+        if parsed is None or (kind == "trends" and "sections" not in parsed):
+            # crew.run records carry no section bodies; the market_trends text columns need them
+            parsed = parse_artifact(output).to_dict()
+
+        if kind == "sentiment":
+            s = parsed.get("sentiment") or {}
+            rows.sentiment.append((
+                _gen_id("sent"), brand,
+                s.get("positive_pct", 0), s.get("negative_pct", 0), s.get("neutral_pct", 0),
+                output, conversation_id,
+            ))
+        elif kind == "trends":
+            rows.trends.append((_gen_id("trend"), brand, conversation_id, *_trend_values(parsed), output))
+        else:
+            plan_id = _gen_id("plan")
+            rows.plans.append((plan_id, _plan_title(output, brand), campaign, brand, conversation_id, True))
+            rows.plan_versions.append((
+                f"{plan_id}_v1.0", plan_id, "v1.0",
+                Json({"raw": output, "parsed": {k: v for k, v in parsed.items() if k != "sections"}}),
+                Json({"extractedAt": datetime.utcnow().isoformat() + "Z", "source": "crew_store"}),
+            ))
+            talents = {t["talent"][:255] for t in parsed.get("talent_assignments", []) if t.get("talent")}
+            rows.plan_talents.extend((plan_id, name) for name in sorted(talents))
+    return rows
+
+
+def write_rows(cur: Any, rows: RunRows, page_size: int = PAGE_SIZE) -> None:
+    """One execute_values round trip (per page) for each non-empty table, parents first."""
+    if rows.plans:
+        execute_values(cur, _INSERT_PLANS, rows.plans, page_size=page_size)
+    if rows.plan_versions:
+        execute_values(cur, _INSERT_PLAN_VERSIONS, rows.plan_versions, page_size=page_size)
+    if rows.plan_talents:
+        execute_values(cur, _INSERT_PLAN_TALENTS, rows.plan_talents, page_size=page_size)
+    if rows.sentiment:
+        execute_values(cur, _INSERT_SENTIMENT, rows.sentiment, page_size=page_size)
+    if rows.trends:
+        execute_values(cur, _INSERT_TRENDS, rows.trends, page_size=page_size)
+
+
+def store_run(
+    result: dict[str, Any],
+    brand_name: str,
+    conversation_id: str | None = None,
+    campaign: str | None = None,
+) -> dict[str, list[str]]:
+    """Persist one finished run in a single transaction. Returns inserted ids per table."""
+    if result.get("status") != "complete":
+        raise ValueError(f"Refusing to store run with status {result.get('status')!r}")
+    rows = build_rows(result, brand_name, conversation_id, campaign)
+    with transaction() as cur:
+        write_rows(cur, rows)
+    return rows.ids()
+
+
+def store_runs(runs: Iterable[dict[str, Any]]) -> dict[str, list[str]]:
+    """
+    Batch mode: persist many runs in one transaction.
+    Each item: { result, brand_name, conversation_id?, campaign? }. Incomplete runs are skipped.
+    """
+    rows = RunRows()
+    for run in runs:
+        result = run.get("result") or {}
+        if result.get("status") != "complete":
+            continue
+        build_rows(result, run.get("brand_name", ""), run.get("conversation_id"), run.get("campaign"), rows)
+    with transaction() as cur:
+        write_rows(cur, rows)
+    return rows.ids()
+
+
+def backfill_market_trends(batch_size: int = PAGE_SIZE, verbose: bool = True) -> int:
+    """
+    Re-parse full_output for market_trends rows whose JSONB columns are all NULL and fill
+    them (plus any NULL text sections). Keyset-paginated by id; one UPDATE ... FROM (VALUES)
+    and commit per batch, so it can be interrupted and re-run safely.
+    """
+    updated, last_id = 0, ""
+    while True:
+        with transaction() as cur:
+            cur.execute(
+                """
+                SELECT id, full_output FROM market_trends
+                WHERE id > %s AND full_output IS NOT NULL
+                  AND key_market_trends IS NULL AND summary_bar_chart_data IS NULL
+                  AND trend_line_chart_data IS NULL
+                ORDER BY id LIMIT %s
+                """,
+                (last_id, batch_size),
+            )
+            batch = cur.fetchall()
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            values = [(row_id, *_trend_values(parse_artifact(text).to_dict())) for row_id, text in batch]
+            execute_values(cur, _BACKFILL_UPDATE, values, template=_BACKFILL_TEMPLATE, page_size=batch_size)
+        updated += len(batch)
+        if verbose:
+            print(f"  backfilled {updated} rows (last id {last_id})")
+    return updated
+
+
+def _main(argv: list[str]) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m crew.store", description="Persist crew results to PostgreSQL.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    st = sub.add_parser("store", help="store one kickoff() JSON result")
+    st.add_argument("path", nargs="?", help="result JSON file (default: stdin)")
+    st.add_argument("--brand", required=True)
+    st.add_argument("--conversation-id")
+    st.add_argument("--campaign")
+    bf = sub.add_parser("backfill", help="populate market_trends JSONB columns from full_output")
+    bf.add_argument("--batch", type=int, default=PAGE_SIZE)
+    args = ap.parse_args(argv)
+
+    try:
+        if args.command == "store":
+            if args.path:
+                with open(args.path, encoding="utf-8") as f:
+                    result = json.load(f)
+            else:
+                result = json.load(sys.stdin)
+            ids = store_run(result, args.brand, args.conversation_id, args.campaign)
+            json.dump(ids, sys.stdout, indent=2)
+            print()
+        else:
+            print("Backfilling market_trends structured columns...")
+            n = backfill_market_trends(args.batch)
+            print(f"[OK] {n} rows backfilled")
+        return 0
+    except (psycopg2.Error, ValueError) as e:
+        print(f"[FAIL] {e}", file=sys.stderr)
+        return 1
+    finally:
+        close_pool()
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
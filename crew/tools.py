@@ -1,34 +1,277 @@
 """
-BAGANA AI — CrewAI stub tools.
-SAD §2, §4: File I/O, schema validation. MVP uses stubs; no external APIs.
+BAGANA AI — CrewAI tools.
+SAD §2, §4: File I/O, schema validation. MVP core validators (plan, sentiment, trend) check
+output against the expected_output headings in config/tasks.yaml; other tools remain stubs.
 Per backend-eng prohibited-actions: no persistent storage, analytics, or external integrations.
 """
 
+from __future__ import annotations
+
+import re
+from pathlib import Path
+
+import yaml
 from crewai.tools import tool
 
+from crew.parsing import (
+    BAR_ROW_RE,
+    BAR_SECTION_RE,
+    HEADING_RE,
+    LINE_POINT_RE,
+    LINE_ROW_RE,
+    LINE_SECTION_RE,
+    PIE_CHART_RE,
+    normalize_heading,
+)
 
-@tool("Validate plan schema")
-def plan_schema_validator(content: str) -> str:
-    """Validate that a content plan follows the expected schema (Overview, Objectives, Talent Assignments, etc.). Returns validation result. Stub: accepts any content."""
+TASKS_PATH = Path(__file__).resolve().parent.parent / "config" / "tasks.yaml"
+
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_EXPECTED_HEADINGS_RE = re.compile(r"Headings:\s*(.+?)\.\s+(?=[A-Z][\w ]*:)", re.DOTALL)
+
+# Per-task chart checks on top of the heading list (see tasks.yaml descriptions).
+_CHART_CHECKS = {
+    "analyze_sentiment": ("pie",),
+    "research_trends": ("bar", "line"),
+}
+
+_MAX_ISSUES = 20
+
+
+def _split_top_level(text: str) -> list[str]:
+    """Split a heading list on ';' / ',' outside parentheses."""
+    items, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(0, depth - 1)
+        elif ch in ";," and depth == 0:
+            items.append(text[start:i])
+            start = i + 1
+    items.append(text[start:])
+    return [s.strip() for s in items if s.strip()]
+
+
+def _parse_expected_headings(expected_output: str) -> list[str]:
+    """Extract required heading titles from a task expected_output string."""
+    m = _EXPECTED_HEADINGS_RE.search(expected_output or "")
+    if not m:
+        return []
+    titles = []
+    for item in _split_top_level(" ".join(m.group(1).split())):
+        title = re.sub(r"\s*\(.*\)\s*$", "", item.lstrip("#").strip())
+        if title:
+            titles.append(title)
+    return titles
+
+
+def _load_schemas(path: Path = TASKS_PATH) -> dict[str, tuple[list[str], re.Pattern | None]]:
+    """
+    Build task_id -> (required headings, compiled prefix matcher) from tasks.yaml.
+    The matcher is one alternation so each heading line is classified with a single regex call.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            tasks = (yaml.safe_load(f) or {}).get("tasks", {})
+    except FileNotFoundError:
+        return {}
+    schemas = {}
+    for task_id, cfg in tasks.items():
+        titles = _parse_expected_headings((cfg or {}).get("expected_output", ""))
+        matcher = None
+        if titles:
+            alternation = "|".join(f"({re.escape(t.lower())})" for t in titles)
+            matcher = re.compile(rf"^(?:{alternation})\b")
+        schemas[task_id] = (titles, matcher)
+    return schemas
+
+
+_SCHEMAS = _load_schemas()
+
+
+def _is_english(output_language: str | None) -> bool | None:
+    """True/False for an explicit output language; None when unknown (decided from the content)."""
+    lang = (output_language or "").strip().lower()
+    if not lang:
+        return None
+    return lang in ("en", "eng", "english") or lang.startswith(("en-", "en_", "english "))
+
+
+def _validate(task_id: str, content: str, output_language: str | None = None) -> str:
+    """
+    Validate content against the task schema in one pass over its lines.
+    Returns "Validation passed." or a numbered list of issues with line numbers so the agent
+    can fix everything in a single revision.
+    Required headings in tasks.yaml are English; their names and order are only checked for
+    English output (an explicit output_language, or content where several required prose
+    headings are found), since localized artifacts translate them as the task instructs.
+    In every language the content needs Markdown headings, at least one per required section.
+    """
     if not content or not content.strip():
         return "Validation failed: empty content."
-    return "Validation passed. Schema structure confirmed. (Stub)"
+    titles, matcher = _SCHEMAS.get(task_id, ([], None))
+    checks = _CHART_CHECKS.get(task_id, ())
+    issues: list[str] = []
+    found_at: dict[int, int] = {}
+    order: list[int] = []
+    first_line_no = 0
+    headings = 0
+    section = None  # "bar" | "line" | None
+    bar_rows = line_rows = 0
+    bar_seen = line_seen = False
+
+    for line_no, raw in enumerate(content.splitlines(), 1):
+        line = raw.strip()
+        if not line:
+            continue
+        if not first_line_no:
+            first_line_no = line_no
+            if "pie" in checks:
+                issues.extend(_check_pie_line(line, line_no))
+        if _FENCE_RE.match(line):
+            issues.append(f"line {line_no}: code fence found; output must be plain Markdown without code fences.")
+            continue
+
+        heading = HEADING_RE.match(line)
+        if heading:
+            headings += 1
+            text = normalize_heading(heading.group(2))
+            section = None
+            if matcher is not None:
+                hit = matcher.match(text)
+                if hit:
+                    idx = hit.lastindex - 1
+                    if idx not in found_at:
+                        found_at[idx] = line_no
+                        order.append(idx)
+            if "bar" in checks and BAR_SECTION_RE.search(text):
+                section, bar_seen = "bar", True
+            elif "line" in checks and LINE_SECTION_RE.match(text):
+                section, line_seen = "line", True
+            continue
+
+        if "line" in checks and LINE_SECTION_RE.match(line):
+            # Allow "Trend Line Chart Data:" as a label line instead of a heading.
+            section, line_seen = "line", True
+            continue
+        if section in ("bar", "line") and "|" not in line:
+            continue  # prose inside a chart data section (only '... | ...' lines are rows)
+        if section == "bar":
+            issue = _check_bar_row(line, line_no)
+            if issue:
+                issues.append(issue)
+            else:
+                bar_rows += 1
+        elif section == "line":
+            issue = _check_line_row(line, line_no)
+            if issue:
+                issues.append(issue)
+            else:
+                line_rows += 1
+
+    english = _is_english(output_language)
+    if english is None:
+        # Chart data headings stay English in every language, and a single match can be a word
+        # shared with the output language ("Audit"), so it takes two recognised prose headings
+        prose = [
+            idx for idx in found_at
+            if not (BAR_SECTION_RE.search(titles[idx]) or LINE_SECTION_RE.match(titles[idx]))
+        ]
+        english = len(prose) >= 2
+    for idx, title in enumerate(titles if english else ()):
+        if idx not in found_at:
+            issues.append(f"missing heading: '{title}'.")
+    if english and order != sorted(order):
+        expected = [titles[i] for i in sorted(order)]
+        issues.append(f"headings out of order; expected order: {', '.join(expected)}.")
+    if not headings:
+        issues.append("no Markdown headings found; start each section with a '#' heading line.")
+    elif not english and headings < len(titles):
+        issues.append(
+            f"only {headings} Markdown heading(s); expected at least {len(titles)}, one per section "
+            f"({', '.join(titles)}), translated into the output language."
+        )
+    if "bar" in checks:
+        if not bar_seen:
+            issues.append("missing '# Summary Bar Chart Data' section (one 'Trend Name | Value' line per trend, Value 0-100).")
+        elif not bar_rows:
+            issues.append("'Summary Bar Chart Data' has no valid 'Trend Name | Value' rows.")
+    if "line" in checks:
+        if not line_seen:
+            issues.append("missing 'Trend Line Chart Data' section ('Trend Name | Period1:Value1, Period2:Value2, ...', values 0-100).")
+        elif not line_rows:
+            issues.append("'Trend Line Chart Data' has no valid 'Trend Name | Period:Value, ...' rows.")
+
+    if not issues:
+        return "Validation passed. Schema structure confirmed."
+    shown = issues[:_MAX_ISSUES]
+    more = len(issues) - len(shown)
+    lines = [f"Validation failed: {len(issues)} issue(s). Fix all of them in one revision:"]
+    lines.extend(f"{i}. {msg}" for i, msg in enumerate(shown, 1))
+    if more:
+        lines.append(f"... and {more} more issue(s) of the same kind.")
+    return "\n".join(lines)
+
+
+def _check_pie_line(line: str, line_no: int) -> list[str]:
+    m = PIE_CHART_RE.search(line)
+    if not m:
+        return [
+            f"line {line_no}: first line must be 'Sentiment Composition (Pie Chart): "
+            f"Positive X%, Neutral Y%, Negative Z%' (X+Y+Z=100)."
+        ]
+    values = [float(v) for v in m.groups()]
+    issues = []
+    if any(v > 100 for v in values):
+        issues.append(f"line {line_no}: pie chart percentages must be between 0 and 100.")
+    total = sum(values)
+    if abs(total - 100.0) > 0.1:
+        issues.append(
+            f"line {line_no}: pie chart percentages sum to {total:g}, must sum to 100 "
+            f"(Positive {values[0]:g} + Neutral {values[1]:g} + Negative {values[2]:g})."
+        )
+    return issues
+
+
+def _check_bar_row(line: str, line_no: int) -> str | None:
+    m = BAR_ROW_RE.match(line.lstrip("-* ").strip())
+    if not m:
+        return f"line {line_no}: Summary Bar Chart row must be 'Trend Name | Value', got: {line[:80]!r}."
+    if float(m.group(2)) > 100:
+        return f"line {line_no}: bar value {m.group(2)} for '{m.group(1).strip()}' is out of range 0-100."
+    return None
+
+
+def _check_line_row(line: str, line_no: int) -> str | None:
+    m = LINE_ROW_RE.match(line.lstrip("-* ").strip())
+    if not m:
+        return f"line {line_no}: Trend Line Chart row must be 'Trend Name | Period1:Value1, Period2:Value2, ...', got: {line[:80]!r}."
+    for pair in m.group(2).split(","):
+        point = LINE_POINT_RE.match(pair.strip())
+        if not point:
+            return f"line {line_no}: data point {pair.strip()!r} must be 'Period:Value'."
+        if float(point.group(2)) > 100:
+            return f"line {line_no}: value {point.group(2)} for period '{point.group(1).strip()}' is out of range 0-100."
+    return None
+
+
+@tool("Validate plan schema")
+def plan_schema_validator(content: str, output_language: str = "") -> str:
+    """Validate that a content plan has every required heading from tasks.yaml (Strategic Overview, Objectives, Talent Assignments, Content Themes, Content Calendar and Timeline, Key Messaging, Content Formats, Distribution Strategy, Audit; names checked for English output only, pass output_language; any language needs one '#' heading per section) and no code fences. Returns 'Validation passed.' or a numbered list of issues with line numbers."""
+    return _validate("create_content_plan", content, output_language)
 
 
 @tool("Validate sentiment output schema")
-def sentiment_schema_validator(content: str) -> str:
-    """Validate that sentiment analysis output follows the expected schema (Summary, Risks, Opportunities). Returns validation result. Stub: accepts any content."""
-    if not content or not content.strip():
-        return "Validation failed: empty content."
-    return "Validation passed. Schema structure confirmed. (Stub)"
+def sentiment_schema_validator(content: str, output_language: str = "") -> str:
+    """Validate sentiment analysis output: first line 'Sentiment Composition (Pie Chart): Positive X%, Neutral Y%, Negative Z%' summing to 100, required headings from tasks.yaml (Sentiment Summary, Identified Risks, Risk Mitigation, Opportunities, Recommendations, ...; names checked for English output only, pass output_language; any language needs one '#' heading per section) and no code fences. Returns 'Validation passed.' or a numbered list of issues with line numbers."""
+    return _validate("analyze_sentiment", content, output_language)
 
 
 @tool("Validate trend output schema")
-def trend_schema_validator(content: str) -> str:
-    """Validate that trend research output follows the expected schema (Key Trends, Implications, Recommendations). Returns validation result. Stub: accepts any content."""
-    if not content or not content.strip():
-        return "Validation failed: empty content."
-    return "Validation passed. Schema structure confirmed. (Stub)"
+def trend_schema_validator(content: str, output_language: str = "") -> str:
+    """Validate trend research output: required headings from tasks.yaml (Key Market Trends, Summary Bar Chart Data, ..., Audit; names checked for English output only, pass output_language; any language needs one '#' heading per section), 'Trend Name | Value' bar rows (0-100), 'Trend Name | Period:Value, ...' Trend Line Chart Data rows (0-100) and no code fences. Returns 'Validation passed.' or a numbered list of issues with line numbers."""
+    return _validate("research_trends", content, output_language)
 
 
 @tool("Validate product intelligence schema")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for crew.parsing on large synthetic artifacts.
+Compares whole-text parse, a token-sized chunked feed, and the per-section regex re-scan
+used by the TypeScript parsers (app/api/trends/route.ts).
+
+Usage: python scripts/benchmark-parsing.py [--trends 5000] [--chunk 4] [--repeat 3]
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from crew.parsing import ArtifactParser, parse_artifact
+
+TEXT_SECTIONS = [
+    "Creator Economy Insights",
+    "Competitive Landscape",
+    "Content Format Trends",
+    "Timing and Seasonality",
+    "Implications for Strategy",
+    "Recommendations",
+    "Sources",
+    "Audit",
+]
+PERIODS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def build_artifact(trends: int) -> str:
+    """Trend artifact with `trends` key trends, bar rows and 12-point trend lines."""
+    lines = ["Sentiment Composition (Pie Chart): Positive 60%, Neutral 30%, Negative 10%", "", "# Key Market Trends", ""]
+    for i in range(trends):
+        lines.append(f"{i + 1}. **Trend {i}**: Audiences shift towards format {i % 17} across platforms.")
+    lines += ["", "# Summary Bar Chart Data", ""]
+    lines += [f"Trend {i} | {(i * 7) % 101}" for i in range(trends)]
+    lines += ["", "# Trend Line Chart Data", ""]
+    for i in range(trends):
+        points = ", ".join(f"{p}:{(i + j * 9) % 101}" for j, p in enumerate(PERIODS))
+        lines.append(f"Trend {i} | {points}")
+    for title in TEXT_SECTIONS:
+        lines += ["", f"# {title}", ""]
+        lines += [f"- Insight {k} for {title.lower()}." for k in range(max(1, trends // 50))]
+    return "\n".join(lines) + "\n"
+
+
+def regex_rescan(text: str) -> int:
+    """Approximation of the TS path: one section regex + split per structured field."""
+    count = 0
+    for name in ["Key Market Trends", "Summary Bar Chart Data", "Trend Line Chart Data", *TEXT_SECTIONS]:
+        m = re.search(r"##?\s*" + name.replace(" ", r"\s+") + r"[\s\S]*?(?=#|$)", text, re.IGNORECASE)
+        if not m:
+            continue
+        for line in m.group(0).splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if re.match(r"^(.+?)\s*\|\s*(.+)$", line):
+                for pair in line.split("|", 1)[1].split(","):
+                    re.match(r"^(.+?):\s*(\d+(?:\.\d+)?)$", pair.strip())
+            count += 1
+    m = re.search(r"Sentiment Composition\s*\([^)]*\)\s*:", text)
+    return count + (1 if m else 0)
+
+
+def bench(label: str, fn, size: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    mb_s = size / best / 1_000_000
+    print(f"  {label:<34} {best * 1000:9.1f} ms   {mb_s:8.2f} MB/s")
+    return best
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--trends", type=int, default=5000, help="trend rows per section")
+    ap.add_argument("--chunk", type=int, default=4, help="chars per streamed chunk (token-sized)")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    text = build_artifact(args.trends)
+    size = len(text.encode("utf-8"))
+    chunks = [text[i:i + args.chunk] for i in range(0, len(text), args.chunk)]
+
+    print("=" * 60)
+    print("BAGANA AI - crew.parsing throughput benchmark")
+    print("=" * 60)
+    print(f"Artifact: {size / 1_000_000:.2f} MB, {text.count(chr(10))} lines, {len(chunks)} chunks of {args.chunk} chars")
+    print()
+
+    def streamed():
+        parser = ArtifactParser()
+        for c in chunks:
+            parser.feed(c)
+        return parser.close()
+
+    parsed = parse_artifact(text)
+    assert streamed().to_dict() == parsed.to_dict(), "streamed and whole-text parse differ"
+    print(f"Records: {len(parsed.key_market_trends)} key trends, {len(parsed.summary_bar_chart_data)} bars, "
+          f"{len(parsed.trend_line_chart_data)} trend lines, {len(parsed.sections)} sections")
+    print()
+
+    bench("parse_artifact (whole text)", lambda: parse_artifact(text), size, args.repeat)
+    bench(f"ArtifactParser.feed ({args.chunk}-char chunks)", streamed, size, args.repeat)
+    bench("to_dict (JSON-ready records)", parsed.to_dict, size, args.repeat)
+    bench("regex re-scan (TS-style)", lambda: regex_rescan(text), size, args.repeat)
+    print()
+    print("[OK] Benchmark complete")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())